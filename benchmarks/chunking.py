@@ -0,0 +1,136 @@
+"""Benchmark the offset-based chunker against the legacy ``recursive_split``.
+
+Usage:
+    uv run python benchmarks/chunking.py [path/to/document.md] [--repeat N]
+
+Without a path a synthetic markdown document (~2 MB) is generated. The text
+is also streamed in page-sized pieces, which must give the same chunks as
+splitting it whole.
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+from app.utils.chunker import split_text, split_text_spans, split_text_stream
+from app.utils.utils import recursive_split
+
+
+def synthetic_markdown(paragraphs: int = 4000, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    words = [
+        "pillar", "curriculum", "design", "engineering", "capstone", "module",
+        "students", "research", "architecture", "systems", "data", "track",
+    ]
+    blocks = []
+    for i in range(paragraphs):
+        if i % 25 == 0:
+            blocks.append(f"## Section {i // 25}")
+        sentences = []
+        for _ in range(rng.randint(2, 8)):
+            sentence = " ".join(rng.choice(words) for _ in range(rng.randint(6, 30)))
+            sentences.append(sentence.capitalize() + ".")
+        blocks.append(" ".join(sentences))
+    return "\n\n".join(blocks)
+
+
+def paginate(text: str, seed: int = 7) -> list[str]:
+    """Cut text into uneven page-sized pieces, mostly in mid-paragraph."""
+
+    rng = random.Random(seed)
+    pages = []
+    start = 0
+    while start < len(text):
+        end = start + rng.randint(1000, 5000)
+        pages.append(text[start:end])
+        start = end
+    return pages
+
+
+def check_stream(text: str, pages: list[str], chunk_size: int, overlap: int) -> None:
+    expected = [
+        (text[start:end], start, end)
+        for start, end in split_text_spans(text, chunk_size, overlap)
+    ]
+    ranges = ["".join(pages[i : i + 4]) for i in range(0, len(pages), 4)]
+    for name, pieces in (("pages", pages), ("4-page ranges", ranges)):
+        streamed = list(split_text_stream(pieces, chunk_size, overlap))
+        if streamed != expected:
+            raise SystemExit(
+                f"split_text_stream over {name} gave {len(streamed)} chunks, "
+                f"splitting the joined text gave {len(expected)}"
+            )
+
+
+def measure(
+    name: str, fn: Callable[[], list[str]], repeat: int
+) -> tuple[str, float, int, int, float]:
+    timings = []
+    chunks: list[str] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = fn()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    avg_len = sum(len(c) for c in chunks) / len(chunks) if chunks else 0.0
+    return name, min(timings), len(chunks), peak, avg_len
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", nargs="?", help="Text or markdown file to split.")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--overlap", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    text = (
+        Path(args.path).read_text(encoding="utf-8")
+        if args.path
+        else synthetic_markdown()
+    )
+    pages = paginate(text)
+    print(f"Input: {len(text):,} characters in {len(pages)} pages")
+    check_stream(text, pages, args.chunk_size, args.overlap)
+
+    rows = [
+        measure(
+            "recursive_split (legacy)",
+            lambda: recursive_split(text, args.chunk_size, args.overlap),
+            args.repeat,
+        ),
+        measure(
+            "split_text (offsets)",
+            lambda: split_text(text, args.chunk_size, args.overlap),
+            args.repeat,
+        ),
+        measure(
+            "split_text_stream (pages)",
+            lambda: [
+                chunk
+                for chunk, _, _ in split_text_stream(
+                    pages, args.chunk_size, args.overlap
+                )
+            ],
+            args.repeat,
+        ),
+    ]
+
+    print(f"{'splitter':<28}{'best time':>12}{'chunks':>10}{'avg len':>10}{'peak mem':>14}")
+    for name, best, count, peak, avg_len in rows:
+        print(
+            f"{name:<28}{best * 1000:>10.1f}ms{count:>10}{avg_len:>10.0f}"
+            f"{peak / 1024 / 1024:>12.1f}MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Benchmark full-page BeautifulSoup extraction against lxml main-content extraction.
+
+Usage:
+    uv run python benchmarks/html_extraction.py [saved_pages_dir] [--pages N]
+
+Pass a directory of ``*.html`` files saved from one site to benchmark real
+pages; otherwise a synthetic site is generated where every page shares the
+same header, navigation menu, cookie banner, footer and "related links" box.
+Reports parse time and the number of chunks each extraction mode produces.
+"""
+
+import argparse
+import random
+import time
+from pathlib import Path
+
+from app.ingestion.web_loader.bs_loader import _parse_full_page
+from app.ingestion.web_loader.extract import BoilerplateFilter, parse_main_content
+from app.utils.utils import split_docs
+
+CHROME_TOP = """
+<header class="site-header"><a href="/">Home</a><a href="/about">About us</a></header>
+<nav class="main-nav"><ul>{menu}</ul></nav>
+<div id="cookie-banner">We use cookies to improve your experience. By continuing to
+browse you agree to our use of cookies. <button>Accept</button></div>
+"""
+CHROME_BOTTOM = """
+<div class="related">{related}</div>
+<footer><p>Copyright 2025 Example University. All rights reserved.</p>
+<p>8 Somapah Road, Singapore 487372. Contact us at info@example.edu</p></footer>
+"""
+# Repeated inside the main content area, so only the cross-page filter removes it.
+CALLOUT = """
+<div class="callout"><p>Applications for the next intake are open until March.
+Visit the admissions office or email admissions@example.edu for details.</p></div>
+"""
+
+
+def synthetic_site(pages: int = 60, seed: int = 11) -> list[tuple[str, str]]:
+    rng = random.Random(seed)
+    words = [
+        "pillar", "curriculum", "design", "engineering", "capstone", "module",
+        "students", "research", "architecture", "systems", "data", "track",
+    ]
+    menu = "".join(
+        f'<li><a href="/section-{i}">Section {i} overview and programmes</a></li>'
+        for i in range(40)
+    )
+    related = " ".join(
+        f'<p><a href="/news-{i}">News item {i}: campus update and events</a></p>'
+        for i in range(10)
+    )
+    site = []
+    for page in range(pages):
+        paragraphs = "".join(
+            "<p>"
+            + " ".join(rng.choice(words) for _ in range(rng.randint(40, 120)))
+            + ".</p>"
+            for _ in range(rng.randint(4, 12))
+        )
+        html = (
+            "<html><head><title>Page</title><script>var x = 1;</script></head><body>"
+            + CHROME_TOP.format(menu=menu)
+            + f"<main><h1>Page {page}</h1>{paragraphs}{CALLOUT}</main>"
+            + CHROME_BOTTOM.format(related=related)
+            + "</body></html>"
+        )
+        site.append((f"https://example.edu/page-{page}", html))
+    return site
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", nargs="?", help="Directory of saved .html pages.")
+    parser.add_argument("--pages", type=int, default=60)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--overlap", type=int, default=100)
+    args = parser.parse_args()
+
+    if args.path:
+        site = [
+            (f"https://example.edu/{path.stem}", path.read_text(errors="replace"))
+            for path in sorted(Path(args.path).glob("*.html"))
+        ]
+    else:
+        site = synthetic_site(args.pages)
+    print(f"Pages: {len(site)}, HTML: {sum(len(h) for _, h in site):,} characters")
+
+    start = time.perf_counter()
+    full_docs = [(_parse_full_page(html, url, False).text, url) for url, html in site]
+    full_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    main_docs = [(parse_main_content(html, url).text, url) for url, html in site]
+    main_time = time.perf_counter() - start
+
+    boilerplate = BoilerplateFilter()
+    start = time.perf_counter()
+    pages = [(url, parse_main_content(html, url)) for url, html in site]
+    for url, page in pages:
+        boilerplate.add(url, BoilerplateFilter.block_keys(page.blocks))
+    filtered_docs = [
+        ("\n\n".join(boilerplate.clean(url, page.blocks)), url) for url, page in pages
+    ]
+    filtered_time = time.perf_counter() - start
+
+    rows = [
+        ("full page (html.parser)", full_time, full_docs),
+        ("main content (lxml)", main_time, main_docs),
+        ("main + boilerplate filter", filtered_time, filtered_docs),
+    ]
+    print(f"{'extraction':<28}{'parse time':>12}{'text chars':>12}{'chunks':>8}")
+    for name, elapsed, docs in rows:
+        chunks = split_docs(docs, args.chunk_size, args.overlap)
+        chars = sum(len(text) for text, _ in docs)
+        print(f"{name:<28}{elapsed * 1000:>10.1f}ms{chars:>12,}{len(chunks):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Measure how long the API takes to become ready in a fresh process.
+
+Usage:
+    uv run python benchmarks/startup.py [--runs N] [--top N] [--init]
+
+Each run starts a new interpreter that imports ``app.api``. The script
+reports the import wall time, the modules with the largest cumulative import
+cost (from ``python -X importtime``), and which optional stacks were
+imported. With ``--init``, every run also runs the app's lifespan start-up
+against the configured database and reports each initialization step. The
+schema must be migrated first (``uv run python -m app.db.migrations``).
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Imported on first use only; none of them should load for a query worker.
+LAZY_MODULES = [
+    "app.ingestion",
+    "app.db.fetch_state_db",
+    "pymupdf",
+    "pymupdf4llm",
+    "bs4",
+    "lxml",
+]
+
+CHILD = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+import app.api
+result = {
+    "import_seconds": time.perf_counter() - started,
+    "lazy_loaded": [m for m in %r if m in sys.modules],
+}
+if %r:
+    async def start():
+        async with app.api.lifespan(app.api.app):
+            pass
+    asyncio.run(start())
+    result["init_seconds"] = app.api.startup_seconds
+print(json.dumps(result))
+"""
+
+
+def run_child(init: bool) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD % (LAZY_MODULES, init)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def import_profile(top: int) -> list[tuple[int, str]]:
+    """Top-level-most modules with the largest cumulative import time (us)."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.api"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        # Only direct dependencies of app.api, to avoid counting twice.
+        if len(name) - len(name.lstrip()) <= 3:
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12)
+    parser.add_argument(
+        "--init", action="store_true", help="Also run the app's start-up."
+    )
+    args = parser.parse_args()
+
+    results = [run_child(args.init) for _ in range(max(1, args.runs))]
+    imports = [result["import_seconds"] for result in results]
+    print(
+        f"import app.api: best {min(imports):.2f}s, "
+        f"median {statistics.median(imports):.2f}s over {len(imports)} runs"
+    )
+    lazy_loaded = results[0]["lazy_loaded"]
+    print(f"lazy modules imported: {', '.join(lazy_loaded) or 'none'}")
+
+    if args.init:
+        steps = results[0]["init_seconds"]
+        print(f"{'init step':<24}{'best':>10}{'median':>10}")
+        for step in steps:
+            values = [result["init_seconds"][step] for result in results]
+            print(
+                f"{step:<24}{min(values) * 1000:>8.0f}ms"
+                f"{statistics.median(values) * 1000:>8.0f}ms"
+            )
+
+    print(f"\n{'module':<48}{'cumulative':>12}")
+    for cumulative, name in import_profile(args.top):
+        print(f"{name:<48}{cumulative / 1000:>10.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
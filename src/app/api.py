@@ -1,31 +1,67 @@
+import asyncio
 import logging
+import math
 import os
+import shutil
+import sys
+import tempfile
+import threading
 import time
-from contextlib import asynccontextmanager
-from typing import Iterable, Sequence
+from contextlib import asynccontextmanager, contextmanager
+from functools import partial
+from typing import (
+    TYPE_CHECKING,
+    AsyncIterator,
+    Callable,
+    Iterator,
+    Optional,
+    Sequence,
+)
 
 from fastapi import FastAPI, File, HTTPException, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from starlette.concurrency import run_in_threadpool
 
 from app.core.config import settings
-from app.db.chat_db import ChatDB
-from app.ingestion.ingest import load_documents
-from app.ingestion.pdf_loader.pdf_to_text import extract_text_from_pdf
-from app.ingestion.service import ingest_text_documents
+from app.db.chat_db import ACTIVE_MODEL_KEY, ChatDB
+from app.db.read_replicas import read_replica_metrics
+from app.db.retrieval_cache import retrieval_cache_metrics
 from app.models.models import (
+    BatchQueryRequest,
+    BatchQueryResult,
     ChatSessionResponse,
     ChatWithMessagesResponse,
     CreateChatRequest,
+    IngestionJobResponse,
     IngestionResponse,
+    IngestionStageResponse,
     IngestWebRequest,
     QueryRequest,
     QueryResponse,
     UpdateModelRequest,
+    WebFetchReport,
 )
+from app.utils.admission import AdmissionRejected, admission_deadline, admission_metrics
 from app.utils.citation_parser import parse_citations
 from app.utils.id import create_id
-from app.workflow import build_rag_workflow
+from app.utils.rate_limit import embedding_scheduler
+from app.utils.single_flight import SingleFlight, normalize_question
+from app.workflow import RAGWorkflow
+from app.workflow.batch import BatchAnswer, iter_batch_answers
+from app.workflow.llm_health import llm_metrics
+from app.workflow.query_classifier import route_stats
+from app.workflow.warmup import WarmupReport, warm_up
+
+if TYPE_CHECKING:
+    # The ingestion stack (parsers, PDF extraction, process pool) is imported
+    # on first use, so query-only workers start without it.
+    from app.db.fetch_state_db import FetchStateDB
+    from app.ingestion.jobs import IngestionJob, IngestionJobManager
+    from app.ingestion.service import IngestionResult
+
+# CPU time of interpreter start-up and imports, before any initialization.
+IMPORT_CPU_SECONDS = time.process_time()
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -33,22 +69,100 @@ logging.getLogger("httpx").setLevel(logging.WARNING)
 logging.getLogger("httpcore").setLevel(logging.WARNING)
 
 rag_workflow = None
+# The same graph without a checkpointer, for runs shared between chats.
+rag_pipeline = None
+rag_engine = None
 chat_db = None
+fetch_state_db = None
+job_manager = None
+query_flight: SingleFlight[dict] = SingleFlight()
+startup_seconds: dict[str, float] = {}
+# False until start-up, including the optional warm-up, has finished.
+ready = False
+warmup_report: Optional[WarmupReport] = None
+_ingestion_lock = threading.Lock()
 ALLOWED_PDF_CONTENT_TYPES = {"application/pdf", "application/octet-stream"}
+UPLOAD_COPY_BLOCK = 1024 * 1024
 POSTGRES_TABLE = settings.postgres_table_name
 
 
+@contextmanager
+def _startup_step(name: str) -> Iterator[None]:
+    """Record how long one initialization step takes."""
+    started = time.perf_counter()
+    yield
+    startup_seconds[name] = time.perf_counter() - started
+
+
+async def _warm_up() -> None:
+    """Run the warm-up in a worker thread, then report the instance ready."""
+    global ready, warmup_report
+    started = time.perf_counter()
+    try:
+        warmup_report = await asyncio.wait_for(
+            run_in_threadpool(warm_up, rag_engine), timeout=settings.warmup_timeout
+        )
+    except asyncio.TimeoutError:
+        logger.warning(
+            "Warm-up did not finish within %gs; reporting ready anyway",
+            settings.warmup_timeout,
+        )
+    except Exception as e:
+        logger.error(f"Warm-up failed: {e}")
+    finally:
+        startup_seconds["warmup"] = time.perf_counter() - started
+        ready = True
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global rag_workflow, chat_db
+    global rag_workflow, rag_pipeline, rag_engine, chat_db, ready
     try:
-        rag_workflow = build_rag_workflow()
+        started = time.perf_counter()
+        with _startup_step("workflow"):
+            rag_engine = RAGWorkflow()
+            rag_workflow = rag_engine.build()
+            rag_pipeline = rag_engine.build(checkpointer=False)
         logger.info("RAG workflow initialized successfully")
 
-        chat_db = ChatDB()
+        with _startup_step("chat_db"):
+            chat_db = ChatDB(
+                settings.chat_db_url or settings.postgres_url,
+                pool_size=settings.chat_db_pool_size,
+                max_overflow=settings.chat_db_max_overflow,
+            )
+            await chat_db.check_schema(settings.schema_auto_migrate)
         logger.info("Chat database initialized successfully")
 
+        startup_seconds["total"] = time.perf_counter() - started
+        logger.info(
+            "Started in %.2fs after %.2fs of CPU for imports (%s)",
+            startup_seconds["total"],
+            IMPORT_CPU_SECONDS,
+            ", ".join(
+                f"{name} {seconds:.2f}s"
+                for name, seconds in startup_seconds.items()
+                if name != "total"
+            ),
+        )
+
+        warmup_task = None
+        if settings.warmup:
+            # Served while warming, but /health keeps load balancers away.
+            warmup_task = asyncio.create_task(_warm_up())
+        else:
+            ready = True
+
         yield
+        if warmup_task is not None:
+            warmup_task.cancel()
+        await chat_db.close()
+        if job_manager is not None:
+            job_manager.shutdown()
+        if "app.ingestion.parallel" in sys.modules:
+            from app.ingestion.parallel import shutdown_executor
+
+            shutdown_executor()
     except Exception as e:
         logger.error(f"Error initializing application: {e}")
         raise HTTPException(
@@ -93,6 +207,42 @@ async def log_requests(request: Request, call_next):
     return response
 
 
+async def _active_model() -> str:
+    """The model chosen through the API, shared by all workers, or LLM_MODEL."""
+    return await chat_db.get_setting(ACTIVE_MODEL_KEY) or settings.llm_model
+
+
+async def _run_workflow(state: dict, config: dict) -> tuple[str, Optional[dict]]:
+    """Invoke the workflow, sharing one run between identical concurrent queries.
+
+    The shared run has no checkpointer, since its callers belong to different
+    chats. Its final state is then saved in each caller's own thread from
+    ``config``, as if the run had happened there.
+
+    Returns the answer and how its chat completion was served, if one was made.
+    """
+
+    if not settings.query_coalescing:
+        response = await run_in_threadpool(rag_workflow.invoke, state, config=config)
+        return response["answer"], response.get("llm")
+
+    index_version = await run_in_threadpool(rag_engine.vector_db.index_version)
+    key = (normalize_question(state["question"]), state["model"], index_version)
+    response, shared = await query_flight.do(
+        key, lambda: run_in_threadpool(rag_pipeline.invoke, state)
+    )
+    if shared:
+        logger.info("Answered from a coalesced in-flight query")
+    response = {**response, "question": state["question"]}
+    await run_in_threadpool(
+        rag_workflow.update_state,
+        config,
+        response,
+        as_node=RAGWorkflow.final_node(response),
+    )
+    return response["answer"], response.get("llm")
+
+
 @app.post("/query", response_model=QueryResponse)
 async def run_query(request: QueryRequest):
     """Process a query request through the RAG workflow."""
@@ -106,18 +256,21 @@ async def run_query(request: QueryRequest):
         raise HTTPException(status_code=500, detail="Chat database not initialized")
 
     try:
-        # Get or create chat session
+        # Get or create chat session, titled after its first query
         chat_id = request.chat_id
+        title = request.query[:50] + ("..." if len(request.query) > 50 else "")
         if not chat_id:
-            # Create a new chat session with a title from the first query
             chat_id = create_id()
-            title = request.query[:50] + ("..." if len(request.query) > 50 else "")
-            chat_db.create_chat(chat_id=chat_id, title=title)
+            await chat_db.create_chat(chat_id=chat_id, title=title)
             logger.info(f"Created new chat session: {chat_id}")
+        else:
+            # Unknown IDs, e.g. from a SQLite chat file that was not imported,
+            # start a new session instead of failing on the foreign key.
+            await chat_db.ensure_chat(chat_id, title)
 
         # Save user message
         user_message_id = create_id()
-        chat_db.add_message(
+        await chat_db.add_message(
             message_id=user_message_id,
             chat_id=chat_id,
             role="user",
@@ -125,18 +278,18 @@ async def run_query(request: QueryRequest):
             segments=None,
         )
 
-        selected_model = request.model or settings.llm_model
-        if request.model and request.model != settings.llm_model:
-            os.environ["LLM_MODEL"] = request.model
-            settings.llm_model = request.model
+        active_model = await _active_model()
+        selected_model = request.model or active_model
+        if request.model and request.model != active_model:
+            await chat_db.set_setting(ACTIVE_MODEL_KEY, request.model)
 
         state = {"question": request.query, "model": selected_model}
         # Use chat_id as thread_id for LangGraph checkpointing
         config = {"configurable": {"thread_id": chat_id}}
 
         # Process the query through the RAG workflow
-        response = rag_workflow.invoke(state, config=config)
-        answer = response["answer"]
+        with admission_deadline(settings.admission_timeout):
+            answer, llm_info = await _run_workflow(state, config)
 
         # Parse citations from the answer
         segments = parse_citations(answer)
@@ -144,7 +297,7 @@ async def run_query(request: QueryRequest):
         # Save assistant message
         assistant_message_id = create_id()
         full_text = "".join([seg.text for seg in segments])
-        chat_db.add_message(
+        await chat_db.add_message(
             message_id=assistant_message_id,
             chat_id=chat_id,
             role="assistant",
@@ -155,17 +308,107 @@ async def run_query(request: QueryRequest):
         # Log successful response
         logger.info(f"Successfully processed query in chat {chat_id}")
 
-        return QueryResponse(chat_id=chat_id, segments=segments)
+        return QueryResponse(chat_id=chat_id, segments=segments, llm=llm_info)
+    except AdmissionRejected as e:
+        logger.warning(f"Query rejected by admission control: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
     except Exception as e:
         logger.error(f"Error during RAG workflow invocation: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"RAG workflow failed: {str(e)}")
 
 
+async def _batch_result(
+    answer: BatchAnswer, persist: bool, include_context: bool
+) -> BatchQueryResult:
+    result = BatchQueryResult(
+        index=answer.index, question=answer.question, llm=answer.llm
+    )
+    if include_context:
+        result.context = [doc.text for doc in answer.context]
+    if answer.error is not None:
+        result.error = answer.error
+        return result
+
+    result.segments = parse_citations(answer.answer)
+    if persist:
+        chat_id = create_id()
+        title = answer.question[:50] + ("..." if len(answer.question) > 50 else "")
+        await chat_db.create_chat(chat_id=chat_id, title=title)
+        await chat_db.add_message(
+            message_id=create_id(),
+            chat_id=chat_id,
+            role="user",
+            content=answer.question,
+            segments=None,
+        )
+        await chat_db.add_message(
+            message_id=create_id(),
+            chat_id=chat_id,
+            role="assistant",
+            content="".join(seg.text for seg in result.segments),
+            segments=[{"text": s.text, "source": s.source} for s in result.segments],
+        )
+        result.chat_id = chat_id
+    return result
+
+
+@app.post("/query/batch")
+async def run_batch_query(request: BatchQueryRequest):
+    """
+    Answer many questions in one call, streaming one JSON line per answer.
+
+    Questions are embedded together, searched over pooled connections and
+    generated with bounded concurrency. Lines arrive in completion order;
+    ``index`` points back into ``questions``. Chats are only created when
+    ``persist`` is set.
+    """
+
+    if rag_engine is None:
+        raise HTTPException(status_code=500, detail="RAG workflow not initialized")
+    if request.persist and chat_db is None:
+        raise HTTPException(status_code=500, detail="Chat database not initialized")
+    if len(request.questions) > settings.batch_query_max_questions:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.batch_query_max_questions} questions per batch.",
+        )
+
+    logger.info("Processing batch of %d questions", len(request.questions))
+    try:
+        answers = await run_in_threadpool(
+            iter_batch_answers,
+            rag_engine,
+            request.questions,
+            request.model or await _active_model(),
+            request.concurrency or settings.batch_query_concurrency,
+        )
+        # Embed and search before the response starts so failures get a status.
+        first = await run_in_threadpool(next, answers, None)
+    except Exception as e:
+        logger.error(f"Error during batch query: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Batch query failed: {str(e)}")
+
+    async def lines() -> AsyncIterator[str]:
+        answer = first
+        while answer is not None:
+            result = await _batch_result(
+                answer, request.persist, request.include_context
+            )
+            yield result.model_dump_json(exclude_none=True) + "\n"
+            answer = await run_in_threadpool(next, answers, None)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @app.get("/settings/model")
 async def get_active_model():
-    """Return the currently configured LLM model."""
+    """Return the active LLM model, as chosen through the API or LLM_MODEL."""
 
-    return {"model": settings.llm_model}
+    return {"model": await _active_model()}
 
 
 @app.post("/settings/model")
@@ -176,11 +419,10 @@ async def update_active_model(payload: UpdateModelRequest):
     if not model:
         raise HTTPException(status_code=400, detail="Model identifier cannot be empty.")
 
-    os.environ["LLM_MODEL"] = model
-    settings.llm_model = model
+    await chat_db.set_setting(ACTIVE_MODEL_KEY, model)
     logger.info("Active LLM model updated to %s", model)
 
-    return {"model": settings.llm_model}
+    return {"model": model}
 
 
 def _combine_warnings(*warning_sequences: Sequence[str]) -> list[str]:
@@ -203,40 +445,88 @@ def _sanitize_filename(filename: str | None) -> str:
     return os.path.basename(filename)
 
 
-def _loader_warning(text: str) -> str | None:
-    """Check whether scraped content indicates an error and return a warning message."""
+async def _spool_upload(upload: UploadFile, path: str, max_bytes: int) -> int:
+    """Copy an upload to ``path`` in blocks, stopping once it exceeds ``max_bytes``.
 
-    normalized = text.strip().lower()
-    for prefix, message in (
-        ("error", "loader reported an error"),
-        ("unexpected error", "loader reported an error"),
-        ("could not find the main content", "unable to locate main content"),
-    ):
-        if normalized.startswith(prefix):
-            return message
-    return None
+    Returns the number of bytes read, which is above ``max_bytes`` only when
+    the upload was too large (the file is then incomplete).
+    """
 
+    written = 0
+    with open(path, "wb") as handle:
+        while block := await upload.read(UPLOAD_COPY_BLOCK):
+            written += len(block)
+            if written > max_bytes:
+                break
+            await run_in_threadpool(handle.write, block)
+    return written
 
-async def _ingest_documents(
-    docs: Iterable[tuple[str, str]],
-    extra_warnings: Sequence[str] | None = None,
-) -> IngestionResponse:
-    try:
-        result = await run_in_threadpool(ingest_text_documents, docs)
-    except RuntimeError as exc:
-        raise HTTPException(status_code=500, detail=str(exc)) from exc
 
-    warnings = _combine_warnings(extra_warnings or [], result.warnings)
+def _ingestion_response(
+    result: "IngestionResult", extra_warnings: Sequence[str] | None = None
+) -> IngestionResponse:
+    report = result.fetch_report
     return IngestionResponse(
         chunk_count=result.chunk_count,
         document_count=result.document_count,
-        warnings=warnings,
+        inserted_count=result.inserted_count,
+        deleted_count=result.deleted_count,
+        duplicate_count=result.duplicate_count,
+        duplicate_bytes_saved=result.duplicate_bytes_saved,
+        warnings=_combine_warnings(extra_warnings or [], result.warnings),
+        fetch_report=(
+            WebFetchReport(
+                fetched=report.fetched,
+                unchanged=report.unchanged,
+                duplicate=report.duplicate,
+                failed=report.failed,
+            )
+            if report is not None
+            else None
+        ),
     )
 
 
-@app.post("/ingest/web", response_model=IngestionResponse)
-async def ingest_web(request: IngestWebRequest):
-    """Ingest documents by crawling the provided URLs."""
+def _job_response(job: "IngestionJob") -> IngestionJobResponse:
+    return IngestionJobResponse(
+        id=job.id,
+        kind=job.kind,
+        status=job.status,
+        cancel_requested=job.cancel_requested.is_set(),
+        stage=job.current_stage,
+        stages=[
+            IngestionStageResponse(
+                name=stage.name,
+                processed=stage.processed,
+                total=stage.total,
+                throughput=stage.throughput(),
+                eta_seconds=stage.eta_seconds(),
+            )
+            for stage in list(job.stages.values())
+        ],
+        created_at=job.created_at.isoformat(),
+        started_at=job.started_at.isoformat() if job.started_at else None,
+        finished_at=job.finished_at.isoformat() if job.finished_at else None,
+        error=job.error,
+        result=_ingestion_response(job.result) if job.result else None,
+    )
+
+
+def _require_fetch_state_db() -> "FetchStateDB":
+    """The fetch state database, opened by the first web ingest."""
+    global fetch_state_db
+    with _ingestion_lock:
+        if fetch_state_db is None:
+            from app.db.fetch_state_db import FetchStateDB
+
+            fetch_state_db = FetchStateDB()
+            logger.info("Fetch state database initialized successfully")
+        return fetch_state_db
+
+
+def _web_ingest_call(request: IngestWebRequest) -> Callable[[], "IngestionResult"]:
+    """Validate a web ingest request and bind it to ``ingest_web_urls``."""
+    from app.ingestion.service import ingest_web_urls
 
     urls = [url.strip() for url in request.urls if url.strip()]
     if not urls:
@@ -244,46 +534,27 @@ async def ingest_web(request: IngestWebRequest):
             status_code=400, detail="Provide at least one URL to ingest."
         )
 
-    try:
-        raw_docs = await run_in_threadpool(load_documents, urls)
-    except Exception as exc:
-        logger.error("Failed to fetch URLs: %s", exc, exc_info=True)
-        raise HTTPException(
-            status_code=500, detail=f"Failed to fetch URLs: {exc}"
-        ) from exc
-
-    preprocessed: list[tuple[str, str]] = []
-    warnings: list[str] = []
-    for text, source in raw_docs:
-        normalized_text = (text or "").strip()
-        if not normalized_text:
-            warnings.append(f"{source}: no content extracted.")
-            continue
-        loader_issue = _loader_warning(normalized_text)
-        if loader_issue:
-            warnings.append(f"{source}: {loader_issue} – skipping.")
-            continue
-        preprocessed.append((normalized_text, source))
-
-    if not preprocessed:
-        detail = (
-            warnings[0]
-            if warnings
-            else "No usable content retrieved from the supplied URLs."
-        )
-        raise HTTPException(status_code=400, detail=detail)
-
-    return await _ingest_documents(preprocessed, warnings)
+    return partial(
+        ingest_web_urls,
+        urls,
+        _require_fetch_state_db(),
+        force=request.force,
+        crawl=request.crawl,
+        max_depth=request.max_depth,
+        max_pages=request.max_pages,
+    )
 
 
-@app.post("/ingest/pdf", response_model=IngestionResponse)
-async def ingest_pdf(files: list[UploadFile] = File(...)):
-    """Ingest uploaded PDF files."""
+async def _spool_pdf_uploads(
+    files: list[UploadFile], spool_dir: str
+) -> tuple[list[tuple[str, str]], list[str]]:
+    """Copy valid uploads into ``spool_dir``; returns ``(path, source)`` and warnings."""
 
     if not files:
         raise HTTPException(status_code=400, detail="Attach at least one PDF file.")
 
-    preprocessed: list[tuple[str, str]] = []
+    max_bytes = settings.pdf_max_upload_mb * 1024 * 1024
+    uploads: list[tuple[str, str]] = []
     warnings: list[str] = []
     for upload in files:
         filename = _sanitize_filename(upload.filename)
@@ -294,34 +565,153 @@ async def ingest_pdf(files: list[UploadFile] = File(...)):
             )
             continue
 
-        data = await upload.read()
-        if not data:
-            warnings.append(f"{filename}: file is empty.")
+        too_large = (
+            f"{filename}: exceeds the {settings.pdf_max_upload_mb} MB upload limit."
+        )
+        if upload.size is not None and upload.size > max_bytes:
+            warnings.append(too_large)
             continue
 
-        try:
-            text = await run_in_threadpool(
-                extract_text_from_pdf,
-                data,
-                filename,
-            )
-        except Exception as exc:
-            logger.warning("Failed to parse PDF %s: %s", filename, exc, exc_info=True)
-            warnings.append(f"{filename}: failed to extract text ({exc}).")
+        path = os.path.join(spool_dir, f"{len(uploads)}.pdf")
+        size = await _spool_upload(upload, path, max_bytes)
+        if size > max_bytes:
+            warnings.append(too_large)
             continue
-
-        normalized_text = text.strip()
-        if not normalized_text:
-            warnings.append(f"{filename}: produced empty text after extraction.")
+        if not size:
+            warnings.append(f"{filename}: file is empty.")
             continue
 
-        preprocessed.append((normalized_text, f"file://{filename}"))
+        uploads.append((path, f"file://{filename}"))
 
-    if not preprocessed:
+    if not uploads:
         detail = warnings[0] if warnings else "No valid PDFs were processed."
         raise HTTPException(status_code=400, detail=detail)
+    return uploads, warnings
+
+
+@app.post("/ingest/web", response_model=IngestionResponse)
+async def ingest_web(request: IngestWebRequest):
+    """Ingest documents by fetching (or crawling from) the provided URLs."""
+
+    ingest = _web_ingest_call(request)
+    try:
+        result = await run_in_threadpool(ingest)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+    except Exception as exc:
+        logger.error("Failed to ingest URLs: %s", exc, exc_info=True)
+        raise HTTPException(
+            status_code=500, detail=f"Failed to ingest URLs: {exc}"
+        ) from exc
+
+    report = result.fetch_report
+    if not result.document_count and not (report.unchanged or report.duplicate):
+        detail = (
+            result.warnings[0]
+            if result.warnings
+            else "No usable content retrieved from the supplied URLs."
+        )
+        raise HTTPException(status_code=400, detail=detail)
+
+    return _ingestion_response(result)
 
-    return await _ingest_documents(preprocessed, warnings)
+
+@app.post("/ingest/pdf", response_model=IngestionResponse)
+async def ingest_pdf(files: list[UploadFile] = File(...)):
+    """Ingest uploaded PDF files.
+
+    Uploads are copied to temporary files in fixed-size blocks and extracted
+    page by page, so neither the upload nor its text is held in memory whole.
+    """
+    from app.ingestion.service import ingest_pdf_files
+
+    with tempfile.TemporaryDirectory(prefix="pdf-upload-") as spool_dir:
+        uploads, warnings = await _spool_pdf_uploads(files, spool_dir)
+        try:
+            result = await run_in_threadpool(ingest_pdf_files, uploads)
+        except RuntimeError as exc:
+            raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+    if not result.document_count:
+        detail = (warnings + result.warnings or ["No valid PDFs were processed."])[0]
+        raise HTTPException(status_code=400, detail=detail)
+
+    return _ingestion_response(result, warnings)
+
+
+def _require_job_manager() -> "IngestionJobManager":
+    """The ingestion job manager, started by the first job request."""
+    global job_manager
+    with _ingestion_lock:
+        if job_manager is None:
+            from app.ingestion.jobs import IngestionJobManager
+
+            job_manager = IngestionJobManager(
+                max_workers=settings.ingest_job_workers,
+                retention=settings.ingest_job_retention,
+            )
+            logger.info("Ingestion job manager initialized successfully")
+        return job_manager
+
+
+@app.post("/ingest/jobs/web", response_model=IngestionJobResponse, status_code=202)
+async def submit_web_job(request: IngestWebRequest):
+    """Queue a web ingestion job and return its ID immediately."""
+
+    manager = _require_job_manager()
+    job = manager.submit("web", _web_ingest_call(request))
+    return _job_response(job)
+
+
+@app.post("/ingest/jobs/pdf", response_model=IngestionJobResponse, status_code=202)
+async def submit_pdf_job(files: list[UploadFile] = File(...)):
+    """Spool uploaded PDFs to disk and queue their ingestion as a job."""
+    from app.ingestion.service import ingest_pdf_files
+
+    manager = _require_job_manager()
+    spool_dir = tempfile.mkdtemp(prefix="pdf-upload-")
+    try:
+        uploads, warnings = await _spool_pdf_uploads(files, spool_dir)
+    except BaseException:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+        raise
+
+    def run() -> "IngestionResult":
+        result = ingest_pdf_files(uploads)
+        result.warnings[:0] = warnings
+        return result
+
+    job = manager.submit(
+        "pdf", run, cleanup=partial(shutil.rmtree, spool_dir, ignore_errors=True)
+    )
+    return _job_response(job)
+
+
+@app.get("/ingest/jobs", response_model=list[IngestionJobResponse])
+async def list_ingestion_jobs():
+    """List queued, running and recently finished ingestion jobs, newest first."""
+
+    return [_job_response(job) for job in _require_job_manager().list_jobs()]
+
+
+@app.get("/ingest/jobs/{job_id}", response_model=IngestionJobResponse)
+async def get_ingestion_job(job_id: str):
+    """Report a job's status, per-stage counts, throughput and ETA."""
+
+    job = _require_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return _job_response(job)
+
+
+@app.post("/ingest/jobs/{job_id}/cancel", response_model=IngestionJobResponse)
+async def cancel_ingestion_job(job_id: str):
+    """Cancel a queued or running job; it stops at its next progress update."""
+
+    job = _require_job_manager().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return _job_response(job)
 
 
 @app.post("/chats", response_model=ChatSessionResponse)
@@ -333,7 +723,7 @@ async def create_chat(request: CreateChatRequest):
     chat_id = create_id()
     title = request.title or "New Chat"
 
-    chat = chat_db.create_chat(chat_id=chat_id, title=title)
+    chat = await chat_db.create_chat(chat_id=chat_id, title=title)
 
     return ChatSessionResponse(
         id=chat.id,
@@ -350,7 +740,7 @@ async def list_chats():
     if chat_db is None:
         raise HTTPException(status_code=500, detail="Chat database not initialized")
 
-    chats = chat_db.list_chats()
+    chats = await chat_db.list_chats()
 
     return [
         ChatSessionResponse(
@@ -370,7 +760,7 @@ async def get_chat(chat_id: str):
     if chat_db is None:
         raise HTTPException(status_code=500, detail="Chat database not initialized")
 
-    chat = chat_db.get_chat(chat_id)
+    chat = await chat_db.get_chat(chat_id)
     if not chat:
         raise HTTPException(status_code=404, detail=f"Chat {chat_id} not found")
 
@@ -409,17 +799,46 @@ async def delete_chat(chat_id: str):
     if chat_db is None:
         raise HTTPException(status_code=500, detail="Chat database not initialized")
 
-    deleted = chat_db.delete_chat(chat_id)
+    deleted = await chat_db.delete_chat(chat_id)
     if not deleted:
         raise HTTPException(status_code=404, detail=f"Chat {chat_id} not found")
 
     return {"message": f"Chat {chat_id} deleted successfully"}
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """Return in-process request metrics."""
+
+    return {
+        "query_coalescing": query_flight.stats.as_dict(),
+        "query_routing": route_stats.snapshot(),
+        "admission": {
+            **admission_metrics(),
+            "embeddings": embedding_scheduler().snapshot(),
+        },
+        "llm": llm_metrics(),
+        "retrieval_cache": retrieval_cache_metrics(),
+        "read_replicas": read_replica_metrics(),
+        "startup": {
+            "import_cpu_seconds": IMPORT_CPU_SECONDS,
+            "init_seconds": dict(startup_seconds),
+            "ready": ready,
+            "warmup": warmup_report.as_dict() if warmup_report else None,
+        },
+    }
+
+
 @app.get("/health")
 async def health_check():
-    return {
-        "status": "healthy",
+    """Report health; 503 until start-up and the optional warm-up finish."""
+
+    body = {
+        "status": "healthy" if ready else "warming",
+        "ready": ready,
         "version": "1.0.0",
         "postgres_table": POSTGRES_TABLE,
     }
+    if not ready:
+        return JSONResponse(status_code=503, content=body)
+    return body
@@ -18,12 +18,81 @@ class Settings(BaseSettings):
     )
     postgres_table_name: str = os.getenv("POSTGRES_TABLE_NAME", "documents")
     postgres_search_top_k: int = int(os.getenv("POSTGRES_SEARCH_TOP_K", "10"))
+    # read replicas for searches (comma-separated DSNs); writes use POSTGRES_URL
+    postgres_read_urls: str = os.getenv("POSTGRES_READ_URLS", "")
+    # seconds between replica health and generation checks
+    read_replica_check_seconds: float = float(
+        os.getenv("READ_REPLICA_CHECK_SECONDS", "5")
+    )
+    # search on the primary when replicas trail it by more generations; -1 = never
+    read_replica_max_lag: int = int(os.getenv("READ_REPLICA_MAX_LAG", "-1"))
+    # chats and the active model; defaults to POSTGRES_URL, shared by all workers
+    chat_db_url: str = os.getenv("CHAT_DB_URL", "")
+    chat_db_pool_size: int = int(os.getenv("CHAT_DB_POOL_SIZE", "5"))
+    chat_db_max_overflow: int = int(os.getenv("CHAT_DB_MAX_OVERFLOW", "10"))
+    # apply pending schema migrations on connect instead of refusing to start
+    schema_auto_migrate: bool = os.getenv("SCHEMA_AUTO_MIGRATE", "false").lower() in {
+        "1",
+        "true",
+        "yes",
+        "on",
+    }
+
+    # retrieval planner: per-query choice of dense/full-text branches
+    retrieval_planner: bool = os.getenv("RETRIEVAL_PLANNER", "true").lower() in {
+        "1",
+        "true",
+        "yes",
+        "on",
+    }
+    # candidates per branch when both run, as a multiple of top_k
+    retrieval_prefetch_factor: int = int(os.getenv("RETRIEVAL_PREFETCH_FACTOR", "3"))
+    # skip full-text ranking when the query matches more than this share of rows
+    retrieval_fts_max_match_fraction: float = float(
+        os.getenv("RETRIEVAL_FTS_MAX_MATCH_FRACTION", "0.2")
+    )
+
+    # retrieval result cache, invalidated whenever the documents table is written
+    retrieval_cache: bool = os.getenv("RETRIEVAL_CACHE", "true").lower() in {
+        "1",
+        "true",
+        "yes",
+        "on",
+    }
+    retrieval_cache_max_entries: int = int(
+        os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "4096")
+    )
+    # approximate memory for the cached chunk rows
+    retrieval_cache_max_mb: float = float(os.getenv("RETRIEVAL_CACHE_MAX_MB", "64"))
 
     # llm api
     llm_base_url: str = os.getenv("LLM_BASE_URL", "https://api.together.xyz/v1")
     llm_api_key: str = os.getenv("LLM_API_KEY", "")
     llm_model: str = os.getenv("LLM_MODEL", "moonshotai/Kimi-K2-Instruct-0905")
 
+    # llm latency SLO: per-request deadline, hedging to a fallback model and
+    # circuit breakers that skip models which keep failing or running slow
+    llm_timeout: float = float(os.getenv("LLM_TIMEOUT", "30"))
+    llm_fallback_model: str = os.getenv("LLM_FALLBACK_MODEL", "")
+    llm_hedge: bool = os.getenv("LLM_HEDGE", "true").lower() in {
+        "1",
+        "true",
+        "yes",
+        "on",
+    }
+    # hedge after this percentile of the model's recent latency ...
+    llm_hedge_percentile: float = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+    # ... once it has this many samples; until then after LLM_HEDGE_DELAY seconds
+    llm_hedge_min_samples: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    llm_hedge_delay: float = float(os.getenv("LLM_HEDGE_DELAY", "8"))
+    llm_hedge_min_delay: float = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1"))
+    llm_breaker_window: float = float(os.getenv("LLM_BREAKER_WINDOW", "60"))
+    llm_breaker_min_calls: int = int(os.getenv("LLM_BREAKER_MIN_CALLS", "10"))
+    llm_breaker_error_rate: float = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+    llm_breaker_cooldown: float = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+    # successful calls slower than this count as failures for the breaker
+    llm_breaker_slow_call: float = float(os.getenv("LLM_BREAKER_SLOW_CALL", "20"))
+
     # embeddings api
     embeddings_base_url: str = os.getenv(
         "EMBEDDINGS_BASE_URL", "https://api.together.xyz/v1"
@@ -37,6 +106,116 @@ class Settings(BaseSettings):
     # ingestion settings
     chunk_size: int = int(os.getenv("CHUNK_SIZE", "500"))
     chunk_overlap: int = int(os.getenv("CHUNK_OVERLAP", "100"))
+    # "characters" (default) or "tokens"; tokens are counted with tiktoken
+    chunk_size_unit: str = os.getenv("CHUNK_SIZE_UNIT", "characters")
+    chunk_tokenizer: str = os.getenv("CHUNK_TOKENIZER", "cl100k_base")
+    # worker processes for PDF extraction and splitting; 1 = in-process, 0 = all cores
+    ingestion_workers: int = int(os.getenv("INGESTION_WORKERS", "1"))
+    pdf_pages_per_task: int = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+    # uploads are spooled to temporary files; larger PDFs are rejected
+    pdf_max_upload_mb: int = int(os.getenv("PDF_MAX_UPLOAD_MB", "200"))
+    # collapse chunks whose word shingles overlap at least this much (MinHash LSH)
+    near_duplicates: bool = os.getenv("NEAR_DUPLICATES", "true").lower() in {
+        "1",
+        "true",
+        "yes",
+        "on",
+    }
+    near_duplicate_threshold: float = float(
+        os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.85")
+    )
+
+    # web loader
+    web_max_concurrency: int = int(os.getenv("WEB_MAX_CONCURRENCY", "16"))
+    web_per_host_concurrency: int = int(os.getenv("WEB_PER_HOST_CONCURRENCY", "4"))
+    web_connect_timeout: float = float(os.getenv("WEB_CONNECT_TIMEOUT", "5"))
+    web_read_timeout: float = float(os.getenv("WEB_READ_TIMEOUT", "20"))
+    web_fetch_retries: int = int(os.getenv("WEB_FETCH_RETRIES", "2"))
+    # "main" (lxml main-content + boilerplate removal) or "full" (whole-page text)
+    web_extraction_mode: str = os.getenv("WEB_EXTRACTION_MODE", "main").lower()
+    web_boilerplate_min_pages: int = int(os.getenv("WEB_BOILERPLATE_MIN_PAGES", "3"))
+
+    # crawler
+    crawl_max_depth: int = int(os.getenv("CRAWL_MAX_DEPTH", "2"))
+    crawl_max_pages: int = int(os.getenv("CRAWL_MAX_PAGES", "200"))
+    crawl_delay: float = float(os.getenv("CRAWL_DELAY", "0.25"))
+    # pages ingested per batch while a crawl is still running
+    ingest_stream_batch: int = int(os.getenv("INGEST_STREAM_BATCH", "20"))
+
+    # background ingestion jobs
+    ingest_job_workers: int = int(os.getenv("INGEST_JOB_WORKERS", "2"))
+    # finished jobs kept in memory for status queries
+    ingest_job_retention: int = int(os.getenv("INGEST_JOB_RETENTION", "100"))
+
+    # index builds after a bulk load (python -m app.ingestion.bulk --defer-indexes)
+    index_build_work_mem: str = os.getenv("INDEX_BUILD_WORK_MEM", "1GB")
+    index_build_parallel_workers: int = int(
+        os.getenv("INDEX_BUILD_PARALLEL_WORKERS", "4")
+    )
+
+    # distributed ingestion workers (app.ingestion.worker)
+    ingest_queue_claim_batch: int = int(os.getenv("INGEST_QUEUE_CLAIM_BATCH", "5"))
+    ingest_queue_heartbeat: float = float(os.getenv("INGEST_QUEUE_HEARTBEAT", "10"))
+    # running tasks without a heartbeat for this long are re-queued
+    ingest_queue_stale_after: float = float(
+        os.getenv("INGEST_QUEUE_STALE_AFTER", "60")
+    )
+    ingest_queue_max_attempts: int = int(os.getenv("INGEST_QUEUE_MAX_ATTEMPTS", "3"))
+
+    # admission control: concurrent calls and queued waiters per upstream
+    llm_max_concurrency: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    llm_max_queue: int = int(os.getenv("LLM_MAX_QUEUE", "32"))
+    embeddings_max_concurrency: int = int(
+        os.getenv("EMBEDDINGS_MAX_CONCURRENCY", "8")
+    )
+    embeddings_max_queue: int = int(os.getenv("EMBEDDINGS_MAX_QUEUE", "64"))
+    reranker_max_concurrency: int = int(os.getenv("RERANKER_MAX_CONCURRENCY", "4"))
+    reranker_max_queue: int = int(os.getenv("RERANKER_MAX_QUEUE", "32"))
+    # total seconds a query may spend waiting for upstream slots
+    admission_timeout: float = float(os.getenv("ADMISSION_TIMEOUT", "20"))
+
+    # embedding scheduler (app.utils.rate_limit): EMBEDDINGS_MAX_CONCURRENCY caps
+    # the adaptive concurrency, which starts here
+    embeddings_initial_concurrency: int = int(
+        os.getenv("EMBEDDINGS_INITIAL_CONCURRENCY", "4")
+    )
+    # known provider limits per minute; 0 = rely on response headers and 429s
+    embeddings_rpm: float = float(os.getenv("EMBEDDINGS_RPM", "0"))
+    embeddings_tpm: float = float(os.getenv("EMBEDDINGS_TPM", "0"))
+    # retries of one request after rate limits or server errors
+    embeddings_max_retries: int = int(os.getenv("EMBEDDINGS_MAX_RETRIES", "8"))
+
+    # answer greetings, thanks etc. without embedding, search or reranking
+    query_fast_path: bool = os.getenv("QUERY_FAST_PATH", "true").lower() in {
+        "1",
+        "true",
+        "yes",
+        "on",
+    }
+
+    # identical concurrent /query requests share one workflow run
+    query_coalescing: bool = os.getenv("QUERY_COALESCING", "true").lower() in {
+        "1",
+        "true",
+        "yes",
+        "on",
+    }
+
+    # warm indexes, connections and HTTP pools after start-up; /health answers
+    # 503 until the warm-up finishes or WARMUP_TIMEOUT seconds pass
+    warmup: bool = os.getenv("WARMUP", "false").lower() in {
+        "1",
+        "true",
+        "yes",
+        "on",
+    }
+    warmup_timeout: float = float(os.getenv("WARMUP_TIMEOUT", "60"))
+
+    # /query/batch and app.workflow.batch
+    batch_query_concurrency: int = int(os.getenv("BATCH_QUERY_CONCURRENCY", "4"))
+    batch_query_max_questions: int = int(
+        os.getenv("BATCH_QUERY_MAX_QUESTIONS", "256")
+    )
 
     # reranker
     reranker_base_url: str = os.getenv(
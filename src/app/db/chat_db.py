@@ -1,10 +1,17 @@
-"""Database models and operations for chat persistence."""
+"""Database models and operations for chat persistence.
 
+Chats and app-wide settings (such as the active LLM model) live in Postgres,
+by default the database of the vector store, so every API worker and host
+sees the same state. Queries go through a pooled async engine; the tables
+are created by ``python -m app.db.migrations``.
+"""
+
+import asyncio
 import logging
 from datetime import datetime
-from pathlib import Path
-from typing import Any
+from typing import Any, Optional
 
+import psycopg
 from sqlalchemy import (
     JSON,
     Column,
@@ -12,20 +19,35 @@ from sqlalchemy import (
     ForeignKey,
     String,
     Text,
-    create_engine,
+    delete,
+    func,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
 )
-from sqlalchemy.orm import (
-    Session,
-    declarative_base,
-    joinedload,
-    relationship,
-    sessionmaker,
+from sqlalchemy.orm import declarative_base, relationship, selectinload
+
+from app.db.migrations import (
+    CHAT_SCOPE,
+    LATEST_CHAT_VERSION,
+    MIGRATIONS_TABLE,
+    migrate_chat,
 )
 
 logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
+# Key of the active LLM model in app_settings.
+ACTIVE_MODEL_KEY = "llm_model"
+
 
 class ChatSession(Base):
     """Model for chat sessions/conversations."""
@@ -39,11 +61,12 @@ class ChatSession(Base):
         DateTime, default=datetime.now, onupdate=datetime.now, nullable=False
     )
 
-    # Relationship to messages
+    # Relationship to messages; rows are removed by ON DELETE CASCADE
     messages = relationship(
         "ChatMessage",
         back_populates="session",
         cascade="all, delete-orphan",
+        passive_deletes=True,
         order_by="ChatMessage.created_at",
     )
 
@@ -54,7 +77,9 @@ class ChatMessage(Base):
     __tablename__ = "chat_messages"
 
     id = Column(String, primary_key=True)
-    chat_id = Column(String, ForeignKey("chat_sessions.id"), nullable=False)
+    chat_id = Column(
+        String, ForeignKey("chat_sessions.id", ondelete="CASCADE"), nullable=False
+    )
     role = Column(String, nullable=False)  # "user" or "assistant"
     content = Column(Text, nullable=False)
     segments = Column(JSON, nullable=True)  # Store TextSegment list as JSON
@@ -64,89 +89,144 @@ class ChatMessage(Base):
     session = relationship("ChatSession", back_populates="messages")
 
 
+class AppSetting(Base):
+    """App-wide setting shared by every worker."""
+
+    __tablename__ = "app_settings"
+
+    key = Column(String, primary_key=True)
+    value = Column(Text, nullable=False)
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+
+def async_database_url(url: str) -> str:
+    """The SQLAlchemy URL of a Postgres URL, using psycopg's async driver."""
+    return (
+        make_url(url)
+        .set(drivername="postgresql+psycopg")
+        .render_as_string(hide_password=False)
+    )
+
+
 class ChatDB:
     """Database handler for chat operations."""
 
-    def __init__(self, db_path: str = "data/chats.db"):
-        """Initialize database connection."""
-        # Create data directory if it doesn't exist
-        db_file = Path(db_path)
-        db_file.parent.mkdir(parents=True, exist_ok=True)
+    def __init__(
+        self, postgres_url: str, pool_size: int = 5, max_overflow: int = 10
+    ):
+        """Create the connection pool; no connection is opened yet."""
+        self.postgres_url = postgres_url
+        self.engine = create_async_engine(
+            async_database_url(postgres_url),
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_pre_ping=True,
+            echo=False,
+        )
+        self.SessionLocal = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    async def check_schema(self, auto_migrate: bool = False) -> None:
+        """
+        Make sure the chat tables are migrated.
 
-        # Create engine and session
-        self.engine = create_engine(f"sqlite:///{db_path}", echo=False)
-        Base.metadata.create_all(self.engine)
-        self.SessionLocal = sessionmaker(bind=self.engine)
+        Raises:
+            RuntimeError: When chat migrations are pending and
+                ``auto_migrate`` is off.
+        """
+        async with self.engine.connect() as conn:
+            exists = await conn.scalar(
+                text("SELECT to_regclass(:name) IS NOT NULL"),
+                {"name": MIGRATIONS_TABLE},
+            )
+            version = 0
+            if exists:
+                version = await conn.scalar(
+                    text(
+                        f"SELECT coalesce(max(version), 0) FROM {MIGRATIONS_TABLE} "
+                        "WHERE scope = :scope"
+                    ),
+                    {"scope": CHAT_SCOPE},
+                )
+        if version < LATEST_CHAT_VERSION and auto_migrate:
+            await asyncio.to_thread(self._migrate)
+        elif version < LATEST_CHAT_VERSION:
+            raise RuntimeError(
+                f"Chat schema is at version {version}, but version "
+                f"{LATEST_CHAT_VERSION} is required; run `uv run python -m "
+                "app.db.migrations`."
+            )
+        logger.info("Chat database schema is at version %d", LATEST_CHAT_VERSION)
 
-        logger.info(f"Chat database initialized at {db_path}")
+    def _migrate(self) -> None:
+        with psycopg.connect(self.postgres_url) as conn:
+            migrate_chat(conn)
 
-    def get_session(self) -> Session:
+    async def close(self) -> None:
+        """Close every pooled connection."""
+        await self.engine.dispose()
+
+    def get_session(self) -> AsyncSession:
         """Get a new database session."""
         return self.SessionLocal()
 
-    def create_chat(self, chat_id: str, title: str) -> ChatSession:
+    async def create_chat(self, chat_id: str, title: str) -> ChatSession:
         """Create a new chat session."""
-        session = self.get_session()
-        try:
+        async with self.get_session() as session:
             chat = ChatSession(id=chat_id, title=title)
             session.add(chat)
-            session.commit()
-            session.refresh(chat)
+            await session.commit()
             logger.info(f"Created chat session: {chat_id}")
             return chat
-        finally:
-            session.close()
 
-    def get_chat(self, chat_id: str) -> ChatSession | None:
+    async def ensure_chat(self, chat_id: str, title: str) -> bool:
+        """Create a chat session unless it exists; True when it was created."""
+        async with self.get_session() as session:
+            result = await session.execute(
+                insert(ChatSession)
+                .values(id=chat_id, title=title)
+                .on_conflict_do_nothing(index_elements=[ChatSession.id])
+            )
+            await session.commit()
+            if result.rowcount:
+                logger.info(f"Created chat session: {chat_id}")
+                return True
+            return False
+
+    async def get_chat(self, chat_id: str) -> ChatSession | None:
         """Get a chat session by ID with messages eagerly loaded."""
-        session = self.get_session()
-        try:
-            chat = (
-                session.query(ChatSession)
-                .options(joinedload(ChatSession.messages))
-                .filter(ChatSession.id == chat_id)
-                .first()
+        async with self.get_session() as session:
+            return await session.scalar(
+                select(ChatSession)
+                .options(selectinload(ChatSession.messages))
+                .where(ChatSession.id == chat_id)
             )
-            if chat:
-                # Make the instance detached but with all data loaded
-                session.expunge(chat)
-            return chat
-        finally:
-            session.close()
 
-    def list_chats(self, limit: int = 50) -> list[ChatSession]:
+    async def list_chats(self, limit: int = 50) -> list[ChatSession]:
         """List all chat sessions, ordered by most recent with messages eagerly loaded."""
-        session = self.get_session()
-        try:
-            chats = (
-                session.query(ChatSession)
-                .options(joinedload(ChatSession.messages))
+        async with self.get_session() as session:
+            chats = await session.scalars(
+                select(ChatSession)
+                .options(selectinload(ChatSession.messages))
                 .order_by(ChatSession.updated_at.desc())
                 .limit(limit)
-                .all()
             )
-            # Expunge all chats to make them detached but with data loaded
-            for chat in chats:
-                session.expunge(chat)
-            return chats
-        finally:
-            session.close()
-
-    def delete_chat(self, chat_id: str) -> bool:
+            return list(chats)
+
+    async def delete_chat(self, chat_id: str) -> bool:
         """Delete a chat session and all its messages."""
-        session = self.get_session()
-        try:
-            chat = session.query(ChatSession).filter(ChatSession.id == chat_id).first()
-            if chat:
-                session.delete(chat)
-                session.commit()
+        async with self.get_session() as session:
+            result = await session.execute(
+                delete(ChatSession).where(ChatSession.id == chat_id)
+            )
+            await session.commit()
+            if result.rowcount:
                 logger.info(f"Deleted chat session: {chat_id}")
                 return True
             return False
-        finally:
-            session.close()
 
-    def add_message(
+    async def add_message(
         self,
         message_id: str,
         chat_id: str,
@@ -155,8 +235,7 @@ class ChatDB:
         segments: list[dict[str, Any]] | None = None,
     ) -> ChatMessage:
         """Add a message to a chat session."""
-        session = self.get_session()
-        try:
+        async with self.get_session() as session:
             message = ChatMessage(
                 id=message_id,
                 chat_id=chat_id,
@@ -167,26 +246,41 @@ class ChatDB:
             session.add(message)
 
             # Update the chat's updated_at timestamp
-            chat = session.query(ChatSession).filter(ChatSession.id == chat_id).first()
-            if chat:
-                chat.updated_at = datetime.now()
+            await session.execute(
+                update(ChatSession)
+                .where(ChatSession.id == chat_id)
+                .values(updated_at=datetime.now())
+            )
 
-            session.commit()
-            session.refresh(message)
+            await session.commit()
             logger.info(f"Added message to chat {chat_id}")
             return message
-        finally:
-            session.close()
 
-    def get_messages(self, chat_id: str) -> list[ChatMessage]:
+    async def get_messages(self, chat_id: str) -> list[ChatMessage]:
         """Get all messages for a chat session."""
-        session = self.get_session()
-        try:
-            return (
-                session.query(ChatMessage)
-                .filter(ChatMessage.chat_id == chat_id)
+        async with self.get_session() as session:
+            messages = await session.scalars(
+                select(ChatMessage)
+                .where(ChatMessage.chat_id == chat_id)
                 .order_by(ChatMessage.created_at)
-                .all()
             )
-        finally:
-            session.close()
+            return list(messages)
+
+    async def get_setting(self, key: str) -> Optional[str]:
+        """Value of an app-wide setting, or None when it was never set."""
+        async with self.get_session() as session:
+            return await session.scalar(
+                select(AppSetting.value).where(AppSetting.key == key)
+            )
+
+    async def set_setting(self, key: str, value: str) -> None:
+        """Store an app-wide setting; every worker reads it on its next request."""
+        statement = insert(AppSetting).values(key=key, value=value)
+        async with self.get_session() as session:
+            await session.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[AppSetting.key],
+                    set_={"value": statement.excluded.value, "updated_at": func.now()},
+                )
+            )
+            await session.commit()
@@ -0,0 +1,138 @@
+"""Persistence of per-URL HTTP validators and content hashes for web refreshes."""
+
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable
+from urllib.parse import urlsplit
+
+from sqlalchemy import Column, DateTime, String, create_engine, inspect, or_, text
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+
+logger = logging.getLogger(__name__)
+
+Base = declarative_base()
+
+
+class FetchRecord(Base):
+    """Validators and extracted-text hash from the last successful ingest of a URL."""
+
+    __tablename__ = "web_fetch_state"
+
+    url = Column(String, primary_key=True)
+    etag = Column(String, nullable=True)
+    last_modified = Column(String, nullable=True)
+    content_hash = Column(String, nullable=True)
+    # keys of the page's text blocks, space-separated, for boilerplate counts
+    block_keys = Column(String, nullable=True)
+    fetched_at = Column(DateTime, default=datetime.now, nullable=False)
+
+
+class FetchStateDB:
+    """Database handler for web fetch state."""
+
+    def __init__(self, db_path: str = "data/web_fetch_state.db"):
+        """Initialize database connection."""
+        db_file = Path(db_path)
+        db_file.parent.mkdir(parents=True, exist_ok=True)
+
+        self.engine = create_engine(f"sqlite:///{db_path}", echo=False)
+        Base.metadata.create_all(self.engine)
+        self._add_missing_columns()
+        self.SessionLocal = sessionmaker(bind=self.engine, expire_on_commit=False)
+
+        logger.info(f"Fetch state database initialized at {db_path}")
+
+    def _add_missing_columns(self) -> None:
+        """Add columns introduced after a state file was created."""
+        existing = {
+            column["name"]
+            for column in inspect(self.engine).get_columns(FetchRecord.__tablename__)
+        }
+        with self.engine.begin() as conn:
+            for column in FetchRecord.__table__.columns:
+                if column.name not in existing:
+                    conn.execute(
+                        text(
+                            f"ALTER TABLE {FetchRecord.__tablename__} "
+                            f"ADD COLUMN {column.name} {column.type}"
+                        )
+                    )
+
+    def get_session(self) -> Session:
+        """Get a new database session."""
+        return self.SessionLocal()
+
+    def get_records(self, urls: Iterable[str]) -> dict[str, FetchRecord]:
+        """Return the stored records for the given URLs, keyed by URL."""
+        url_list = list(dict.fromkeys(urls))
+        if not url_list:
+            return {}
+        session = self.get_session()
+        try:
+            records = (
+                session.query(FetchRecord).filter(FetchRecord.url.in_(url_list)).all()
+            )
+            for record in records:
+                session.expunge(record)
+            return {record.url: record for record in records}
+        finally:
+            session.close()
+
+    def get_host_records(self, urls: Iterable[str]) -> dict[str, FetchRecord]:
+        """Return the stored records of every URL on the hosts of ``urls``."""
+        prefixes = {
+            f"{parts.scheme}://{parts.netloc}"
+            for parts in map(urlsplit, urls)
+            if parts.netloc
+        }
+        if not prefixes:
+            return {}
+        session = self.get_session()
+        try:
+            records = (
+                session.query(FetchRecord)
+                .filter(
+                    or_(
+                        *(
+                            condition
+                            for prefix in sorted(prefixes)
+                            for condition in (
+                                FetchRecord.url == prefix,
+                                FetchRecord.url.startswith(f"{prefix}/", autoescape=True),
+                            )
+                        )
+                    )
+                )
+                .all()
+            )
+            for record in records:
+                session.expunge(record)
+            return {record.url: record for record in records}
+        finally:
+            session.close()
+
+    def save_records(self, records: Iterable[FetchRecord]) -> int:
+        """Insert or replace fetch records; returns the number saved."""
+        session = self.get_session()
+        try:
+            count = 0
+            for record in records:
+                record.fetched_at = record.fetched_at or datetime.now()
+                session.merge(record)
+                count += 1
+            session.commit()
+            return count
+        finally:
+            session.close()
+
+    def delete_records(self, urls: Iterable[str]) -> None:
+        """Forget the stored state for the given URLs."""
+        session = self.get_session()
+        try:
+            session.query(FetchRecord).filter(FetchRecord.url.in_(list(urls))).delete(
+                synchronize_session=False
+            )
+            session.commit()
+        finally:
+            session.close()
@@ -0,0 +1,427 @@
+"""Versioned schema migrations of the documents and chat tables.
+
+Usage:
+    uv run python -m app.db.migrations          # apply pending migrations
+    uv run python -m app.db.migrations status   # show applied and pending ones
+    uv run python -m app.db.migrations import-chats [data/chats.db]
+
+Each migration runs in its own transaction together with its row in
+``schema_migrations``, under an advisory lock, so concurrent runs apply it
+once. Migrations are additive: workers of the previous release keep working
+after they are applied, so run them before rolling out new workers.
+Versions are recorded per scope: the documents table's name, and ``chat``
+for the chat sessions, messages and app settings. ``VectorDB`` and
+``ChatDB`` only read the recorded version when they connect and refuse to
+start on an older schema, unless ``SCHEMA_AUTO_MIGRATE`` is set.
+
+Every run also builds the search indexes if they are missing (e.g. after an
+interrupted bulk load), unless a bulk load of the table is running.
+"""
+
+import argparse
+import logging
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional
+
+import psycopg
+
+from app.core.config import settings
+from app.db.retrieval_cache import generation_table
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+
+@dataclass(frozen=True, slots=True)
+class Migration:
+    """One schema change; ``apply(cur, scope, embeddings_dim)``."""
+
+    version: int
+    description: str
+    apply: Callable[[psycopg.Cursor, str, int], None]
+
+
+def _create_documents_table(cur: psycopg.Cursor, table: str, dim: int) -> None:
+    cur.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    # Create table with generated tsvector column
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            id UUID PRIMARY KEY,
+            text TEXT NOT NULL,
+            source TEXT,
+            dense_embedding vector({dim}) NOT NULL,
+            text_search tsvector GENERATED ALWAYS AS (to_tsvector('english', text)) STORED,
+            metadata JSONB DEFAULT '{{}}',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    # Create index on source for filtering
+    cur.execute(
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_source ON {table} (source)"
+    )
+
+
+def _add_near_duplicate_columns(cur: psycopg.Cursor, table: str, dim: int) -> None:
+    cur.execute(
+        f"""
+        ALTER TABLE {table}
+            ADD COLUMN IF NOT EXISTS sources TEXT[],
+            ADD COLUMN IF NOT EXISTS minhash INTEGER[],
+            ADD COLUMN IF NOT EXISTS minhash_bands BIGINT[]
+        """
+    )
+    # Fingerprints are filled in when each source is next synced.
+    cur.execute(
+        f"""
+        UPDATE {table} SET sources = array_remove(ARRAY[source], NULL)
+        WHERE sources IS NULL
+        """
+    )
+    # Sources sharing a collapsed row, and near-duplicate lookups
+    cur.execute(
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_sources ON {table} USING gin (sources)"
+    )
+    cur.execute(
+        f"""
+        CREATE INDEX IF NOT EXISTS idx_{table}_minhash_bands
+        ON {table} USING gin (minhash_bands)
+        """
+    )
+
+
+def _create_generation_table(cur: psycopg.Cursor, table: str, dim: int) -> None:
+    # Bumped by every write; invalidates cached search results
+    generation = generation_table(table)
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {generation} (
+            id BOOLEAN PRIMARY KEY DEFAULT true CHECK (id),
+            generation BIGINT NOT NULL DEFAULT 0
+        )
+        """
+    )
+    cur.execute(f"INSERT INTO {generation} DEFAULT VALUES ON CONFLICT DO NOTHING")
+
+
+# Append only; never edit a migration that has been released.
+MIGRATIONS = [
+    Migration(
+        1, "pgvector extension, documents table, source index", _create_documents_table
+    ),
+    Migration(
+        2, "near-duplicate sources and MinHash columns", _add_near_duplicate_columns
+    ),
+    Migration(3, "corpus generation counter", _create_generation_table),
+]
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def _create_chat_tables(cur: psycopg.Cursor, scope: str, dim: int) -> None:
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS chat_sessions (
+            id TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT now(),
+            updated_at TIMESTAMP NOT NULL DEFAULT now()
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS chat_messages (
+            id TEXT PRIMARY KEY,
+            chat_id TEXT NOT NULL REFERENCES chat_sessions (id) ON DELETE CASCADE,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            segments JSON,
+            created_at TIMESTAMP NOT NULL DEFAULT now()
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_chat_messages_chat_id
+        ON chat_messages (chat_id, created_at)
+        """
+    )
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_chat_sessions_updated_at
+        ON chat_sessions (updated_at DESC)
+        """
+    )
+    # App-wide settings shared by every worker, e.g. the active LLM model
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS app_settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """
+    )
+
+
+CHAT_SCOPE = "chat"
+CHAT_MIGRATIONS = [
+    Migration(1, "chat sessions, messages and app settings", _create_chat_tables),
+]
+LATEST_CHAT_VERSION = CHAT_MIGRATIONS[-1].version
+
+
+def search_index_statements(table: str) -> dict[str, str]:
+    """DDL of the indexes that are expensive to maintain on every insert."""
+    return {
+        # HNSW index for dense vectors (cosine similarity)
+        f"idx_{table}_dense": f"""
+            CREATE INDEX IF NOT EXISTS idx_{table}_dense
+            ON {table}
+            USING hnsw (dense_embedding vector_cosine_ops)
+            """,
+        # GIN index for full-text search
+        f"idx_{table}_fts": f"""
+            CREATE INDEX IF NOT EXISTS idx_{table}_fts
+            ON {table}
+            USING GIN (text_search)
+            """,
+    }
+
+
+def bulk_load_key(table: str) -> str:
+    return f"bulk-load:{table}"
+
+
+def bulk_load_active(cur: psycopg.Cursor, table: str) -> bool:
+    """Whether another session holds the bulk-load lock on this table."""
+    cur.execute(
+        "SELECT pg_try_advisory_lock_shared(hashtext(%s))", (bulk_load_key(table),)
+    )
+    acquired = cur.fetchone()[0]
+    if acquired:
+        cur.execute(
+            "SELECT pg_advisory_unlock_shared(hashtext(%s))", (bulk_load_key(table),)
+        )
+    return not acquired
+
+
+def schema_version(conn: psycopg.Connection, scope: str) -> int:
+    """Latest migration applied to ``scope``; 0 before the first one."""
+    exists = conn.execute(
+        "SELECT to_regclass(%s) IS NOT NULL", (MIGRATIONS_TABLE,)
+    ).fetchone()[0]
+    if not exists:
+        return 0
+    return conn.execute(
+        f"SELECT coalesce(max(version), 0) FROM {MIGRATIONS_TABLE} WHERE scope = %s",
+        (scope,),
+    ).fetchone()[0]
+
+
+def ensure_search_indexes(conn: psycopg.Connection, table: str) -> bool:
+    """
+    Create missing search indexes, unless a bulk load will build them.
+
+    Returns:
+        False when a running bulk load deferred them.
+    """
+    with conn.cursor() as cur:
+        if bulk_load_active(cur, table):
+            conn.commit()
+            logger.info(
+                f"Search indexes of '{table}' deferred until the running bulk "
+                "load finishes"
+            )
+            return False
+        for statement in search_index_statements(table).values():
+            cur.execute(statement)
+    conn.commit()
+    return True
+
+
+@contextmanager
+def _migration_lock(conn: psycopg.Connection) -> Iterator[None]:
+    """Serialize migration runs and create the migrations table."""
+    # One lock for all scopes: they share the migrations table.
+    conn.execute("SELECT pg_advisory_lock(hashtext(%s))", (MIGRATIONS_TABLE,))
+    conn.commit()
+    try:
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+                scope TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                description TEXT NOT NULL,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                PRIMARY KEY (scope, version)
+            )
+            """
+        )
+        conn.commit()
+        yield
+    finally:
+        conn.rollback()
+        conn.execute("SELECT pg_advisory_unlock(hashtext(%s))", (MIGRATIONS_TABLE,))
+        conn.commit()
+
+
+def _apply_pending(
+    conn: psycopg.Connection,
+    scope: str,
+    migrations: list[Migration],
+    embeddings_dim: int,
+) -> list[Migration]:
+    current = schema_version(conn, scope)
+    applied: list[Migration] = []
+    for migration in migrations:
+        if migration.version <= current:
+            continue
+        started = time.monotonic()
+        try:
+            with conn.cursor() as cur:
+                migration.apply(cur, scope, embeddings_dim)
+                cur.execute(
+                    f"""
+                    INSERT INTO {MIGRATIONS_TABLE} (scope, version, description)
+                    VALUES (%s, %s, %s)
+                    """,
+                    (scope, migration.version, migration.description),
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(migration)
+        logger.info(
+            f"Applied migration {migration.version} to '{scope}' "
+            f"({migration.description}) in {time.monotonic() - started:.2f}s"
+        )
+    return applied
+
+
+def migrate(
+    conn: psycopg.Connection, table: str, embeddings_dim: int
+) -> list[Migration]:
+    """Apply the pending migrations of ``table`` and return them."""
+    with _migration_lock(conn):
+        applied = _apply_pending(conn, table, MIGRATIONS, embeddings_dim)
+        ensure_search_indexes(conn, table)
+    return applied
+
+
+def migrate_chat(conn: psycopg.Connection) -> list[Migration]:
+    """Apply the pending migrations of the chat tables and return them."""
+    with _migration_lock(conn):
+        return _apply_pending(conn, CHAT_SCOPE, CHAT_MIGRATIONS, 0)
+
+
+def import_sqlite_chats(conn: psycopg.Connection, path: str) -> tuple[int, int]:
+    """
+    Copy chats from the SQLite file of earlier releases; existing IDs are kept.
+
+    Returns:
+        The number of chats and messages inserted.
+    """
+    source = sqlite3.connect(path)
+    try:
+        chats = source.execute(
+            "SELECT id, title, created_at, updated_at FROM chat_sessions"
+        ).fetchall()
+        messages = source.execute(
+            """
+            SELECT id, chat_id, role, content, segments, created_at
+            FROM chat_messages
+            """
+        ).fetchall()
+    finally:
+        source.close()
+    inserted = []
+    with conn.cursor() as cur:
+        for statement, rows in (
+            (
+                """
+                INSERT INTO chat_sessions (id, title, created_at, updated_at)
+                VALUES (%s, %s, %s, %s) ON CONFLICT (id) DO NOTHING
+                """,
+                chats,
+            ),
+            (
+                """
+                INSERT INTO chat_messages
+                    (id, chat_id, role, content, segments, created_at)
+                VALUES (%s, %s, %s, %s, %s, %s) ON CONFLICT (id) DO NOTHING
+                """,
+                messages,
+            ),
+        ):
+            count = 0
+            for row in rows:
+                cur.execute(statement, row)
+                count += cur.rowcount
+            inserted.append(count)
+    conn.commit()
+    return inserted[0], inserted[1]
+
+
+def _print_status(conn: psycopg.Connection, scope: str, migrations: list[Migration]):
+    current = schema_version(conn, scope)
+    print(f"'{scope}' is at schema version {current} of {migrations[-1].version}.")
+    for migration in migrations:
+        state = "applied" if migration.version <= current else "pending"
+        print(f"  {migration.version:>3}  {state:<8} {migration.description}")
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Versioned schema migrations of the documents and chat tables."
+    )
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("up", help="Apply pending migrations (default).")
+    commands.add_parser("status", help="Show applied and pending migrations.")
+    import_chats = commands.add_parser(
+        "import-chats", help="Copy chats from an earlier release's SQLite file."
+    )
+    import_chats.add_argument("path", nargs="?", default="data/chats.db")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    table = settings.postgres_table_name
+    chat_url = settings.chat_db_url or settings.postgres_url
+    if args.command == "status":
+        with psycopg.connect(settings.postgres_url) as conn:
+            _print_status(conn, table, MIGRATIONS)
+        with psycopg.connect(chat_url) as conn:
+            _print_status(conn, CHAT_SCOPE, CHAT_MIGRATIONS)
+        return
+    if args.command == "import-chats":
+        with psycopg.connect(chat_url) as conn:
+            if schema_version(conn, CHAT_SCOPE) < LATEST_CHAT_VERSION:
+                raise SystemExit("Run the migrations before importing chats.")
+            chats, messages = import_sqlite_chats(conn, args.path)
+        print(f"Imported {chats} chats and {messages} messages from {args.path}.")
+        return
+
+    with psycopg.connect(settings.postgres_url) as conn:
+        applied = migrate(conn, table, settings.embeddings_dim)
+    with psycopg.connect(chat_url) as conn:
+        applied += migrate_chat(conn)
+    if applied:
+        print(
+            f"Applied {len(applied)} migrations; '{table}' is at schema version "
+            f"{LATEST_VERSION} and '{CHAT_SCOPE}' at {LATEST_CHAT_VERSION}."
+        )
+    else:
+        print(
+            f"Up to date: '{table}' at schema version {LATEST_VERSION}, "
+            f"'{CHAT_SCOPE}' at {LATEST_CHAT_VERSION}."
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""Routing of search queries to Postgres read replicas.
+
+Searches can be sent to the replicas listed in ``POSTGRES_READ_URLS``, while
+writes, DDL and the generation listener stay on the primary. A checker
+thread per process reconnects to each replica every few seconds and reads
+its corpus generation. The generation is polled because LISTEN does not work
+on a hot standby. A replica is skipped while it is down. With a lag limit
+set, it is also skipped while its generation is too far behind the
+primary's. When no replica is usable, searches run on the primary.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+import psycopg
+from pgvector.psycopg import register_vector
+from psycopg.conninfo import conninfo_to_dict
+
+from app.db.retrieval_cache import generation_table
+
+logger = logging.getLogger(__name__)
+
+# Seconds a replica may take to accept a connection before it counts as down.
+CONNECT_TIMEOUT_SECONDS = 5
+
+
+def replica_label(url: str) -> str:
+    """``host:port/dbname`` of a DSN, without credentials."""
+    params = conninfo_to_dict(url)
+    host = params.get("host") or "localhost"
+    return f"{host}:{params.get('port') or 5432}/{params.get('dbname') or ''}"
+
+
+class ReadReplica:
+    """One replica: its search connection, health and last seen generation."""
+
+    def __init__(self, url: str, table_name: str):
+        self.url = url
+        self.label = replica_label(url)
+        self.generation_table = generation_table(table_name)
+        self.conn: Optional[psycopg.Connection] = None
+        self.healthy = False
+        self.generation: Optional[int] = None
+        self.checked_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.in_flight = 0
+        self.searches = 0
+        self.errors = 0
+
+    def check(self) -> None:
+        """Reconnect when needed and read the replica's generation."""
+        try:
+            if self.conn is None or self.conn.closed:
+                conn = psycopg.connect(
+                    self.url, autocommit=True, connect_timeout=CONNECT_TIMEOUT_SECONDS
+                )
+                register_vector(conn)
+                self.conn = conn
+            row = self.conn.execute(
+                f"SELECT generation FROM {self.generation_table}"
+            ).fetchone()
+        except Exception as exc:
+            self.mark_down(exc)
+            return
+        # A replica only moves forward, so this is a lower bound until the
+        # next check.
+        self.generation = int(row[0]) if row else 0
+        self.checked_at = time.monotonic()
+        if not self.healthy:
+            logger.info(
+                f"Read replica {self.label} is up at generation {self.generation}"
+            )
+        self.healthy = True
+
+    def mark_down(self, exc: Exception) -> None:
+        """Stop routing searches here until the next successful check."""
+        if self.healthy or self.last_error is None:
+            logger.warning(f"Read replica {self.label} is down: {exc}")
+        self.healthy = False
+        self.last_error = str(exc)
+        if self.conn is not None:
+            self.conn.close()
+
+    def cache_generation(self, generation: Optional[int]) -> Optional[int]:
+        """
+        Generation to cache this replica's results under.
+
+        A lagging replica's results are stored under its own, older
+        generation, which the cache ignores, so they never replace results
+        of the primary's current generation.
+        """
+        if generation is None or self.generation is None:
+            return None
+        return min(generation, self.generation)
+
+
+class ReplicaRouter:
+    """
+    Spreads searches over healthy read replicas.
+
+    Each search goes to the usable replica with the fewest searches in
+    flight, and ties go to the one that served the fewest so far. A replica
+    is usable when its last check succeeded and, with ``max_lag`` set to
+    zero or more, it trails the primary by at most ``max_lag`` generations.
+    """
+
+    def __init__(self, urls: list[str], table_name: str, check_seconds: float):
+        self.replicas = [ReadReplica(url, table_name) for url in urls]
+        self.check_seconds = max(0.5, check_seconds)
+        self.primary_generation: Optional[int] = None
+        self.fallbacks = {"down": 0, "lag": 0, "error": 0}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the checker thread; the first check runs right away."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._check_loop, name="read-replicas", daemon=True
+                )
+                self._thread.start()
+
+    def check_now(self) -> None:
+        """Check every replica in the calling thread."""
+        self.start()
+        for replica in self.replicas:
+            replica.check()
+
+    def acquire(
+        self, primary_generation: Optional[int], max_lag: int
+    ) -> Optional[ReadReplica]:
+        """
+        Reserve a replica, or return None to use the primary.
+
+        The reservation counts as a search in flight until :meth:`release`.
+        """
+        self.start()
+        with self._lock:
+            if primary_generation is not None:
+                self.primary_generation = primary_generation
+            candidates = [replica for replica in self.replicas if replica.healthy]
+            if not candidates:
+                self.fallbacks["down"] += 1
+                return None
+            if max_lag >= 0 and primary_generation is not None:
+                candidates = [
+                    replica
+                    for replica in candidates
+                    if replica.generation is not None
+                    and primary_generation - replica.generation <= max_lag
+                ]
+                if not candidates:
+                    self.fallbacks["lag"] += 1
+                    return None
+            replica = min(candidates, key=lambda r: (r.in_flight, r.searches))
+            replica.in_flight += 1
+            return replica
+
+    def release(self, replica: ReadReplica) -> None:
+        with self._lock:
+            replica.in_flight -= 1
+
+    def served(self, replica: ReadReplica) -> None:
+        """Count one search run on a reserved replica."""
+        with self._lock:
+            replica.searches += 1
+
+    def failed(self, replica: ReadReplica, exc: Exception) -> None:
+        """Record a failed search; the caller retries it on the primary."""
+        with self._lock:
+            replica.errors += 1
+            self.fallbacks["error"] += 1
+        replica.mark_down(exc)
+
+    @contextmanager
+    def route(
+        self, primary_generation: Optional[int], max_lag: int
+    ) -> Iterator[Optional[ReadReplica]]:
+        """Reserve a replica, or None, for one search."""
+        replica = self.acquire(primary_generation, max_lag)
+        if replica is not None:
+            self.served(replica)
+        try:
+            yield replica
+        finally:
+            if replica is not None:
+                self.release(replica)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "primary_generation": self.primary_generation,
+                "fallbacks": dict(self.fallbacks),
+                "replicas": {
+                    replica.label: {
+                        "healthy": replica.healthy,
+                        "generation": replica.generation,
+                        "lag": (
+                            self.primary_generation - replica.generation
+                            if self.primary_generation is not None
+                            and replica.generation is not None
+                            else None
+                        ),
+                        "checked_seconds_ago": (
+                            now - replica.checked_at
+                            if replica.checked_at is not None
+                            else None
+                        ),
+                        "in_flight": replica.in_flight,
+                        "searches": replica.searches,
+                        "errors": replica.errors,
+                        "last_error": replica.last_error,
+                    }
+                    for replica in self.replicas
+                },
+            }
+
+    def _check_loop(self) -> None:
+        stopped = threading.Event()
+        while True:
+            for replica in self.replicas:
+                replica.check()
+            stopped.wait(self.check_seconds)
+
+
+_registry_lock = threading.Lock()
+_routers: dict[tuple[tuple[str, ...], str], ReplicaRouter] = {}
+
+
+def parse_read_urls(value: str) -> list[str]:
+    """The DSNs of a comma-separated ``POSTGRES_READ_URLS`` value."""
+    return [url.strip() for url in value.split(",") if url.strip()]
+
+
+def replica_router(
+    urls: list[str], table_name: str, check_seconds: float
+) -> ReplicaRouter:
+    """The process-wide router of a documents table's replicas."""
+    key = (tuple(urls), table_name)
+    with _registry_lock:
+        if key not in _routers:
+            _routers[key] = ReplicaRouter(urls, table_name, check_seconds)
+        return _routers[key]
+
+
+def read_replica_metrics() -> dict[str, Any]:
+    """Snapshot of every replica router, by documents table."""
+    with _registry_lock:
+        routers = dict(_routers)
+    return {table: router.snapshot() for (_, table), router in routers.items()}
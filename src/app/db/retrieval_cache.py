@@ -0,0 +1,303 @@
+"""Cache of hybrid search results, invalidated by a corpus generation number.
+
+Every write to the documents table bumps a single-row generation counter in
+the same transaction and announces the new value with ``NOTIFY``. A listener
+thread per process keeps the latest generation in memory, so a cache lookup
+costs no Postgres round trip; when the listener is down, the generation is
+read from the table instead. Results are cached as chunk IDs and scores only,
+and chunk rows are kept in a separate, size-bounded LRU, so entries that
+share chunks share their text.
+"""
+
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable, Optional
+
+import psycopg
+
+logger = logging.getLogger(__name__)
+
+# Seconds between re-reads of the generation by the listener, in case a
+# notification was missed.
+LISTEN_REFRESH_SECONDS = 30.0
+# Seconds before the listener reconnects after an error.
+LISTEN_RETRY_SECONDS = 5.0
+# Rough per-row overhead of the cached tuple, dict and strings, in bytes.
+ROW_OVERHEAD_BYTES = 200
+
+ChunkRow = tuple[str, Optional[str], dict[str, Any]]
+
+
+def generation_table(table_name: str) -> str:
+    return f"{table_name}_generation"
+
+
+class CorpusGeneration:
+    """Latest generation of a documents table, kept current by LISTEN/NOTIFY."""
+
+    def __init__(self, postgres_url: str, table_name: str):
+        self.postgres_url = postgres_url
+        self.table = generation_table(table_name)
+        self.channel = self.table
+        self._value: Optional[int] = None
+        self._listening = False
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def bump(self, cur: psycopg.Cursor) -> int:
+        """
+        Increment the generation inside the caller's write transaction.
+
+        The notification is delivered on commit, so no reader sees the new
+        generation before the rows written with it. Call :meth:`observe` with
+        the returned value after committing.
+        """
+        generation = cur.execute(
+            f"UPDATE {self.table} SET generation = generation + 1 "
+            "RETURNING generation"
+        ).fetchone()[0]
+        cur.execute("SELECT pg_notify(%s, %s)", (self.channel, str(generation)))
+        return generation
+
+    def observe(self, generation: int) -> None:
+        """Record a generation seen by this process; it never goes backwards."""
+        with self._lock:
+            if self._value is None or generation > self._value:
+                self._value = generation
+
+    def current(self, conn: psycopg.Connection) -> int:
+        """
+        The latest committed generation.
+
+        Served from memory while the listener is connected; otherwise read
+        through ``conn``.
+        """
+        self._start_listener()
+        with self._lock:
+            if self._listening and self._value is not None:
+                return self._value
+        generation = self._read(conn)
+        self.observe(generation)
+        return generation
+
+    @property
+    def listening(self) -> bool:
+        return self._listening
+
+    def _read(self, conn: psycopg.Connection) -> int:
+        row = conn.execute(f"SELECT generation FROM {self.table}").fetchone()
+        return int(row[0]) if row else 0
+
+    def _start_listener(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._listen, name="corpus-generation", daemon=True
+                )
+                self._thread.start()
+
+    def _listen(self) -> None:
+        stopped = threading.Event()
+        while True:
+            try:
+                with psycopg.connect(self.postgres_url, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {self.channel}")
+                    # Read after LISTEN so no bump can fall in between.
+                    self.observe(self._read(conn))
+                    self._listening = True
+                    while True:
+                        for notify in conn.notifies(timeout=LISTEN_REFRESH_SECONDS):
+                            self.observe(int(notify.payload))
+                        self.observe(self._read(conn))
+            except Exception as exc:
+                self._listening = False
+                logger.warning(
+                    f"Corpus generation listener for {self.table} failed: {exc}"
+                )
+            stopped.wait(LISTEN_RETRY_SECONDS)
+
+
+@dataclass(slots=True)
+class RetrievalCacheStats:
+    """Counters of the retrieval result cache."""
+
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    row_evictions: int = 0
+    row_fetches: int = 0
+    invalidations: int = 0
+
+
+class RetrievalCache:
+    """
+    LRU of search results as ``(chunk_id, score)`` lists, per corpus generation.
+
+    ``max_entries`` bounds the number of cached searches and ``max_bytes`` the
+    approximate size of the cached chunk rows. Everything is dropped when the
+    generation changes.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max(0, max_bytes)
+        self.stats = RetrievalCacheStats()
+        self._generation: Optional[int] = None
+        self._entries: OrderedDict[Hashable, list[tuple[str, float]]] = OrderedDict()
+        self._rows: OrderedDict[str, tuple[ChunkRow, int]] = OrderedDict()
+        self._row_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(
+        self, generation: int, key: Hashable
+    ) -> Optional[tuple[list[tuple[str, float]], dict[str, ChunkRow]]]:
+        """
+        Return the cached ``(id, score)`` list and the cached rows among them.
+
+        Rows evicted since the search was stored are missing from the dict and
+        have to be fetched by ID.
+        """
+        with self._lock:
+            self._check_generation(generation)
+            hits = self._entries.get(key)
+            if hits is None:
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            rows = {}
+            for chunk_id, _ in hits:
+                cached = self._rows.get(chunk_id)
+                if cached is not None:
+                    self._rows.move_to_end(chunk_id)
+                    rows[chunk_id] = cached[0]
+            return list(hits), rows
+
+    def put(
+        self,
+        generation: int,
+        key: Hashable,
+        hits: list[tuple[str, float]],
+        rows: dict[str, ChunkRow],
+    ) -> None:
+        """Store a search computed against ``generation`` and its rows."""
+        with self._lock:
+            self._check_generation(generation)
+            if generation != self._generation:
+                return
+            self._entries[key] = list(hits)
+            self._entries.move_to_end(key)
+            self.stats.stores += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+            self._add_rows(rows)
+
+    def add_rows(self, generation: int, rows: dict[str, ChunkRow]) -> None:
+        """Cache rows fetched by ID for an entry whose rows were evicted."""
+        with self._lock:
+            self._check_generation(generation)
+            if generation == self._generation:
+                self.stats.row_fetches += 1
+                self._add_rows(rows)
+
+    def _add_rows(self, rows: dict[str, ChunkRow]) -> None:
+        for chunk_id, row in rows.items():
+            previous = self._rows.pop(chunk_id, None)
+            if previous is not None:
+                self._row_bytes -= previous[1]
+            size = _row_size(row)
+            self._rows[chunk_id] = (row, size)
+            self._row_bytes += size
+        while self._rows and self._row_bytes > self.max_bytes:
+            _, (_, size) = self._rows.popitem(last=False)
+            self._row_bytes -= size
+            self.stats.row_evictions += 1
+
+    def _check_generation(self, generation: int) -> None:
+        if self._generation == generation:
+            return
+        if self._generation is not None and generation < self._generation:
+            # A reader with a stale generation must not wipe newer entries.
+            return
+        if self._entries or self._rows:
+            self.stats.invalidations += 1
+        self._entries.clear()
+        self._rows.clear()
+        self._row_bytes = 0
+        self._generation = generation
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            stats = self.stats
+            lookups = stats.hits + stats.misses
+            return {
+                "generation": self._generation,
+                "entries": len(self._entries),
+                "rows": len(self._rows),
+                "row_bytes": self._row_bytes,
+                "hits": stats.hits,
+                "misses": stats.misses,
+                "hit_ratio": stats.hits / lookups if lookups else 0.0,
+                "stores": stats.stores,
+                "evictions": stats.evictions,
+                "row_evictions": stats.row_evictions,
+                "row_fetches": stats.row_fetches,
+                "invalidations": stats.invalidations,
+            }
+
+
+def _row_size(row: ChunkRow) -> int:
+    text, source, metadata = row
+    return (
+        ROW_OVERHEAD_BYTES
+        + len(text)
+        + len(source or "")
+        + len(json.dumps(metadata, default=str))
+    )
+
+
+_registry_lock = threading.Lock()
+_generations: dict[tuple[str, str], CorpusGeneration] = {}
+_caches: dict[tuple[str, str], RetrievalCache] = {}
+
+
+def corpus_generation(postgres_url: str, table_name: str) -> CorpusGeneration:
+    """The process-wide generation tracker of a documents table."""
+    key = (postgres_url, table_name)
+    with _registry_lock:
+        if key not in _generations:
+            _generations[key] = CorpusGeneration(postgres_url, table_name)
+        return _generations[key]
+
+
+def retrieval_cache(
+    postgres_url: str, table_name: str, max_entries: int, max_bytes: int
+) -> RetrievalCache:
+    """The process-wide result cache of a documents table."""
+    key = (postgres_url, table_name)
+    with _registry_lock:
+        if key not in _caches:
+            _caches[key] = RetrievalCache(max_entries, max_bytes)
+        return _caches[key]
+
+
+def retrieval_cache_metrics() -> dict[str, Any]:
+    """Snapshot of every result cache and its generation listener, by table."""
+    with _registry_lock:
+        caches = dict(_caches)
+        generations = dict(_generations)
+    metrics = {}
+    for (url, table), cache in caches.items():
+        generation = generations.get((url, table))
+        metrics[table] = {
+            **cache.snapshot(),
+            "listening": generation.listening if generation else False,
+        }
+    return metrics
@@ -0,0 +1,155 @@
+"""Per-query choice of hybrid search branches and prefetch depth.
+
+The dense branch needs a query embedding and an HNSW scan; the full-text
+branch ranks every row matching the ``plainto_tsquery`` (all terms must
+match). Neither helps every query: single keywords and identifiers are found
+precisely by full-text search, long natural-language questions rarely match
+all of their terms, and very common terms make ranking expensive without
+narrowing anything down. The planner picks the branches from cheap features
+of the query and the selectivity Postgres' own statistics predict for it.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+# Queries of at most this many words are "keyword" queries.
+SHORT_QUERY_WORDS = 2
+# Questions of at least this many words rarely match every term.
+LONG_QUERY_WORDS = 6
+# Selectivity Postgres assumes for a lexeme missing from the statistics.
+DEFAULT_LEXEME_FREQUENCY = 0.005
+
+_IDENTIFIER = re.compile(
+    r"""
+    \w+(?:(?:\.|::|/|\\)\w+)+  # dotted, namespaced or path-like: os.path, a::b
+    | \w*_\w+                 # snake_case
+    | [a-z]+[A-Z]\w*          # camelCase
+    | [A-Z]{2,}\w*            # ACRONYMS, CONSTANTS
+    | [^\W\d_]+\W?\d\w*       # letters then digits: e5, gpt-4, v2
+    | \d+[^\W\d_]\w*          # digits then letters: 0x1f, 3d
+    """,
+    re.VERBOSE,
+)
+
+
+@dataclass(slots=True)
+class FtsStats:
+    """Row count and lexeme frequencies of the ``text_search`` column."""
+
+    rows: float
+    frequencies: dict[str, float]
+    min_frequency: float
+
+    def lexeme_frequency(self, lexeme: str) -> float:
+        # Mirrors tsmatchsel(): lexemes outside the most-common list are
+        # assumed rarer than the rarest one in it.
+        frequency = self.frequencies.get(lexeme)
+        if frequency is None:
+            return min(DEFAULT_LEXEME_FREQUENCY, self.min_frequency / 2)
+        return frequency
+
+
+@dataclass(slots=True)
+class QueryFeatures:
+    """Cheap features of a search query."""
+
+    words: int
+    identifiers: int
+    lexemes: int
+    # Estimated rows matching all lexemes; None without table statistics.
+    estimated_matches: Optional[float] = None
+    match_fraction: Optional[float] = None
+
+
+@dataclass(slots=True)
+class RetrievalPlan:
+    """Branches to run for one query and how deep each one fetches."""
+
+    dense_k: int
+    fts_k: int
+    reason: str
+    features: Optional[QueryFeatures] = None
+
+    @property
+    def dense(self) -> bool:
+        return self.dense_k > 0
+
+    @property
+    def fts(self) -> bool:
+        return self.fts_k > 0
+
+    def describe(self) -> str:
+        branches = []
+        if self.dense:
+            branches.append(f"dense(k={self.dense_k})")
+        if self.fts:
+            branches.append(f"fts(k={self.fts_k})")
+        text = "+".join(branches) + f" [{self.reason}]"
+        features = self.features
+        if features is not None:
+            text += f" words={features.words} identifiers={features.identifiers}"
+            text += f" lexemes={features.lexemes}"
+            if features.estimated_matches is not None:
+                text += f" est_matches={features.estimated_matches:.1f}"
+        return text
+
+
+def count_identifiers(query: str) -> int:
+    """Number of words that look like code, IDs, versions or acronyms."""
+    words = (word.strip(".,;:!?()[]{}\"'") for word in query.split())
+    return sum(1 for word in words if word and _IDENTIFIER.fullmatch(word))
+
+
+def query_features(
+    query: str, lexemes: list[str], stats: Optional[FtsStats]
+) -> QueryFeatures:
+    """Build the features of a query from its lexemes and column statistics."""
+
+    features = QueryFeatures(
+        words=len(query.split()),
+        identifiers=count_identifiers(query),
+        lexemes=len(lexemes),
+    )
+    if stats is not None and stats.rows > 0 and lexemes:
+        fraction = 1.0
+        for lexeme in lexemes:
+            fraction *= stats.lexeme_frequency(lexeme)
+        features.match_fraction = fraction
+        features.estimated_matches = fraction * stats.rows
+    return features
+
+
+def plan_retrieval(
+    features: QueryFeatures,
+    top_k: int,
+    prefetch_factor: int = 3,
+    max_match_fraction: float = 0.2,
+) -> RetrievalPlan:
+    """
+    Choose the branches and prefetch depth for a query.
+
+    Both branches fetch ``top_k * prefetch_factor`` candidates for fusion; a
+    single branch fetches ``top_k``. An FTS-only plan is only chosen when the
+    statistics promise at least ``top_k`` matches, and callers fall back to
+    the dense branch when it still comes up short.
+    """
+
+    deep = top_k * max(1, prefetch_factor)
+    matches = features.estimated_matches
+    keyword_query = features.words <= SHORT_QUERY_WORDS or (
+        features.identifiers * 2 >= features.words
+    )
+
+    if features.lexemes == 0:
+        return RetrievalPlan(top_k, 0, "no searchable terms", features)
+    if matches is not None and not features.identifiers:
+        if matches < 1 and features.words >= LONG_QUERY_WORDS:
+            return RetrievalPlan(
+                top_k, 0, "long question unlikely to match all terms", features
+            )
+        if (features.match_fraction or 0.0) > max_match_fraction:
+            return RetrievalPlan(top_k, 0, "terms too common to rank", features)
+    if keyword_query and matches is not None and matches >= top_k:
+        return RetrievalPlan(0, top_k, "keyword or identifier query", features)
+    return RetrievalPlan(deep, deep, "hybrid", features)
@@ -1,17 +1,121 @@
 import json
 import logging
+import threading
+import time
 import uuid
-from typing import Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from queue import Queue
+from typing import Any, Iterator, Mapping, Optional, Sequence
 
 import numpy as np
 import psycopg
 from openai import OpenAI
 from pgvector.psycopg import register_vector
 
+from app.db.migrations import (
+    LATEST_VERSION,
+    bulk_load_key,
+    migrate,
+    schema_version,
+    search_index_statements,
+)
+from app.db.read_replicas import ReadReplica, parse_read_urls, replica_router
+from app.db.retrieval_cache import (
+    ChunkRow,
+    corpus_generation,
+    retrieval_cache,
+)
+from app.db.retrieval_planner import (
+    FtsStats,
+    RetrievalPlan,
+    plan_retrieval,
+    query_features,
+)
 from app.models.models import Document, SearchResult
+from app.utils.near_duplicates import NearDuplicateIndex, lsh_bands, minhash
+from app.utils.rate_limit import Priority, embedding_scheduler, estimate_tokens
+from app.utils.progress import progress_bar
+from app.utils.single_flight import normalize_question
 
 logger = logging.getLogger(__name__)
 
+# Chunk offsets shift whenever earlier text changes, so they are kept out of the
+# stable chunk ID; otherwise every chunk after an edit would be re-embedded.
+POSITIONAL_METADATA_KEYS = ("start_index", "end_index")
+# Seconds the text_search statistics used by the retrieval planner are cached.
+FTS_STATS_TTL = 300.0
+
+
+@dataclass(slots=True)
+class SourceSyncStats:
+    """Row counts from replacing the chunks of one source."""
+
+    inserted: int = 0
+    deleted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    # chunks stored as one more source of a near-duplicate row
+    collapsed: int = 0
+    # IDs of chunks that had no embedding and whose row, or the row they
+    # collapse into, was not stored; they need embedding after all
+    missing: list[str] = field(default_factory=list)
+
+
+class _IndexBuildProgress(threading.Thread):
+    """Shows the progress of a CREATE INDEX running on another connection."""
+
+    def __init__(self, postgres_url: str, table_name: str, index_name: str):
+        super().__init__(name="index-build-progress", daemon=True)
+        self.postgres_url = postgres_url
+        self.table_name = table_name
+        self.index_name = index_name
+        self._stopped = threading.Event()
+
+    def __enter__(self) -> "_IndexBuildProgress":
+        self.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stopped.set()
+        self.join()
+
+    def run(self) -> None:
+        description = f"Building {self.index_name}"
+        try:
+            conn = psycopg.connect(self.postgres_url, autocommit=True)
+        except Exception as exc:
+            logger.warning(f"Index build progress unavailable: {exc}")
+            return
+        done = 0.0
+        with conn, progress_bar(description) as progress:
+            task = progress.add_task(description, total=None)
+            while not self._stopped.wait(0.5):
+                # HNSW reports tuples while loading, GIN reports blocks.
+                row = conn.execute(
+                    """
+                    SELECT phase, tuples_done, tuples_total, blocks_done, blocks_total
+                    FROM pg_stat_progress_create_index
+                    WHERE relid = %s::regclass
+                    """,
+                    (self.table_name,),
+                ).fetchone()
+                if row is None:
+                    continue
+                phase, tuples_done, tuples_total, blocks_done, blocks_total = row
+                if tuples_total:
+                    current, total = tuples_done, tuples_total
+                else:
+                    current, total = blocks_done, blocks_total
+                progress.update(
+                    task,
+                    description=f"{description} ({phase})",
+                    total=total or None,
+                    advance=max(0.0, current - done),
+                )
+                done = max(done, current)
+
 
 class VectorDB:
     """Vector database client for PostgreSQL with pgvector and hybrid search capabilities."""
@@ -20,24 +124,51 @@ class VectorDB:
         self.embeddings_model = config.embeddings_model
         self.embeddings_dim = config.embeddings_dim
         self.table_name = config.postgres_table_name
+        self.postgres_url = config.postgres_url
+        self._generation = corpus_generation(self.postgres_url, self.table_name)
+        self._cache = (
+            retrieval_cache(
+                self.postgres_url,
+                self.table_name,
+                config.retrieval_cache_max_entries,
+                int(config.retrieval_cache_max_mb * 1024 * 1024),
+            )
+            if config.retrieval_cache
+            else None
+        )
+        self.retrieval_planner = config.retrieval_planner
+        self.retrieval_prefetch_factor = max(1, config.retrieval_prefetch_factor)
+        self.retrieval_fts_max_match_fraction = (
+            config.retrieval_fts_max_match_fraction
+        )
+        self._fts_stats_cache: tuple[float, Optional[FtsStats]] = (
+            -FTS_STATS_TTL,
+            None,
+        )
+        self._fts_stats_lock = threading.Lock()
+        read_urls = parse_read_urls(config.postgres_read_urls)
+        self._replicas = (
+            replica_router(
+                read_urls, self.table_name, config.read_replica_check_seconds
+            )
+            if read_urls
+            else None
+        )
+        self.read_replica_max_lag = config.read_replica_max_lag
 
-        # PostgreSQL connection
-        self.conn = psycopg.connect(config.postgres_url)
-
-        # Enable pgvector extension before registering vector type
-        with self.conn.cursor() as cur:
-            cur.execute("CREATE EXTENSION IF NOT EXISTS vector")
-        self.conn.commit()
-
+        # PostgreSQL connection; writes and DDL always use the primary
+        self.conn = psycopg.connect(self.postgres_url)
+        self._check_schema(config.schema_auto_migrate)
         register_vector(self.conn)
 
         # Embeddings client
+        # Retries are left to the shared embedding scheduler.
         self.embeddings_client = OpenAI(
-            api_key=config.embeddings_api_key, base_url=config.embeddings_base_url
+            api_key=config.embeddings_api_key,
+            base_url=config.embeddings_base_url,
+            max_retries=0,
         )
 
-        self._ensure_table_exists()
-
     def table_exists(self) -> bool:
         """Check if table exists."""
         with self.conn.cursor() as cur:
@@ -53,63 +184,193 @@ class VectorDB:
             result = cur.fetchone()
             return result[0] if result else False
 
-    def _ensure_table_exists(self):
-        """Ensure the documents table exists with required indexes."""
+    def _check_schema(self, auto_migrate: bool) -> None:
+        """
+        Make sure the schema is at least at the version this code expects.
+
+        Schema changes are applied by ``python -m app.db.migrations``, so
+        starting a query worker costs one query instead of DDL and locks. A
+        newer schema is accepted, since migrations are additive.
+
+        Raises:
+            RuntimeError: When migrations are pending and ``auto_migrate``
+                is off.
+        """
+        version = schema_version(self.conn, self.table_name)
+        self.conn.commit()
+        if version >= LATEST_VERSION:
+            return
+        if not auto_migrate:
+            self.conn.close()
+            raise RuntimeError(
+                f"Schema of '{self.table_name}' is at version {version}, but "
+                f"version {LATEST_VERSION} is required; run `uv run python -m "
+                "app.db.migrations` or set SCHEMA_AUTO_MIGRATE=true."
+            )
+        migrate(self.conn, self.table_name, self.embeddings_dim)
+
+    @contextmanager
+    def bulk_load(
+        self,
+        maintenance_work_mem: str = "1GB",
+        parallel_workers: int = 4,
+    ) -> Iterator[None]:
+        """
+        Load data without maintaining the HNSW and full-text indexes.
+
+        The search indexes are dropped on entry and rebuilt in one pass on
+        exit, which is far cheaper than updating them on every insert. The
+        primary key and source index stay, since syncing a source looks its
+        rows up by both. While the block runs, migration runs do not
+        recreate the dropped indexes; if this process dies, the lock is released and the next run of
+        ``python -m app.db.migrations`` recreates them.
+
+        Args:
+            maintenance_work_mem: Memory for the index builds, e.g. ``"2GB"``.
+            parallel_workers: Parallel maintenance workers per index build.
+
+        Raises:
+            RuntimeError: When another bulk load of this table is running.
+        """
         with self.conn.cursor() as cur:
-            # Create table with generated tsvector column
             cur.execute(
-                f"""
-                CREATE TABLE IF NOT EXISTS {self.table_name} (
-                    id UUID PRIMARY KEY,
-                    text TEXT NOT NULL,
-                    source TEXT,
-                    dense_embedding vector({self.embeddings_dim}) NOT NULL,
-                    text_search tsvector GENERATED ALWAYS AS (to_tsvector('english', text)) STORED,
-                    metadata JSONB DEFAULT '{{}}',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-                """
+                "SELECT pg_try_advisory_lock(hashtext(%s))",
+                (bulk_load_key(self.table_name),),
             )
+            if not cur.fetchone()[0]:
+                self.conn.rollback()
+                raise RuntimeError(
+                    f"A bulk load of '{self.table_name}' is already running."
+                )
+            for name in search_index_statements(self.table_name):
+                cur.execute(f"DROP INDEX IF EXISTS {name}")
+        self.conn.commit()
+        logger.info(f"Bulk load of '{self.table_name}' started; search indexes dropped")
 
-            # Create HNSW index for dense vectors (cosine similarity)
-            cur.execute(
-                f"""
-                CREATE INDEX IF NOT EXISTS idx_{self.table_name}_dense
-                ON {self.table_name}
-                USING hnsw (dense_embedding vector_cosine_ops)
-                """
+        rebuild = True
+        try:
+            yield
+        except KeyboardInterrupt:
+            # Leave the slow rebuild to the resumed load (or the migrations).
+            rebuild = False
+            logger.warning(
+                f"Bulk load of '{self.table_name}' interrupted; search indexes "
+                "are rebuilt by the next bulk load or migration run"
             )
+            raise
+        finally:
+            try:
+                if rebuild:
+                    self.build_search_indexes(maintenance_work_mem, parallel_workers)
+            finally:
+                with self.conn.cursor() as cur:
+                    cur.execute(
+                        "SELECT pg_advisory_unlock(hashtext(%s))",
+                        (bulk_load_key(self.table_name),),
+                    )
+                self.conn.commit()
+
+    def build_search_indexes(
+        self,
+        maintenance_work_mem: str = "1GB",
+        parallel_workers: int = 4,
+    ) -> None:
+        """
+        Build missing search indexes with tuned maintenance settings.
 
-            # Create GIN index for full-text search
+        Build progress is read from ``pg_stat_progress_create_index`` and
+        shown as a progress bar per index.
+        """
+        with self.conn.cursor() as cur:
             cur.execute(
-                f"""
-                CREATE INDEX IF NOT EXISTS idx_{self.table_name}_fts
-                ON {self.table_name}
-                USING GIN (text_search)
-                """
+                "SELECT indexname FROM pg_indexes WHERE tablename = %s",
+                (self.table_name,),
             )
+            existing = {row[0] for row in cur.fetchall()}
+        self.conn.commit()
 
-            # Create index on source for filtering
+        missing = {
+            name: statement
+            for name, statement in search_index_statements(self.table_name).items()
+            if name not in existing
+        }
+        if not missing:
+            return
+
+        with self.conn.cursor() as cur:
             cur.execute(
-                f"""
-                CREATE INDEX IF NOT EXISTS idx_{self.table_name}_source
-                ON {self.table_name} (source)
-                """
+                "SELECT set_config('maintenance_work_mem', %s, false), "
+                "set_config('max_parallel_maintenance_workers', %s, false)",
+                (maintenance_work_mem, str(max(0, parallel_workers))),
             )
+            try:
+                for name, statement in missing.items():
+                    started = time.monotonic()
+                    with _IndexBuildProgress(self.postgres_url, self.table_name, name):
+                        cur.execute(statement)
+                    self.conn.commit()
+                    logger.info(
+                        f"Built {name} in {time.monotonic() - started:.1f}s"
+                    )
+                cur.execute(f"ANALYZE {self.table_name}")
+                self.conn.commit()
+            finally:
+                cur.execute("RESET maintenance_work_mem")
+                cur.execute("RESET max_parallel_maintenance_workers")
+                self.conn.commit()
 
-        self.conn.commit()
-        logger.info(f"Table '{self.table_name}' ensured with indexes")
+    def index_version(self) -> int:
+        """
+        Number that changes whenever rows of the table are written.
+
+        This is the corpus generation, bumped in the same transaction as every
+        write made through this class. It is kept in memory by a LISTEN/NOTIFY
+        listener, so reading it usually costs no round trip. Rows written by
+        other means (e.g. SQL run by hand) do not change it.
+        """
+        return self._generation.current(self.conn)
+
+    def get_embeddings(self, doc: str, priority: Priority = "query") -> np.ndarray:
+        """Generate dense embeddings for a document using the configured embeddings API.
 
-    def get_embeddings(self, doc: str) -> np.ndarray:
-        """Generate dense embeddings for a document using the configured embeddings API."""
-        response = self.embeddings_client.embeddings.create(
-            input=doc, model=self.embeddings_model
+        ``priority`` is ``query`` for search-time embedding and ``ingest`` for
+        ingestion, which yields to queries under the shared rate-limit budget.
+        """
+        response = embedding_scheduler().call(
+            lambda: self.embeddings_client.embeddings.with_raw_response.create(
+                input=doc, model=self.embeddings_model
+            ),
+            priority=priority,
+            tokens=estimate_tokens(doc),
         )
         return np.array(response.data[0].embedding)
 
+    def get_embeddings_batch(
+        self, docs: list[str], batch_size: int = 128, priority: Priority = "query"
+    ) -> np.ndarray:
+        """Generate dense embeddings for several texts, ``batch_size`` per API call."""
+        vectors: list[list[float]] = []
+        for start in range(0, len(docs), batch_size):
+            batch = docs[start : start + batch_size]
+            response = embedding_scheduler().call(
+                lambda: self.embeddings_client.embeddings.with_raw_response.create(
+                    input=batch, model=self.embeddings_model
+                ),
+                priority=priority,
+                tokens=sum(estimate_tokens(doc) for doc in batch),
+            )
+            vectors.extend(
+                item.embedding for item in sorted(response.data, key=lambda d: d.index)
+            )
+        return np.array(vectors)
+
     def _generate_point_id(self, doc: Document) -> str:
         """Derive a stable identifier for a document chunk."""
-        metadata = doc.metadata or {}
+        metadata = {
+            key: value
+            for key, value in (doc.metadata or {}).items()
+            if key not in POSITIONAL_METADATA_KEYS
+        }
         try:
             metadata_blob = json.dumps(metadata, sort_keys=True, default=str)
         except TypeError:
@@ -152,6 +413,7 @@ class VectorDB:
                         else list(embedding)
                     )
 
+                    signature = minhash(doc.text)
                     values.append(
                         (
                             point_id,
@@ -159,19 +421,29 @@ class VectorDB:
                             source,
                             embedding_list,
                             json.dumps(metadata),
+                            [source] if source else [],
+                            signature,
+                            lsh_bands(signature),
                         )
                     )
 
                 # Batch upsert with ON CONFLICT
                 cur.executemany(
                     f"""
-                    INSERT INTO {self.table_name} (id, text, source, dense_embedding, metadata)
-                    VALUES (%s, %s, %s, %s::vector, %s::jsonb)
+                    INSERT INTO {self.table_name}
+                        (id, text, source, dense_embedding, metadata,
+                         sources, minhash, minhash_bands)
+                    VALUES (%s, %s, %s, %s::vector, %s::jsonb, %s, %s, %s)
                     ON CONFLICT (id) DO UPDATE SET
                         text = EXCLUDED.text,
                         source = EXCLUDED.source,
                         dense_embedding = EXCLUDED.dense_embedding,
                         metadata = EXCLUDED.metadata
+                    WHERE ({self.table_name}.text, {self.table_name}.source,
+                           {self.table_name}.dense_embedding, {self.table_name}.metadata)
+                        IS DISTINCT FROM
+                          (EXCLUDED.text, EXCLUDED.source,
+                           EXCLUDED.dense_embedding, EXCLUDED.metadata)
                     """,
                     values,
                 )
@@ -179,8 +451,307 @@ class VectorDB:
                 logger.info(
                     f"Upserted {len(values)} documents ({i} to {i + len(batch_docs)})"
                 )
+            generation = self._generation.bump(cur)
+
+        self.conn.commit()
+        self._generation.observe(generation)
+
+    def point_id(self, doc: Document) -> str:
+        """Return the stable row ID used for a document chunk."""
+        return self._generate_point_id(doc)
+
+    def existing_ids(self, ids: list[str]) -> set[str]:
+        """Return the subset of the given chunk IDs already stored."""
+        if not ids:
+            return set()
+        with self.conn.cursor() as cur:
+            cur.execute(
+                f"SELECT id FROM {self.table_name} WHERE id = ANY(%s::uuid[])",
+                (ids,),
+            )
+            found = {str(row[0]) for row in cur.fetchall()}
+        self.conn.commit()
+        return found
+
+    def replace_source_documents(
+        self,
+        source: str,
+        docs: list[Document],
+        dense_embeddings: Mapping[str, Any],
+        batch_size: int = 1000,
+        duplicates: Optional[Mapping[str, str]] = None,
+    ) -> SourceSyncStats:
+        """
+        Make the stored chunks of ``source`` match ``docs`` in one transaction.
+
+        Chunks whose IDs are no longer produced are deleted in bulk, new IDs are
+        inserted, and rows that already exist are left untouched unless their
+        (positional) metadata changed. A row that other sources share is not
+        deleted; ``source`` is only removed from its ``sources``.
+
+        Args:
+            source: Source identifier whose chunks are being replaced.
+            docs: The complete new set of chunks for the source.
+            dense_embeddings: Embeddings keyed by chunk ID; required for every
+                chunk that is not stored yet.
+            batch_size: Number of rows inserted per statement batch.
+            duplicates: Chunk IDs of near-duplicate chunks mapped to the ID of
+                the row they collapse into. That row gains ``source`` in its
+                ``sources`` instead of a row of its own.
+
+        Returns:
+            SourceSyncStats with inserted/deleted/updated/unchanged/collapsed
+            counts, and the chunks that could be neither inserted nor
+            attached to a stored row for lack of an embedding.
+        """
+        stats = SourceSyncStats()
+        duplicates = duplicates or {}
+        new_rows: dict[str, tuple[Document, dict[str, Any]]] = {}
+        targets: dict[str, list[str]] = {}
+        for doc in docs:
+            point_id = self._generate_point_id(doc)
+            if point_id in duplicates:
+                targets.setdefault(duplicates[point_id], []).append(point_id)
+                continue
+            metadata = dict(doc.metadata) if doc.metadata else {}
+            metadata.pop("source", None)
+            new_rows.setdefault(point_id, (doc, metadata))
+
+        try:
+            with self.conn.cursor() as cur:
+                # Serialize concurrent re-ingests of the same source.
+                cur.execute(
+                    "SELECT pg_advisory_xact_lock(hashtext(%s))",
+                    (f"{self.table_name}:{source}",),
+                )
+                cur.execute(
+                    f"""
+                    SELECT id, metadata, minhash IS NULL FROM {self.table_name}
+                    WHERE source = %s OR sources @> ARRAY[%s]::text[]
+                    """,
+                    (source, source),
+                )
+                existing: dict[str, dict[str, Any]] = {}
+                unfingerprinted: list[str] = []
+                for row in cur.fetchall():
+                    existing[str(row[0])] = row[1] or {}
+                    if row[2]:
+                        unfingerprinted.append(str(row[0]))
+
+                kept = set(new_rows) | set(targets)
+                stale = [point_id for point_id in existing if point_id not in kept]
+                if stale:
+                    cur.execute(
+                        f"""
+                        DELETE FROM {self.table_name}
+                        WHERE id = ANY(%s::uuid[])
+                          AND (sources IS NULL OR sources <@ ARRAY[%s]::text[])
+                        """,
+                        (stale, source),
+                    )
+                    stats.deleted = cur.rowcount
+                    # Rows other sources still share only lose this one.
+                    cur.execute(
+                        f"""
+                        UPDATE {self.table_name}
+                        SET sources = array_remove(sources, %s),
+                            source = CASE WHEN source = %s
+                                THEN (array_remove(sources, %s))[1]
+                                ELSE source END
+                        WHERE id = ANY(%s::uuid[]) AND sources @> ARRAY[%s]::text[]
+                        """,
+                        (source, source, source, stale, source),
+                    )
+                    stats.updated += cur.rowcount
+
+                moved = [
+                    (json.dumps(metadata), point_id)
+                    for point_id, (_, metadata) in new_rows.items()
+                    if point_id in existing and existing[point_id] != metadata
+                ]
+                if moved:
+                    cur.executemany(
+                        f"UPDATE {self.table_name} SET metadata = %s::jsonb WHERE id = %s",
+                        moved,
+                    )
+                stats.updated += len(moved)
+                stats.unchanged = sum(1 for point_id in kept if point_id in existing)
+                stats.unchanged -= len(moved)
+
+                # Rows stored before fingerprinting existed get one now.
+                fingerprints = []
+                for point_id in unfingerprinted:
+                    if point_id in new_rows:
+                        signature = minhash(new_rows[point_id][0].text)
+                        fingerprints.append(
+                            (signature, lsh_bands(signature), point_id)
+                        )
+                if fingerprints:
+                    cur.executemany(
+                        f"""
+                        UPDATE {self.table_name}
+                        SET minhash = %s, minhash_bands = %s
+                        WHERE id = %s
+                        """,
+                        fingerprints,
+                    )
+
+                # New chunks without an embedding were stored already, as rows
+                # other sources own; targets among this source's own rows need
+                # no attaching. Lock the rows so a concurrent sync of another
+                # source cannot delete them before this one is committed.
+                unembedded = [
+                    point_id
+                    for point_id in new_rows
+                    if point_id not in existing
+                    and dense_embeddings.get(point_id) is None
+                ]
+                shared = [
+                    point_id
+                    for point_id in targets
+                    if point_id not in existing and point_id not in new_rows
+                ]
+                present: set[str] = set()
+                if unembedded or shared:
+                    cur.execute(
+                        f"""
+                        SELECT id FROM {self.table_name}
+                        WHERE id = ANY(%s::uuid[]) FOR SHARE
+                        """,
+                        (unembedded + shared,),
+                    )
+                    present = {str(row[0]) for row in cur.fetchall()}
+                attach = [
+                    point_id for point_id in unembedded + shared if point_id in present
+                ]
+                gone = {
+                    point_id for point_id in unembedded if point_id not in present
+                }
+                stats.missing = sorted(gone) + [
+                    chunk_id
+                    for target, chunk_ids in targets.items()
+                    if target in gone or (target in shared and target not in present)
+                    for chunk_id in chunk_ids
+                ]
+                if stats.missing:
+                    logger.warning(
+                        f"{len(stats.missing)} chunks of {source} have no embedding "
+                        "and their stored row was deleted; they need embedding"
+                    )
+
+                values = []
+                for point_id, (doc, metadata) in new_rows.items():
+                    embedding = dense_embeddings.get(point_id)
+                    if point_id in existing or embedding is None:
+                        continue
+                    signature = minhash(doc.text)
+                    values.append(
+                        (
+                            point_id,
+                            doc.text,
+                            source,
+                            (
+                                embedding.tolist()
+                                if hasattr(embedding, "tolist")
+                                else list(embedding)
+                            ),
+                            json.dumps(metadata),
+                            [source],
+                            signature,
+                            lsh_bands(signature),
+                        )
+                    )
+                for i in range(0, len(values), batch_size):
+                    cur.executemany(
+                        f"""
+                        INSERT INTO {self.table_name}
+                            (id, text, source, dense_embedding, metadata,
+                             sources, minhash, minhash_bands)
+                        VALUES (%s, %s, %s, %s::vector, %s::jsonb, %s, %s, %s)
+                        ON CONFLICT (id) DO NOTHING
+                        """,
+                        values[i : i + batch_size],
+                    )
+                stats.inserted = len(values)
+
+                if attach:
+                    cur.execute(
+                        f"""
+                        UPDATE {self.table_name}
+                        SET sources = array_append(coalesce(sources, '{{}}'), %s)
+                        WHERE id = ANY(%s::uuid[])
+                          AND NOT coalesce(sources, '{{}}') @> ARRAY[%s]::text[]
+                        """,
+                        (source, attach, source),
+                    )
+                    stats.collapsed = cur.rowcount
+
+                generation = None
+                if stats.inserted or stats.deleted or stats.updated or stats.collapsed:
+                    generation = self._generation.bump(cur)
+
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        if generation is not None:
+            self._generation.observe(generation)
+
+        logger.info(
+            f"Synced source {source}: {stats.inserted} inserted, "
+            f"{stats.deleted} deleted, {stats.updated} updated, "
+            f"{stats.unchanged} unchanged, {stats.collapsed} collapsed"
+        )
+        return stats
+
+    def near_duplicate_rows(
+        self,
+        chunks: Mapping[str, tuple[list[int], Optional[str]]],
+        threshold: float,
+    ) -> dict[str, tuple[str, float]]:
+        """
+        Find stored rows that chunks are near-duplicates of.
+
+        Args:
+            chunks: MinHash signature and source of each chunk, by chunk ID.
+            threshold: Minimum estimated Jaccard similarity of the shingles.
 
+        Returns:
+            The most similar row ID and its similarity, for each chunk that
+            has one. Rows referenced only by the chunk's own source are not
+            matched, so an edited chunk replaces its old version.
+        """
+        if not chunks:
+            return {}
+        bands = sorted(
+            {band for signature, _ in chunks.values() for band in lsh_bands(signature)}
+        )
+        rows = self.conn.execute(
+            f"""
+            SELECT id, minhash, sources FROM {self.table_name}
+            WHERE minhash_bands && %s::bigint[]
+            """,
+            (bands,),
+        ).fetchall()
         self.conn.commit()
+        index = NearDuplicateIndex()
+        row_sources: dict[str, list[str]] = {}
+        for row_id, signature, sources in rows:
+            index.add(str(row_id), signature)
+            row_sources[str(row_id)] = sources or []
+
+        matches = {}
+        for chunk_id, (signature, source) in chunks.items():
+            match = index.find(
+                signature,
+                threshold,
+                accept=lambda row_id: any(
+                    other != source for other in row_sources[row_id]
+                ),
+            )
+            if match is not None:
+                matches[chunk_id] = match
+        return matches
 
     def _rrf_fusion(
         self,
@@ -222,101 +793,486 @@ class VectorDB:
         )
         return sorted_docs[:top_k]
 
-    def hybrid_search(self, query: str, top_k: int = 5) -> list[SearchResult]:
+    def hybrid_search(
+        self, query: str, top_k: int = 5, embedding: Optional[np.ndarray] = None
+    ) -> list[SearchResult]:
         """
         Perform hybrid search using dense vectors + full-text search with RRF fusion.
 
+        Results are cached per normalized query and ``top_k`` until the next
+        write to the table; a cache hit needs neither an embedding nor a query.
+        A miss runs on a read replica when ``POSTGRES_READ_URLS`` lists a
+        usable one, and on the primary otherwise.
+
         Args:
             query: Search query text
             top_k: Number of results to return
+            embedding: Precomputed dense embedding of the query, if any
 
         Returns:
             List of SearchResult objects ranked by relevance
         """
-        # Get dense embedding for query
-        dense_embedding = self.get_embeddings(query)
-        embedding_list = dense_embedding.tolist()
+        generation, cached = self._cached_search(self.conn, query, top_k)
+        if cached is not None:
+            return cached
+        # The query is only embedded when the plan runs the dense branch
+        return self._routed_search(query, embedding, top_k, generation)
+
+    def hybrid_search_batch(
+        self,
+        queries: list[str],
+        embeddings: Optional[Sequence[np.ndarray]] = None,
+        top_k: int = 5,
+        max_connections: int = 4,
+    ) -> list[list[SearchResult]]:
+        """
+        Run hybrid searches for several queries over a pool of connections.
 
-        # Prefetch more results for better RRF fusion
-        prefetch_k = top_k * 3
+        Args:
+            queries: Search query texts
+            embeddings: Dense embedding of each query, in the same order. When
+                omitted, the queries missing from the result cache are embedded
+                in one batch.
+            top_k: Number of results to return per query
+            max_connections: Searches run concurrently on up to this many
+                short-lived connections, to read replicas when usable
 
-        with self.conn.cursor() as cur:
-            # Dense vector search (cosine similarity)
-            # Note: <=> is cosine distance, so lower is better
-            # We compute 1 - distance to get similarity score
-            cur.execute(
-                f"""
-                SELECT id, text, source, metadata,
-                       1 - (dense_embedding <=> %s::vector) as score
-                FROM {self.table_name}
-                ORDER BY dense_embedding <=> %s::vector
-                LIMIT %s
-                """,
-                (embedding_list, embedding_list, prefetch_k),
-            )
+        Returns:
+            One list of SearchResult objects per query
+        """
+        if not queries:
+            return []
+        results: dict[int, list[SearchResult]] = {}
+        generation: Optional[int] = None
+        for index, query in enumerate(queries):
+            generation, cached = self._cached_search(self.conn, query, top_k)
+            if cached is not None:
+                results[index] = cached
+        misses = [index for index in range(len(queries)) if index not in results]
+        if not misses:
+            return [results[index] for index in range(len(queries))]
+        if embeddings is None:
+            embedded = self.get_embeddings_batch([queries[index] for index in misses])
+            embeddings_by_index = dict(zip(misses, embedded))
+        else:
+            embeddings_by_index = {index: embeddings[index] for index in misses}
 
-            dense_results = [
-                {
-                    "id": str(row[0]),
-                    "text": row[1],
-                    "source": row[2],
-                    "metadata": row[3] or {},
-                    "score": row[4],
-                }
-                for row in cur.fetchall()
-            ]
+        generation = self._lag_generation(generation)
+        size = max(1, min(max_connections, len(misses)))
+        connections: Queue[tuple[psycopg.Connection, Optional[ReadReplica]]] = Queue()
+        opened: list[psycopg.Connection] = []
+        reserved: list[ReadReplica] = []
+        try:
+            for _ in range(size):
+                conn, replica = self._search_connection(generation)
+                opened.append(conn)
+                if replica is not None:
+                    reserved.append(replica)
+                connections.put((conn, replica))
 
-            # Full-text search
-            cur.execute(
-                f"""
-                SELECT id, text, source, metadata,
-                       ts_rank_cd(text_search, plainto_tsquery('english', %s)) as score
-                FROM {self.table_name}
-                WHERE text_search @@ plainto_tsquery('english', %s)
-                ORDER BY score DESC
-                LIMIT %s
-                """,
-                (query, query, prefetch_k),
-            )
+            def search(index: int) -> list[SearchResult]:
+                conn, replica = connections.get()
+                args = (queries[index], embeddings_by_index[index], top_k)
+                try:
+                    if replica is not None:
+                        try:
+                            self._replicas.served(replica)
+                            return self._hybrid_search(
+                                conn, *args, replica.cache_generation(generation)
+                            )
+                        except psycopg.OperationalError as exc:
+                            self._replicas.failed(replica, exc)
+                            conn, replica = self._search_connection(None, False)
+                            opened.append(conn)
+                    return self._hybrid_search(conn, *args, generation)
+                finally:
+                    connections.put((conn, replica))
 
-            fts_results = [
-                {
-                    "id": str(row[0]),
-                    "text": row[1],
-                    "source": row[2],
-                    "metadata": row[3] or {},
-                    "score": row[4],
-                }
-                for row in cur.fetchall()
-            ]
+            with ThreadPoolExecutor(
+                max_workers=size, thread_name_prefix="hybrid-search"
+            ) as executor:
+                results.update(zip(misses, executor.map(search, misses)))
+        finally:
+            for conn in opened:
+                conn.close()
+            for replica in reserved:
+                self._replicas.release(replica)
+        return [results[index] for index in range(len(queries))]
+
+    def _lag_generation(self, generation: Optional[int]) -> Optional[int]:
+        """The primary's generation when replica lag is checked, else as given."""
+        if (
+            generation is None
+            and self._replicas is not None
+            and self.read_replica_max_lag >= 0
+        ):
+            return self._generation.current(self.conn)
+        return generation
+
+    def _routed_search(
+        self,
+        query: str,
+        embedding: Optional[np.ndarray],
+        top_k: int,
+        generation: Optional[int],
+    ) -> list[SearchResult]:
+        """Search on a usable read replica, falling back to the primary."""
+        if self._replicas is None:
+            return self._hybrid_search(self.conn, query, embedding, top_k, generation)
+        generation = self._lag_generation(generation)
+        with self._replicas.route(generation, self.read_replica_max_lag) as replica:
+            if replica is not None:
+                try:
+                    return self._hybrid_search(
+                        replica.conn,
+                        query,
+                        embedding,
+                        top_k,
+                        replica.cache_generation(generation),
+                    )
+                except psycopg.OperationalError as exc:
+                    self._replicas.failed(replica, exc)
+        return self._hybrid_search(self.conn, query, embedding, top_k, generation)
+
+    def _search_connection(
+        self, generation: Optional[int], use_replicas: bool = True
+    ) -> tuple[psycopg.Connection, Optional[ReadReplica]]:
+        """
+        A new autocommit connection for batch searches.
+
+        It goes to a reserved read replica when one is usable, and to the
+        primary otherwise. The caller releases the replica.
+        """
+        replica = None
+        if use_replicas and self._replicas is not None:
+            replica = self._replicas.acquire(generation, self.read_replica_max_lag)
+        if replica is not None:
+            try:
+                return psycopg.connect(replica.url, autocommit=True), replica
+            except psycopg.OperationalError as exc:
+                self._replicas.release(replica)
+                self._replicas.failed(replica, exc)
+        return psycopg.connect(self.postgres_url, autocommit=True), None
+
+    def _cached_search(
+        self, conn: psycopg.Connection, query: str, top_k: int
+    ) -> tuple[Optional[int], Optional[list[SearchResult]]]:
+        """
+        Look a search up in the result cache.
+
+        Returns the current corpus generation (None with the cache disabled)
+        and the cached results, if any.
+        """
+        if self._cache is None:
+            return None, None
+        generation = self._generation.current(conn)
+        cached = self._cache.get(generation, (normalize_question(query), top_k))
+        if cached is None:
+            return generation, None
+        hits, rows = cached
+        missing = [chunk_id for chunk_id, _ in hits if chunk_id not in rows]
+        if missing:
+            fetched = self._fetch_rows(conn, missing)
+            self._cache.add_rows(generation, fetched)
+            rows.update(fetched)
+        logger.info(
+            f"Retrieved {len(hits)} results from cache "
+            f"({len(missing)} rows fetched)"
+        )
+        return generation, [
+            self._search_result(*rows[chunk_id], score)
+            for chunk_id, score in hits
+            if chunk_id in rows
+        ]
+
+    def _fetch_rows(
+        self, conn: psycopg.Connection, ids: list[str]
+    ) -> dict[str, ChunkRow]:
+        rows = conn.execute(
+            f"""
+            SELECT id, text, source, metadata, sources
+            FROM {self.table_name}
+            WHERE id = ANY(%s::uuid[])
+            """,
+            (ids,),
+        ).fetchall()
+        return {
+            str(row[0]): (row[1], row[2], self._row_metadata(row[3], row[4]))
+            for row in rows
+        }
+
+    def _hybrid_search(
+        self,
+        conn: psycopg.Connection,
+        query: str,
+        dense_embedding: Optional[np.ndarray],
+        top_k: int,
+        generation: Optional[int] = None,
+    ) -> list[SearchResult]:
+        plan = self.plan_retrieval(query, top_k, conn)
+        started = time.monotonic()
+        dense_results: list[dict] = []
+        fts_results: list[dict] = []
+        fell_back = False
+
+        with conn.cursor() as cur:
+            if plan.fts:
+                fts_results = self._fts_search(cur, query, plan.fts_k)
+            fts_seconds = time.monotonic() - started
+            dense_k = plan.dense_k
+            if not plan.dense and len(fts_results) < top_k:
+                # The statistics promised more matches than there are.
+                dense_k, fell_back = top_k * self.retrieval_prefetch_factor, True
+            if dense_k:
+                if dense_embedding is None:
+                    dense_embedding = self.get_embeddings(query)
+                dense_results = self._dense_search(cur, dense_embedding, dense_k)
+        dense_seconds = time.monotonic() - started - fts_seconds
 
         # Apply RRF fusion
-        if fts_results:
+        if fts_results and dense_results:
             fused_results = self._rrf_fusion(dense_results, fts_results, top_k=top_k)
         else:
-            # If no FTS results, just use dense results
-            fused_results = dense_results[:top_k]
+            # A single branch keeps its own ranking
+            fused_results = (dense_results or fts_results)[:top_k]
             for r in fused_results:
                 r["rrf_score"] = r["score"]
 
         logger.info(
             f"Retrieved {len(fused_results)} results "
-            f"(dense: {len(dense_results)}, fts: {len(fts_results)})"
+            f"(dense: {len(dense_results)} in {dense_seconds * 1000:.1f}ms, "
+            f"fts: {len(fts_results)} in {fts_seconds * 1000:.1f}ms) "
+            f"plan: {plan.describe()}"
+            + (" + dense fallback" if fell_back else "")
         )
 
-        return [
-            SearchResult(
-                text=r["text"],
-                metadata=(
-                    {**r["metadata"], "source": r["source"]}
-                    if r["source"]
-                    else r["metadata"]
-                ),
-                score=r["rrf_score"],
+        if self._cache is not None and generation is not None:
+            self._cache.put(
+                generation,
+                (normalize_question(query), top_k),
+                [(r["id"], r["rrf_score"]) for r in fused_results],
+                {
+                    r["id"]: (r["text"], r["source"], r["metadata"])
+                    for r in fused_results
+                },
             )
+
+        return [
+            self._search_result(r["text"], r["source"], r["metadata"], r["rrf_score"])
             for r in fused_results
         ]
 
+    @staticmethod
+    def _search_result(
+        text: str, source: Optional[str], metadata: dict[str, Any], score: float
+    ) -> SearchResult:
+        # Cached rows are shared, so results always get their own metadata dict
+        return SearchResult(
+            text=text,
+            metadata={**metadata, "source": source} if source else dict(metadata),
+            score=score,
+        )
+
+    def _dense_search(
+        self, cur: psycopg.Cursor, dense_embedding: np.ndarray, limit: int
+    ) -> list[dict]:
+        embedding_list = (
+            dense_embedding.tolist()
+            if hasattr(dense_embedding, "tolist")
+            else list(dense_embedding)
+        )
+        # Dense vector search (cosine similarity)
+        # Note: <=> is cosine distance, so lower is better
+        # We compute 1 - distance to get similarity score
+        cur.execute(
+            f"""
+            SELECT id, text, source, metadata,
+                   1 - (dense_embedding <=> %s::vector) as score, sources
+            FROM {self.table_name}
+            ORDER BY dense_embedding <=> %s::vector
+            LIMIT %s
+            """,
+            (embedding_list, embedding_list, limit),
+        )
+        return self._search_rows(cur)
+
+    def _fts_search(self, cur: psycopg.Cursor, query: str, limit: int) -> list[dict]:
+        cur.execute(
+            f"""
+            SELECT id, text, source, metadata,
+                   ts_rank_cd(text_search, plainto_tsquery('english', %s)) as score,
+                   sources
+            FROM {self.table_name}
+            WHERE text_search @@ plainto_tsquery('english', %s)
+            ORDER BY score DESC
+            LIMIT %s
+            """,
+            (query, query, limit),
+        )
+        return self._search_rows(cur)
+
+    @staticmethod
+    def _search_rows(cur: psycopg.Cursor) -> list[dict]:
+        return [
+            {
+                "id": str(row[0]),
+                "text": row[1],
+                "source": row[2],
+                "metadata": VectorDB._row_metadata(row[3], row[5]),
+                "score": row[4],
+            }
+            for row in cur.fetchall()
+        ]
+
+    @staticmethod
+    def _row_metadata(
+        metadata: Optional[dict[str, Any]], sources: Optional[list[str]]
+    ) -> dict[str, Any]:
+        """Chunk metadata, listing every source of a collapsed near-duplicate row."""
+        metadata = metadata or {}
+        if sources and len(sources) > 1:
+            metadata = {**metadata, "sources": sources}
+        return metadata
+
+    def plan_retrieval(
+        self, query: str, top_k: int, conn: Optional[psycopg.Connection] = None
+    ) -> RetrievalPlan:
+        """
+        Choose the search branches and prefetch depth for a query.
+
+        See :mod:`app.db.retrieval_planner`. With ``RETRIEVAL_PLANNER`` off,
+        both branches always fetch ``top_k * RETRIEVAL_PREFETCH_FACTOR``.
+        """
+        deep = top_k * self.retrieval_prefetch_factor
+        if not self.retrieval_planner:
+            return RetrievalPlan(deep, deep, "planner disabled")
+        conn = conn or self.conn
+        lexemes = conn.execute(
+            "SELECT tsvector_to_array(to_tsvector('english', %s))", (query,)
+        ).fetchone()[0]
+        features = query_features(query, lexemes, self._fts_stats(conn))
+        return plan_retrieval(
+            features,
+            top_k,
+            prefetch_factor=self.retrieval_prefetch_factor,
+            max_match_fraction=self.retrieval_fts_max_match_fraction,
+        )
+
+    def _fts_stats(self, conn: psycopg.Connection) -> Optional[FtsStats]:
+        """Lexeme statistics ANALYZE keeps for ``text_search``, cached briefly."""
+        with self._fts_stats_lock:
+            fetched_at, stats = self._fts_stats_cache
+            if time.monotonic() - fetched_at < FTS_STATS_TTL:
+                return stats
+            row = conn.execute(
+                """
+                SELECT c.reltuples, s.most_common_elems::text::text[],
+                       s.most_common_elem_freqs
+                FROM pg_class c
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                LEFT JOIN pg_stats s
+                  ON s.schemaname = n.nspname
+                 AND s.tablename = c.relname
+                 AND s.attname = 'text_search'
+                WHERE c.oid = %s::regclass
+                """,
+                (self.table_name,),
+            ).fetchone()
+            stats = None
+            if row is not None and row[0] > 0 and row[1]:
+                rows, lexemes, frequencies = row
+                # The frequencies are followed by their minimum and maximum.
+                stats = FtsStats(
+                    rows=rows,
+                    frequencies=dict(zip(lexemes, frequencies)),
+                    min_frequency=frequencies[len(lexemes)],
+                )
+            self._fts_stats_cache = (time.monotonic(), stats)
+            return stats
+
+    def prewarm(
+        self,
+        query: str,
+        embedding: Optional[np.ndarray] = None,
+        top_k: int = 5,
+    ) -> dict[str, int]:
+        """
+        Load the table's indexes into memory before the first real query.
+
+        With the ``pg_prewarm`` extension installed, every index of the table
+        is read whole, search indexes first: into shared buffers until the
+        indexes loaded there fill half of ``shared_buffers``, the rest into
+        the OS page cache. This runs on a short-lived connection of its own.
+        One full-text search for ``query`` and, given its embedding, one
+        dense search are then run on this instance's connection to prime it.
+        The generation listener is started and the full-text statistics are
+        read, so the first query waits on neither. Read replicas are checked
+        and warmed the same way, since they serve the searches.
+
+        Returns:
+            Blocks read per index by ``pg_prewarm``; empty without it. Indexes
+            of a replica are prefixed with its ``host:port/dbname``.
+        """
+        self.index_version()
+        self._fts_stats(self.conn)
+        blocks = self._prewarm_indexes(self.postgres_url)
+        self._prime_connection(self.conn, query, embedding, top_k)
+        self.conn.commit()
+        if self._replicas is not None:
+            self._replicas.check_now()
+            for replica in self._replicas.replicas:
+                if not replica.healthy:
+                    continue
+                warmed = self._prewarm_indexes(replica.url)
+                blocks.update(
+                    (f"{replica.label}/{name}", count) for name, count in warmed.items()
+                )
+                self._prime_connection(replica.conn, query, embedding, top_k)
+        return blocks
+
+    def _prewarm_indexes(self, url: str) -> dict[str, int]:
+        blocks: dict[str, int] = {}
+        with psycopg.connect(url, autocommit=True) as conn, conn.cursor() as cur:
+            cur.execute(
+                "SELECT EXISTS (SELECT FROM pg_extension WHERE extname = 'pg_prewarm')"
+            )
+            if not cur.fetchone()[0]:
+                return blocks
+            cur.execute(
+                """
+                SELECT indexrelid::regclass::text, pg_relation_size(indexrelid),
+                       pg_size_bytes(current_setting('shared_buffers'))
+                FROM pg_index
+                WHERE indrelid = %s::regclass
+                ORDER BY pg_relation_size(indexrelid)
+                """,
+                (self.table_name,),
+            )
+            indexes = cur.fetchall()
+            search_indexes = search_index_statements(self.table_name)
+            # Search indexes first: they are what the first queries read.
+            indexes.sort(key=lambda row: row[0] not in search_indexes)
+            budget = indexes[0][2] // 2 if indexes else 0
+            for name, size, _ in indexes:
+                mode = "buffer" if size <= budget else "read"
+                if mode == "buffer":
+                    budget -= size
+                cur.execute("SELECT pg_prewarm(%s::regclass, %s)", (name, mode))
+                blocks[name] = cur.fetchone()[0]
+        return blocks
+
+    def _prime_connection(
+        self,
+        conn: psycopg.Connection,
+        query: str,
+        embedding: Optional[np.ndarray],
+        top_k: int,
+    ) -> None:
+        with conn.cursor() as cur:
+            self._fts_search(cur, query, top_k)
+            if embedding is not None:
+                self._dense_search(cur, embedding, top_k)
+
     def close(self):
         """Close the database connection."""
         if self.conn:
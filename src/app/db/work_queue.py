@@ -0,0 +1,327 @@
+"""Postgres-backed work queue shared by ingestion workers on any number of nodes.
+
+Tasks live in ``<POSTGRES_TABLE_NAME>_ingest_queue`` next to the documents
+table. Workers claim batches with ``FOR UPDATE SKIP LOCKED`` so concurrent
+claims never block each other or hand out the same task twice, refresh a
+heartbeat while they work, and tasks whose worker stopped heartbeating are
+put back in the queue.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Optional
+
+import psycopg
+from psycopg.types.json import Jsonb
+
+logger = logging.getLogger(__name__)
+
+QUEUE_STATUSES = ("queued", "running", "done", "failed")
+
+
+@dataclass(slots=True)
+class QueueTask:
+    """One document to ingest, as stored in the queue."""
+
+    source: str
+    kind: str
+    location: str
+    id: Optional[int] = None
+    attempts: int = 0
+
+
+@dataclass(slots=True)
+class QueueProgress:
+    """Aggregate progress across every worker."""
+
+    counts: dict[str, int] = field(default_factory=dict)
+    chunk_count: int = 0
+    inserted_count: int = 0
+    active_workers: int = 0
+    recent_done: int = 0
+    window_seconds: float = 0
+
+    @property
+    def remaining(self) -> int:
+        return self.counts.get("queued", 0) + self.counts.get("running", 0)
+
+    @property
+    def throughput(self) -> float:
+        """Documents finished per second over the recent window."""
+        return self.recent_done / self.window_seconds if self.window_seconds else 0.0
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        rate = self.throughput
+        return self.remaining / rate if rate else None
+
+
+class IngestionQueue:
+    """Work queue of ingestion tasks in the application's Postgres database."""
+
+    def __init__(self, config: Any, max_attempts: int = 3):
+        self.table_name = f"{config.postgres_table_name}_ingest_queue"
+        self.max_attempts = max(1, max_attempts)
+        self.conn = psycopg.connect(config.postgres_url)
+        self._ensure_table_exists()
+
+    def _ensure_table_exists(self) -> None:
+        with self.conn.cursor() as cur:
+            cur.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.table_name} (
+                    id BIGSERIAL PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    payload JSONB NOT NULL DEFAULT '{{}}',
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker_id TEXT,
+                    heartbeat_at TIMESTAMPTZ,
+                    enqueued_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                    started_at TIMESTAMPTZ,
+                    finished_at TIMESTAMPTZ,
+                    chunk_count INTEGER NOT NULL DEFAULT 0,
+                    inserted_count INTEGER NOT NULL DEFAULT 0,
+                    error TEXT
+                )
+                """
+            )
+            # At most one pending task per source, so two workers never
+            # ingest the same document at once.
+            cur.execute(
+                f"""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_{self.table_name}_pending
+                ON {self.table_name} (source)
+                WHERE status IN ('queued', 'running')
+                """
+            )
+            cur.execute(
+                f"""
+                CREATE INDEX IF NOT EXISTS idx_{self.table_name}_status
+                ON {self.table_name} (status, id)
+                """
+            )
+        self.conn.commit()
+
+    def _execute(self, query: str, params: Any = None) -> list[tuple]:
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(query, params)
+                rows = cur.fetchall() if cur.description else []
+            self.conn.commit()
+            return rows
+        except Exception:
+            self.conn.rollback()
+            raise
+
+    def enqueue(self, tasks: Iterable[QueueTask]) -> int:
+        """Queue tasks; sources that already have a pending task are skipped."""
+
+        values = [
+            (task.source, task.kind, Jsonb({"location": task.location}))
+            for task in tasks
+        ]
+        if not values:
+            return 0
+        try:
+            with self.conn.cursor() as cur:
+                added = 0
+                for start in range(0, len(values), 1000):
+                    cur.executemany(
+                        f"""
+                        INSERT INTO {self.table_name} (source, kind, payload)
+                        VALUES (%s, %s, %s)
+                        ON CONFLICT (source) WHERE status IN ('queued', 'running')
+                        DO NOTHING
+                        """,
+                        values[start : start + 1000],
+                    )
+                    added += max(cur.rowcount, 0)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return added
+
+    def claim(self, worker_id: str, limit: int = 1) -> list[QueueTask]:
+        """Atomically take up to ``limit`` queued tasks for ``worker_id``."""
+
+        rows = self._execute(
+            f"""
+            UPDATE {self.table_name} AS task
+            SET status = 'running', worker_id = %s, attempts = task.attempts + 1,
+                started_at = now(), heartbeat_at = now(), error = NULL
+            WHERE task.id IN (
+                SELECT id FROM {self.table_name}
+                WHERE status = 'queued'
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING task.id, task.source, task.kind, task.payload, task.attempts
+            """,
+            (worker_id, max(1, limit)),
+        )
+        return [
+            QueueTask(
+                id=row[0],
+                source=row[1],
+                kind=row[2],
+                location=(row[3] or {}).get("location", row[1]),
+                attempts=row[4],
+            )
+            for row in sorted(rows)
+        ]
+
+    def heartbeat(self, worker_id: str, task_ids: list[int]) -> int:
+        """Refresh the heartbeat of tasks still owned by ``worker_id``."""
+
+        if not task_ids:
+            return 0
+        rows = self._execute(
+            f"""
+            UPDATE {self.table_name} SET heartbeat_at = now()
+            WHERE id = ANY(%s) AND worker_id = %s AND status = 'running'
+            RETURNING id
+            """,
+            (task_ids, worker_id),
+        )
+        return len(rows)
+
+    def complete(
+        self, task: QueueTask, worker_id: str, chunk_count: int, inserted_count: int
+    ) -> bool:
+        """Mark a task done; returns False if it was re-queued from under us."""
+
+        rows = self._execute(
+            f"""
+            UPDATE {self.table_name}
+            SET status = 'done', finished_at = now(), chunk_count = %s,
+                inserted_count = %s
+            WHERE id = %s AND worker_id = %s AND status = 'running'
+            RETURNING id
+            """,
+            (chunk_count, inserted_count, task.id, worker_id),
+        )
+        return bool(rows)
+
+    def fail(self, task: QueueTask, worker_id: str, error: str) -> bool:
+        """Record a failed attempt; the task is re-queued until ``max_attempts``."""
+
+        rows = self._execute(
+            f"""
+            UPDATE {self.table_name}
+            SET status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'queued' END,
+                finished_at = now(), worker_id = NULL, error = %s
+            WHERE id = %s AND worker_id = %s AND status = 'running'
+            RETURNING id
+            """,
+            (self.max_attempts, error, task.id, worker_id),
+        )
+        return bool(rows)
+
+    def release(self, worker_id: str, task_ids: list[int]) -> int:
+        """Hand unfinished tasks back to the queue without using up an attempt."""
+
+        if not task_ids:
+            return 0
+        rows = self._execute(
+            f"""
+            UPDATE {self.table_name}
+            SET status = 'queued', worker_id = NULL,
+                attempts = GREATEST(attempts - 1, 0)
+            WHERE id = ANY(%s) AND worker_id = %s AND status = 'running'
+            RETURNING id
+            """,
+            (task_ids, worker_id),
+        )
+        return len(rows)
+
+    def requeue_stale(self, stale_after: float) -> int:
+        """Re-queue running tasks without a heartbeat for ``stale_after`` seconds."""
+
+        rows = self._execute(
+            f"""
+            UPDATE {self.table_name}
+            SET status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'queued' END,
+                worker_id = NULL,
+                error = 'worker stopped sending heartbeats'
+            WHERE status = 'running'
+              AND heartbeat_at < now() - make_interval(secs => %s)
+            RETURNING id
+            """,
+            (self.max_attempts, stale_after),
+        )
+        if rows:
+            logger.warning("Re-queued %d abandoned ingestion tasks", len(rows))
+        return len(rows)
+
+    def retry_failed(self) -> int:
+        """Put failed sources back in the queue with a fresh attempt budget.
+
+        A source can have several tasks, since ``enqueue`` adds a new one
+        once none is pending. Only a source's latest task is re-queued, and
+        only when it failed; older tasks are kept as history.
+        """
+
+        rows = self._execute(
+            f"""
+            UPDATE {self.table_name} AS task
+            SET status = 'queued', attempts = 0, worker_id = NULL
+            WHERE status = 'failed' AND id IN (
+                SELECT DISTINCT ON (source) id FROM {self.table_name}
+                ORDER BY source, id DESC
+            ) AND NOT EXISTS (
+                SELECT 1 FROM {self.table_name} AS pending
+                WHERE pending.source = task.source
+                  AND pending.status IN ('queued', 'running')
+            )
+            RETURNING id
+            """
+        )
+        return len(rows)
+
+    def progress(
+        self, window_seconds: float = 300, stale_after: float = 60
+    ) -> QueueProgress:
+        """Summarize the queue across all workers."""
+
+        counts = dict(
+            self._execute(
+                f"SELECT status, count(*) FROM {self.table_name} GROUP BY status"
+            )
+        )
+        ((chunks, inserted, recent, span, workers),) = self._execute(
+            f"""
+            WITH recent AS (
+                SELECT started_at FROM {self.table_name}
+                WHERE status = 'done'
+                  AND finished_at > now() - make_interval(secs => %s)
+            )
+            SELECT
+                COALESCE(sum(chunk_count), 0),
+                COALESCE(sum(inserted_count), 0),
+                (SELECT count(*) FROM recent),
+                (SELECT EXTRACT(EPOCH FROM now() - min(started_at)) FROM recent),
+                count(DISTINCT worker_id) FILTER (
+                    WHERE status = 'running'
+                      AND heartbeat_at > now() - make_interval(secs => %s)
+                )
+            FROM {self.table_name}
+            """,
+            (window_seconds, stale_after),
+        )
+        # Rates cover the time work was actually happening within the window.
+        observed = min(float(span), window_seconds) if span is not None else 0.0
+        return QueueProgress(
+            counts={status: counts.get(status, 0) for status in QUEUE_STATUSES},
+            chunk_count=chunks,
+            inserted_count=inserted,
+            active_workers=workers,
+            recent_done=recent,
+            window_seconds=observed,
+        )
+
+    def close(self) -> None:
+        self.conn.close()
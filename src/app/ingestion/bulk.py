@@ -0,0 +1,388 @@
+"""Resumable bulk ingestion from the command line.
+
+Usage:
+    uv run python -m app.ingestion.bulk docs/ manuals/*.pdf --urls urls.txt
+
+Documents (PDF, Markdown and text files, and URLs listed one per line) are
+ingested in batches through :func:`ingest_text_documents`. After every
+committed batch a line is appended to ``manifest.jsonl`` in the checkpoint
+directory, so re-running the same command after a crash or Ctrl-C skips the
+documents that are already stored and continues with the next batch.
+Chunks whose embeddings fail after all retries are written to
+``retry.jsonl`` instead of being stored; ``--retry`` embeds and stores them
+(and re-attempts documents that failed to load).
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, Literal, Optional
+
+from app.core.config import settings
+from app.db.vector_db import VectorDB
+from app.ingestion.ingest import EmbeddingFailure, embed_chunks, store_documents
+from app.ingestion.parallel import iter_pdf_text
+from app.ingestion.service import IngestionResult, ingest_text_documents
+from app.ingestion.web_loader.bs_loader import iter_fetch_results
+from app.models.models import Document
+
+logger = logging.getLogger(__name__)
+
+TEXT_SUFFIXES = {".md", ".markdown", ".txt"}
+SourceKind = Literal["url", "pdf", "text"]
+
+
+@dataclass(slots=True)
+class BulkSource:
+    """One document to ingest: its source ID and where to load it from."""
+
+    id: str
+    kind: SourceKind
+    location: str
+
+
+def collect_sources(
+    paths: Iterable[str], url_file: Optional[str] = None
+) -> list[BulkSource]:
+    """
+    Expand files, directories and a URL list into sources in a stable order.
+
+    PDFs get ``file://`` source IDs like uploads through the API; files under
+    a directory are named by their path relative to it.
+    """
+
+    sources: dict[str, BulkSource] = {}
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            files = [
+                (file, file.relative_to(path).as_posix())
+                for file in sorted(path.rglob("*"))
+                if file.is_file()
+            ]
+        else:
+            files = [(path, path.name)]
+
+        for file, name in files:
+            suffix = file.suffix.lower()
+            if suffix == ".pdf":
+                kind: SourceKind = "pdf"
+            elif suffix in TEXT_SUFFIXES:
+                kind = "text"
+            else:
+                continue
+            source_id = f"file://{name}"
+            sources.setdefault(source_id, BulkSource(source_id, kind, str(file)))
+
+    if url_file:
+        for line in Path(url_file).read_text().splitlines():
+            url = line.strip()
+            if url and not url.startswith("#"):
+                sources.setdefault(url, BulkSource(url, "url", url))
+
+    return list(sources.values())
+
+
+class Checkpoint:
+    """Append-only manifest of committed batches plus a retry file of failed chunks."""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.directory / "manifest.jsonl"
+        self.retry_path = self.directory / "retry.jsonl"
+        self.completed: set[str] = set()
+        self.failed: dict[str, str] = {}
+        self.batches = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not self.manifest_path.exists():
+            return
+        with self.manifest_path.open() as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash while appending leaves a torn last line; that
+                    # batch was not recorded and will run again.
+                    logger.warning("Ignoring incomplete manifest line")
+                    continue
+                self.batches = max(self.batches, record.get("batch", 0))
+                self.completed.update(record.get("documents", []))
+                self.failed.update(record.get("failed", {}))
+        for source_id in self.completed:
+            self.failed.pop(source_id, None)
+
+    @staticmethod
+    def _append(path: Path, records: Iterable[dict]) -> None:
+        with path.open("a") as handle:
+            for record in records:
+                handle.write(json.dumps(record) + "\n")
+            handle.flush()
+            os.fsync(handle.fileno())
+
+    def commit_batch(self, record: dict) -> None:
+        """Durably record a batch whose documents are stored in the index."""
+        self.batches = record["batch"]
+        self._append(self.manifest_path, [record])
+        self.completed.update(record["documents"])
+        for source_id in record["documents"]:
+            self.failed.pop(source_id, None)
+        self.failed.update(record["failed"])
+
+    def add_retry_chunks(self, failures: Iterable[EmbeddingFailure]) -> None:
+        self._append(
+            self.retry_path,
+            (
+                {
+                    "text": failure.chunk.text,
+                    "metadata": failure.chunk.metadata,
+                    "error": failure.error,
+                }
+                for failure in failures
+            ),
+        )
+
+    def read_retry_chunks(self) -> list[Document]:
+        if not self.retry_path.exists():
+            return []
+        with self.retry_path.open() as handle:
+            records = [json.loads(line) for line in handle if line.strip()]
+        return [Document(text=r["text"], metadata=r["metadata"]) for r in records]
+
+    def replace_retry_chunks(self, failures: list[EmbeddingFailure]) -> None:
+        self.retry_path.unlink(missing_ok=True)
+        if failures:
+            self.add_retry_chunks(failures)
+
+
+def load_batch(
+    batch: list[BulkSource],
+) -> tuple[list[tuple[str, str]], dict[str, str]]:
+    """Load the text of a batch; returns ``(text, source)`` pairs and load errors."""
+
+    docs: list[tuple[str, str]] = []
+    errors: dict[str, str] = {}
+
+    urls = [source.location for source in batch if source.kind == "url"]
+    for result in iter_fetch_results(urls):
+        if result.status == "failed":
+            errors[result.url] = result.error or result.content
+        else:
+            docs.append((result.content, result.url))
+
+    for source in batch:
+        try:
+            if source.kind == "pdf":
+                pages = iter_pdf_text(source.location, source.id)
+                docs.append(("".join(pages), source.id))
+            elif source.kind == "text":
+                text = Path(source.location).read_text(errors="replace")
+                docs.append((text, source.id))
+        except Exception as exc:
+            logger.error("Failed to load %s: %s", source.id, exc)
+            errors[source.id] = str(exc)
+
+    return docs, errors
+
+
+def _batches(items: list[BulkSource], size: int) -> Iterator[list[BulkSource]]:
+    for start in range(0, len(items), max(1, size)):
+        yield items[start : start + max(1, size)]
+
+
+def retry_failed_chunks(checkpoint: Checkpoint) -> tuple[int, int]:
+    """Embed and store the chunks in the retry file.
+
+    Returns:
+        The number of chunks stored and the number still failing.
+    """
+
+    chunks = checkpoint.read_retry_chunks()
+    if not chunks:
+        return 0, 0
+    embedded, dense_embeddings, failures = embed_chunks(chunks)
+    if embedded:
+        store_documents(embedded, dense_embeddings, None)
+    checkpoint.replace_retry_chunks(failures)
+    return len(embedded), len(failures)
+
+
+def run_bulk_ingest(
+    sources: list[BulkSource],
+    checkpoint: Checkpoint,
+    batch_size: int = 50,
+    chunk_size: int = settings.chunk_size,
+    overlap: int = settings.chunk_overlap,
+    retry_failed: bool = False,
+) -> IngestionResult:
+    """
+    Ingest ``sources`` in checkpointed batches, skipping committed documents.
+
+    Args:
+        sources: Documents to ingest, e.g. from :func:`collect_sources`.
+        checkpoint: Manifest of previously committed batches.
+        batch_size: Documents per batch (and per checkpoint).
+        chunk_size: Chunk size for document splitting.
+        overlap: Overlap between chunks.
+        retry_failed: Also re-attempt documents that failed to load before.
+
+    Returns:
+        IngestionResult summed over the batches run now.
+    """
+
+    pending = [
+        source
+        for source in sources
+        if source.id not in checkpoint.completed
+        and (retry_failed or source.id not in checkpoint.failed)
+    ]
+    skipped = len(sources) - len(pending)
+    if skipped:
+        logger.info(
+            "Resuming after batch %d: skipping %d of %d documents",
+            checkpoint.batches,
+            skipped,
+            len(sources),
+        )
+
+    total = IngestionResult(document_count=0, chunk_count=0, warnings=[])
+    started = time.monotonic()
+    for batch in _batches(pending, batch_size):
+        batch_started = time.monotonic()
+        docs, errors = load_batch(batch)
+        result = ingest_text_documents(docs, chunk_size, overlap)
+        if result.embedding_failures:
+            checkpoint.add_retry_chunks(result.embedding_failures)
+
+        batch_number = checkpoint.batches + 1
+        checkpoint.commit_batch(
+            {
+                "batch": batch_number,
+                "documents": [s.id for s in batch if s.id not in errors],
+                "failed": errors,
+                "chunks": result.chunk_count,
+                "inserted": result.inserted_count,
+                "deleted": result.deleted_count,
+                "duplicates": result.duplicate_count,
+                "failed_chunks": len(result.embedding_failures),
+                "seconds": round(time.monotonic() - batch_started, 3),
+                "committed_at": datetime.now().isoformat(),
+            }
+        )
+        total.merge(result)
+
+        elapsed = time.monotonic() - started
+        logger.info(
+            "Batch %d committed: %d documents, %d chunks (%d new), %d failed "
+            "documents, %d failed chunks | sustained %.1f chunks/s, %.2f docs/s",
+            batch_number,
+            len(batch) - len(errors),
+            result.chunk_count,
+            result.inserted_count,
+            len(errors),
+            len(result.embedding_failures),
+            total.chunk_count / elapsed if elapsed else 0.0,
+            total.document_count / elapsed if elapsed else 0.0,
+        )
+
+    return total
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Resumable bulk ingestion of files and URLs."
+    )
+    parser.add_argument(
+        "paths", nargs="*", help="PDF/Markdown/text files or directories."
+    )
+    parser.add_argument("--urls", help="File with one URL per line.")
+    parser.add_argument(
+        "--checkpoint-dir",
+        default="data/bulk_ingest",
+        help="Directory for manifest.jsonl and retry.jsonl (one per corpus).",
+    )
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--chunk-size", type=int, default=settings.chunk_size)
+    parser.add_argument("--overlap", type=int, default=settings.chunk_overlap)
+    parser.add_argument(
+        "--retry",
+        action="store_true",
+        help="Store chunks from retry.jsonl and re-attempt failed documents.",
+    )
+    parser.add_argument(
+        "--defer-indexes",
+        action="store_true",
+        help="Drop the vector and full-text indexes during the load and rebuild "
+        "them once at the end (for initial loads of large corpora).",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    sources = collect_sources(args.paths, args.urls)
+    if not sources and not args.retry:
+        parser.error("No PDF, Markdown, text files or URLs to ingest.")
+
+    checkpoint = Checkpoint(args.checkpoint_dir)
+    indexes = nullcontext()
+    if args.defer_indexes:
+        indexes = VectorDB(settings).bulk_load(
+            settings.index_build_work_mem, settings.index_build_parallel_workers
+        )
+    started = time.monotonic()
+    try:
+        with indexes:
+            if args.retry:
+                stored, still_failed = retry_failed_chunks(checkpoint)
+                print(f"Retried chunks: {stored} stored, {still_failed} still failing.")
+            result = run_bulk_ingest(
+                sources,
+                checkpoint,
+                batch_size=args.batch_size,
+                chunk_size=args.chunk_size,
+                overlap=args.overlap,
+                retry_failed=args.retry,
+            )
+    except RuntimeError as exc:
+        print(
+            f"Batch {checkpoint.batches + 1} failed: {exc}\n"
+            "Fix the cause and run the same command again to resume."
+        )
+        raise SystemExit(1)
+    except KeyboardInterrupt:
+        print(
+            f"Interrupted after batch {checkpoint.batches}; "
+            "run the same command again to resume."
+        )
+        raise SystemExit(130)
+
+    elapsed = time.monotonic() - started
+    print(
+        f"Ingested {result.document_count} documents into {result.chunk_count} chunks "
+        f"({result.inserted_count} new) in {elapsed:.1f}s: "
+        f"{result.chunk_count / elapsed if elapsed else 0:.1f} chunks/s sustained."
+    )
+    if result.duplicate_count:
+        print(
+            f"Collapsed {result.duplicate_count} near-duplicate chunks, saving as "
+            f"many embedding calls and about "
+            f"{result.duplicate_bytes_saved / 1024 / 1024:.1f} MB of storage."
+        )
+    if checkpoint.failed:
+        print(f"{len(checkpoint.failed)} documents failed to load; rerun with --retry.")
+    if result.embedding_failures:
+        print(
+            f"{len(result.embedding_failures)} chunks failed to embed and were written "
+            f"to {checkpoint.retry_path}; rerun with --retry."
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,59 @@
-from typing import List, Tuple
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
-import requests
-from tenacity import (
-    retry,
-    retry_if_exception_type,
-    stop_after_attempt,
-    wait_exponential,
-)
 
 from app.core.config import settings as config
-from app.db.vector_db import VectorDB
+from app.db.vector_db import SourceSyncStats, VectorDB
+from app.ingestion.parallel import parallel_split_docs
 from app.ingestion.web_loader.bs_loader import load_web_docs
 from app.models.models import Document
+from app.utils.near_duplicates import NearDuplicateIndex, minhash
 from app.utils.progress import progress_bar
-from app.utils.utils import split_docs
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class EmbeddingFailure:
+    """A chunk whose embedding still failed after all retries."""
+
+    chunk: Document
+    error: str
+
+
+@dataclass(slots=True)
+class NearDuplicate:
+    """A chunk stored as one more source of a similar row instead of its own."""
+
+    chunk: Document
+    chunk_id: str
+    # Stored row, or chunk of the same batch that gets a row, it collapses into
+    target_id: str
+    similarity: float
+    # The batch chunk it collapses into; None when the row is already stored
+    target: Optional[Document] = None
+
+
+@dataclass(slots=True)
+class ChunkSelection:
+    """The chunks of a batch that need embeddings, and those that do not."""
+
+    new: List[Document]
+    duplicates: List[NearDuplicate]
+
+    def failed_duplicates(
+        self, failures: Sequence[EmbeddingFailure]
+    ) -> List[EmbeddingFailure]:
+        """Near-duplicates of chunks whose embedding failed; they fail with them."""
+        errors = {id(failure.chunk): failure.error for failure in failures}
+        return [
+            EmbeddingFailure(chunk=duplicate.chunk, error=errors[id(duplicate.target)])
+            for duplicate in self.duplicates
+            if duplicate.target is not None and id(duplicate.target) in errors
+        ]
 
 
 def load_documents(urls: List[str]) -> List[Tuple[str, str]]:
@@ -25,43 +64,82 @@ def load_documents(urls: List[str]) -> List[Tuple[str, str]]:
 def split_documents(
     docs: List[Tuple[str, str]], chunk_size: int, overlap: int
 ) -> List[Document]:
-    """Split documents into chunks."""
-    return split_docs(docs, chunk_size, overlap)
-
-
-@retry(
-    retry=retry_if_exception_type((requests.exceptions.RequestException, Exception)),
-    wait=wait_exponential(multiplier=1, min=4, max=60),
-    stop=stop_after_attempt(5),
-)
-def _get_embedding_with_retry(vector_db: VectorDB, text: str) -> np.ndarray:
-    """Get dense embedding with retry logic."""
-    return vector_db.get_embeddings(text)
+    """Split documents into chunks, in worker processes when INGESTION_WORKERS > 1."""
+    return parallel_split_docs(docs, chunk_size, overlap)
 
 
-def generate_embeddings(chunks: List[Document]) -> Tuple[List[np.ndarray], None]:
+def embed_chunks(
+    chunks: List[Document],
+) -> Tuple[List[Document], List[np.ndarray], List[EmbeddingFailure]]:
     """Generate dense embeddings for document chunks.
 
-    Note: Sparse embeddings are no longer generated as PostgreSQL's tsvector
-    handles full-text search automatically.
+    Requests run concurrently at ingestion priority; the shared embedding
+    scheduler paces them against the provider's rate limits and retries
+    throttled calls (see :mod:`app.utils.rate_limit`). Chunks that still fail
+    are returned as failures rather than given placeholder vectors, which
+    would otherwise sit in the HNSW index as zero vectors.
+
+    Returns:
+        The embedded chunks, their embeddings in the same order, and failures.
     """
     vector_db = VectorDB(config)
-
-    dense_embeddings = []
+    vectors: List[Optional[np.ndarray]] = [None] * len(chunks)
+    errors: Dict[int, str] = {}
 
     with progress_bar("Generating embeddings...") as progress:
         task = progress.add_task("Generating embeddings...", total=len(chunks))
 
-        for i, chunk in enumerate(chunks):
+        # The scheduler decides how many requests actually run at once.
+        with ThreadPoolExecutor(
+            max_workers=config.embeddings_max_concurrency,
+            thread_name_prefix="embed",
+        ) as executor:
+            futures = {
+                executor.submit(vector_db.get_embeddings, chunk.text, "ingest"): i
+                for i, chunk in enumerate(chunks)
+            }
             try:
-                dense_embedding = _get_embedding_with_retry(vector_db, chunk.text)
-                dense_embeddings.append(dense_embedding)
-                progress.update(task, advance=1)
+                for future in as_completed(futures):
+                    i = futures[future]
+                    try:
+                        vectors[i] = future.result()
+                    except Exception as e:
+                        logger.error("Failed after retries on chunk %d: %s", i, e)
+                        errors[i] = str(e)
+                    progress.update(task, advance=1)
+            finally:
+                for future in futures:
+                    future.cancel()
 
-            except Exception as e:
-                print(f"Failed after retries on chunk {i}: {str(e)}")
-                # Append zero embeddings as fallback
-                dense_embeddings.append(np.zeros(config.embeddings_dim))
+    embedded: List[Document] = []
+    dense_embeddings: List[np.ndarray] = []
+    failures: List[EmbeddingFailure] = []
+    for i, chunk in enumerate(chunks):
+        vector = vectors[i]
+        if vector is None:
+            failures.append(EmbeddingFailure(chunk=chunk, error=errors.get(i, "")))
+        else:
+            embedded.append(chunk)
+            dense_embeddings.append(vector)
+    return embedded, dense_embeddings, failures
+
+
+def generate_embeddings(chunks: List[Document]) -> Tuple[List[np.ndarray], None]:
+    """Generate dense embeddings for document chunks.
+
+    Note: Sparse embeddings are no longer generated as PostgreSQL's tsvector
+    handles full-text search automatically.
+
+    Raises:
+        RuntimeError: If any chunk could not be embedded (see :func:`embed_chunks`
+            to keep the successful ones).
+    """
+    _, dense_embeddings, failures = embed_chunks(chunks)
+    if failures:
+        raise RuntimeError(
+            f"{len(failures)} of {len(chunks)} chunks could not be embedded: "
+            f"{failures[0].error}"
+        )
 
     # Return None for sparse_embeddings (not needed with PostgreSQL tsvector)
     return dense_embeddings, None
@@ -83,3 +161,149 @@ def store_documents(
             sparse_embeddings=None,  # PostgreSQL generates tsvector automatically
         )
         progress.update(task, advance=1)
+
+
+def _by_source(chunks: List[Document]) -> Dict[Optional[str], List[Document]]:
+    """Group chunks by source, in the order sources are synced."""
+    by_source: Dict[Optional[str], List[Document]] = {}
+    for chunk in chunks:
+        by_source.setdefault(chunk.metadata.get("source"), []).append(chunk)
+    return by_source
+
+
+def select_new_chunks(chunks: List[Document]) -> ChunkSelection:
+    """Select the chunks whose stable IDs are not stored yet, without duplicates.
+
+    With ``NEAR_DUPLICATES`` on, new chunks whose MinHash similarity to a
+    stored row of another source, or to an earlier new chunk of another
+    source in the batch, reaches ``NEAR_DUPLICATE_THRESHOLD`` are returned as
+    near-duplicates instead. Near-duplicates within one source are stored as
+    rows of their own, so re-syncing an unchanged source stays a no-op. Only
+    the remaining new chunks need embeddings; the rest already exist in the
+    index.
+    """
+    vector_db = VectorDB(config)
+    try:
+        unique: Dict[str, Document] = {}
+        # In sync order, so a batch chunk's row exists before its duplicates
+        # are attached to it.
+        for source_chunks in _by_source(chunks).values():
+            for chunk in source_chunks:
+                unique.setdefault(vector_db.point_id(chunk), chunk)
+        stored = vector_db.existing_ids(list(unique))
+        new = {
+            point_id: chunk
+            for point_id, chunk in unique.items()
+            if point_id not in stored
+        }
+        if not config.near_duplicates or not new:
+            return ChunkSelection(new=list(new.values()), duplicates=[])
+
+        threshold = config.near_duplicate_threshold
+        signatures = {point_id: minhash(chunk.text) for point_id, chunk in new.items()}
+        stored_matches = vector_db.near_duplicate_rows(
+            {
+                point_id: (signatures[point_id], chunk.metadata.get("source"))
+                for point_id, chunk in new.items()
+            },
+            threshold,
+        )
+    finally:
+        vector_db.close()
+
+    selected: List[Document] = []
+    duplicates: List[NearDuplicate] = []
+    batch = NearDuplicateIndex()
+    for point_id, chunk in new.items():
+        match = stored_matches.get(point_id)
+        target = None
+        if match is None:
+            source = chunk.metadata.get("source")
+            match = batch.find(
+                signatures[point_id],
+                threshold,
+                accept=lambda key: new[key].metadata.get("source") != source,
+            )
+            target = new[match[0]] if match else None
+        if match is None:
+            batch.add(point_id, signatures[point_id])
+            selected.append(chunk)
+        else:
+            duplicates.append(
+                NearDuplicate(chunk, point_id, match[0], match[1], target)
+            )
+    return ChunkSelection(new=selected, duplicates=duplicates)
+
+
+def sync_documents(
+    chunks: List[Document],
+    new_chunks: List[Document],
+    dense_embeddings: List[np.ndarray],
+    failures: Sequence[EmbeddingFailure] = (),
+    duplicates: Sequence[NearDuplicate] = (),
+) -> Tuple[SourceSyncStats, List[EmbeddingFailure]]:
+    """Replace the stored chunks of every source in ``chunks``.
+
+    Each source is synced in its own transaction: stale chunks are deleted,
+    ``new_chunks`` are inserted with their embeddings, ``duplicates`` are
+    recorded as sources of the rows they collapse into and unchanged rows are
+    left alone. Chunks listed in ``failures`` have no embedding and are left
+    out until they are retried.
+
+    Returns:
+        The summed row counts, and the chunks that were not embedded because
+        their row, or the row they collapse into, was stored when they were
+        selected but has been deleted since. Like embedding failures, they
+        are stored once retried.
+    """
+    vector_db = VectorDB(config)
+    totals = SourceSyncStats()
+    missing: List[EmbeddingFailure] = []
+
+    failed_ids = {vector_db.point_id(failure.chunk) for failure in failures}
+    by_source = _by_source(
+        [
+            chunk
+            for chunk in chunks
+            if not failed_ids or vector_db.point_id(chunk) not in failed_ids
+        ]
+    )
+    embeddings_by_id = {
+        vector_db.point_id(chunk): embedding
+        for chunk, embedding in zip(new_chunks, dense_embeddings)
+    }
+    duplicate_targets = {
+        duplicate.chunk_id: duplicate.target_id for duplicate in duplicates
+    }
+
+    try:
+        with progress_bar("Syncing sources...") as progress:
+            task = progress.add_task("Syncing sources...", total=len(by_source))
+            for source, source_chunks in by_source.items():
+                stats = vector_db.replace_source_documents(
+                    source,
+                    source_chunks,
+                    embeddings_by_id,
+                    duplicates=duplicate_targets,
+                )
+                totals.inserted += stats.inserted
+                totals.deleted += stats.deleted
+                totals.updated += stats.updated
+                totals.unchanged += stats.unchanged
+                totals.collapsed += stats.collapsed
+                if stats.missing:
+                    by_id = {
+                        vector_db.point_id(chunk): chunk for chunk in source_chunks
+                    }
+                    missing.extend(
+                        EmbeddingFailure(
+                            chunk=by_id[point_id],
+                            error="stored row was deleted before it could be shared",
+                        )
+                        for point_id in stats.missing
+                    )
+                progress.update(task, advance=1)
+    finally:
+        vector_db.close()
+
+    return totals, missing
@@ -0,0 +1,205 @@
+"""Background ingestion jobs run by a bounded worker pool.
+
+A job wraps one ingestion call (web refresh, crawl or PDF upload). While it
+runs, every ``progress_bar`` in the pipeline reports to the job instead of
+the console, which gives per-stage counts, throughput and ETA for free and
+makes each progress update a cancellation point.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Literal, Optional
+
+from app.ingestion.service import IngestionResult
+from app.utils.id import create_id
+from app.utils.progress import report_progress_to
+
+logger = logging.getLogger(__name__)
+
+JobStatus = Literal["queued", "running", "completed", "failed", "cancelled"]
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+
+class IngestionCancelled(BaseException):
+    """Raised inside a job's pipeline once cancellation was requested.
+
+    Like ``asyncio.CancelledError`` it is not an ``Exception``, so the
+    pipeline's broad error handlers (e.g. the zero-embedding fallback) let it
+    through instead of treating it as a failed item.
+    """
+
+
+@dataclass(slots=True)
+class StageProgress:
+    """Counts for one pipeline stage, summed over every batch that ran it."""
+
+    name: str
+    total: Optional[float] = None
+    processed: float = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    def throughput(self) -> Optional[float]:
+        """Items per second since the stage first started."""
+        elapsed = time.monotonic() - self.started_at
+        if elapsed <= 0 or not self.processed:
+            return None
+        return self.processed / elapsed
+
+    def eta_seconds(self) -> Optional[float]:
+        rate = self.throughput()
+        if rate is None or self.total is None:
+            return None
+        return max(0.0, (self.total - self.processed) / rate)
+
+
+@dataclass(slots=True)
+class IngestionJob:
+    """State of a background ingestion job; also its progress listener."""
+
+    id: str
+    kind: str
+    status: JobStatus = "queued"
+    stages: dict[str, StageProgress] = field(default_factory=dict)
+    current_stage: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[IngestionResult] = None
+    error: Optional[str] = None
+    cancel_requested: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def stage(self) -> Optional[StageProgress]:
+        return self.stages.get(self.current_stage) if self.current_stage else None
+
+    def check_cancelled(self) -> None:
+        if self.cancel_requested.is_set():
+            raise IngestionCancelled(f"Ingestion job {self.id} was cancelled.")
+
+    def set_stage(self, description: str, total: Optional[float]) -> None:
+        self.check_cancelled()
+        name = _stage_name(description)
+        stage = self.stages.get(name)
+        if stage is None:
+            self.stages[name] = StageProgress(name=name, total=total)
+        elif stage.total is not None:
+            # Streaming ingests run the same stage once per batch.
+            stage.total = None if total is None else stage.total + total
+        self.current_stage = name
+
+    def advance(self, description: str, count: float = 1) -> None:
+        self.check_cancelled()
+        stage = self.stages.get(_stage_name(description))
+        if stage is not None:
+            stage.processed += count
+
+
+def _stage_name(description: str) -> str:
+    return description.rstrip(". ")
+
+
+class IngestionJobManager:
+    """Runs ingestion jobs on a fixed number of threads and keeps recent results."""
+
+    def __init__(self, max_workers: int = 2, retention: int = 100):
+        self.retention = max(1, retention)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_workers), thread_name_prefix="ingest-job"
+        )
+        self._lock = threading.Lock()
+        self._jobs: OrderedDict[str, IngestionJob] = OrderedDict()
+
+    def submit(
+        self,
+        kind: str,
+        run: Callable[[], IngestionResult],
+        cleanup: Optional[Callable[[], None]] = None,
+    ) -> IngestionJob:
+        """
+        Queue ``run`` as a background job and return it immediately.
+
+        Args:
+            kind: Label reported with the job, e.g. ``web`` or ``pdf``.
+            run: Blocking ingestion call producing an IngestionResult.
+            cleanup: Called once the job finishes, however it ends.
+        """
+
+        job = IngestionJob(id=create_id(), kind=kind)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, run, cleanup)
+        logger.info("Queued %s ingestion job %s", kind, job.id)
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> list[IngestionJob]:
+        """Return known jobs, newest first."""
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def cancel(self, job_id: str) -> Optional[IngestionJob]:
+        """
+        Request cancellation of a job.
+
+        Queued jobs never start. Running jobs stop at their next progress
+        update; batches already stored by a streaming ingest are kept.
+        """
+
+        job = self.get(job_id)
+        if job is not None and job.status not in FINISHED_STATUSES:
+            job.cancel_requested.set()
+        return job
+
+    def shutdown(self) -> None:
+        """Cancel outstanding jobs and stop the worker threads."""
+        with self._lock:
+            for job in self._jobs.values():
+                job.cancel_requested.set()
+        # Queued jobs still pass through _run so they are marked and cleaned up.
+        self._executor.shutdown(wait=False)
+
+    def _run(
+        self,
+        job: IngestionJob,
+        run: Callable[[], IngestionResult],
+        cleanup: Optional[Callable[[], None]],
+    ) -> None:
+        try:
+            job.check_cancelled()
+            job.status = "running"
+            job.started_at = datetime.now()
+            with report_progress_to(job):
+                job.result = run()
+            job.status = "completed"
+        except IngestionCancelled:
+            job.status = "cancelled"
+            logger.info("Ingestion job %s cancelled", job.id)
+        except Exception as exc:
+            job.status = "failed"
+            job.error = str(exc)
+            logger.error("Ingestion job %s failed: %s", job.id, exc, exc_info=True)
+        finally:
+            job.finished_at = datetime.now()
+            if cleanup is not None:
+                try:
+                    cleanup()
+                except Exception as exc:
+                    logger.warning("Cleanup for job %s failed: %s", job.id, exc)
+
+    def _prune(self) -> None:
+        finished = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.status in FINISHED_STATUSES
+        ]
+        for job_id in finished[: max(0, len(finished) - self.retention)]:
+            del self._jobs[job_id]
@@ -0,0 +1,200 @@
+"""Process-pool execution for CPU-bound ingestion steps.
+
+PDF extraction (``pymupdf4llm``) and chunking are pure Python/C work that holds
+the GIL, so threads do not help. When ``INGESTION_WORKERS`` is greater than one
+these helpers fan the work out to a shared ``ProcessPoolExecutor``. Results are
+collected in submission order, so chunk order always matches the serial path.
+"""
+
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from app.core.config import settings
+from app.ingestion.pdf_loader.pdf_to_text import (
+    PdfSource,
+    extract_text_from_pdf,
+    inspect_pdf,
+    iter_pdf_pages,
+)
+from app.models.models import Document
+from app.utils.chunker import resolve_length_function
+from app.utils.progress import progress_bar
+from app.utils.utils import split_document, split_docs
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def resolve_worker_count(workers: int | None = None) -> int:
+    """Return the effective worker count; ``0`` means one per CPU core."""
+
+    requested = settings.ingestion_workers if workers is None else workers
+    if requested <= 0:
+        return os.cpu_count() or 1
+    return requested
+
+
+def get_executor(workers: int) -> ProcessPoolExecutor:
+    """Return the shared process pool, recreating it if the size changed."""
+
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False, cancel_futures=True)
+            # "spawn" avoids forking a process that already runs server threads.
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _executor_workers = workers
+            logger.info("Started ingestion process pool with %d workers", workers)
+        return _executor
+
+
+def shutdown_executor() -> None:
+    """Shut down the shared process pool, if one was started."""
+
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
+            _executor_workers = 0
+
+
+def _split_task(
+    args: tuple[str, str, int, int, str, str],
+) -> list[Document]:
+    text, source, chunk_size, overlap, size_unit, tokenizer = args
+    length_function = resolve_length_function(size_unit, tokenizer)
+    return split_document(text, source, chunk_size, overlap, length_function)
+
+
+def parallel_split_docs(
+    docs: list[tuple[str, str]],
+    chunk_size: int = 500,
+    overlap: int = 100,
+    workers: int | None = None,
+) -> list[Document]:
+    """Split documents across worker processes, preserving document order."""
+
+    worker_count = resolve_worker_count(workers)
+    if worker_count <= 1 or len(docs) <= 1:
+        length_function = resolve_length_function(
+            settings.chunk_size_unit, settings.chunk_tokenizer
+        )
+        return split_docs(docs, chunk_size, overlap, length_function=length_function)
+
+    tasks = [
+        (
+            text,
+            source,
+            chunk_size,
+            overlap,
+            settings.chunk_size_unit,
+            settings.chunk_tokenizer,
+        )
+        for text, source in docs
+    ]
+    batch = max(1, len(tasks) // (worker_count * 4))
+    executor = get_executor(worker_count)
+
+    all_chunks: list[Document] = []
+    with progress_bar("Splitting documents...") as progress:
+        task = progress.add_task("Splitting documents...", total=len(docs))
+        for chunks in executor.map(_split_task, tasks, chunksize=batch):
+            all_chunks.extend(chunks)
+            progress.update(task, advance=1)
+
+    logger.info(
+        "Split %d documents into %d chunks using %d processes.",
+        len(docs),
+        len(all_chunks),
+        worker_count,
+    )
+    return all_chunks
+
+
+def _extract_pages_task(args: tuple[str, str, int, int, Any]) -> str:
+    path, source_name, first_page, last_page, hdr_info = args
+    return extract_text_from_pdf(
+        path,
+        source_name,
+        pages=range(first_page, last_page),
+        show_progress=False,
+        hdr_info=hdr_info,
+    )
+
+
+def _page_ranges(page_count: int, pages_per_task: int) -> list[tuple[int, int]]:
+    step = max(1, pages_per_task)
+    return [
+        (first, min(first + step, page_count)) for first in range(0, page_count, step)
+    ]
+
+
+def iter_pdf_text(
+    pdf_source: PdfSource,
+    source_name: str,
+    workers: int | None = None,
+    pages_per_task: int | None = None,
+) -> Iterator[str]:
+    """
+    Yield the markdown of one PDF in document order, a page or page range at a time.
+
+    In-process this is :func:`iter_pdf_pages`. With worker processes, page
+    ranges are extracted in the pool with at most two ranges per worker in
+    flight, so finished text never piles up ahead of the consumer.
+
+    Raises:
+        Exception: Whatever opening or converting the PDF raised.
+    """
+
+    worker_count = resolve_worker_count(workers)
+    if worker_count <= 1:
+        yield from iter_pdf_pages(pdf_source, source_name)
+        return
+
+    temp_path: Optional[Path] = None
+    if isinstance(pdf_source, (str, Path)):
+        path = Path(pdf_source)
+    else:
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as handle:
+            handle.write(pdf_source)
+        path = temp_path = Path(handle.name)
+
+    pending: deque[Future] = deque()
+    try:
+        page_count, hdr_info = inspect_pdf(path)
+        step = pages_per_task or settings.pdf_pages_per_task
+        ranges = iter(_page_ranges(page_count, step))
+        executor = get_executor(worker_count)
+
+        def submit_next() -> None:
+            for first, last in ranges:
+                task = (str(path), source_name, first, last, hdr_info)
+                pending.append(executor.submit(_extract_pages_task, task))
+                return
+
+        for _ in range(worker_count * 2):
+            submit_next()
+        while pending:
+            text = pending.popleft().result()
+            submit_next()
+            yield text
+    finally:
+        for future in pending:
+            future.cancel()
+        if temp_path is not None:
+            temp_path.unlink(missing_ok=True)
@@ -1,17 +1,22 @@
 import logging
 from pathlib import Path
-from typing import Union
+from typing import TYPE_CHECKING, Any, Iterator, Optional, Sequence, Union
 
-import pymupdf
-import pymupdf4llm
+if TYPE_CHECKING:
+    import pymupdf
 
 logger = logging.getLogger(__name__)
 
 
-def extract_text_from_pdf(
-    pdf_source: Union[str, bytes, Path], source_name: str | None = None
-) -> str:
-    """Extract text from a PDF file path or raw bytes as markdown."""
+PdfSource = Union[str, bytes, Path]
+
+
+def _open_pdf(
+    pdf_source: PdfSource, source_name: str | None = None
+) -> "pymupdf.Document":
+    """Open a PDF from a path or bytes, logging a readable error on failure."""
+    # Imported here so web-only ingestion and query workers never load it.
+    import pymupdf
 
     source_label = source_name or (
         str(pdf_source) if isinstance(pdf_source, (str, Path)) else "uploaded-pdf"
@@ -19,9 +24,8 @@ def extract_text_from_pdf(
 
     try:
         if isinstance(pdf_source, (str, Path)):
-            doc = pymupdf.open(pdf_source)
-        else:
-            doc = pymupdf.open(stream=pdf_source, filetype="pdf")
+            return pymupdf.open(pdf_source)
+        return pymupdf.open(stream=pdf_source, filetype="pdf")
     except FileNotFoundError:
         error_msg = f"PDF file not found: {source_label}"
         logger.error(error_msg)
@@ -35,8 +39,90 @@ def extract_text_from_pdf(
         logger.error(error_msg)
         raise
 
+
+def extract_text_from_pdf(
+    pdf_source: PdfSource,
+    source_name: str | None = None,
+    pages: Optional[Sequence[int]] = None,
+    show_progress: bool = False,
+    hdr_info: Any = None,
+) -> str:
+    """Extract text from a PDF file path or raw bytes as markdown.
+
+    Args:
+        pdf_source: Path to the PDF or its raw bytes.
+        source_name: Label used in log messages.
+        pages: Optional 0-based page numbers to extract; defaults to all pages.
+        show_progress: Whether pymupdf4llm renders its console progress bar.
+        hdr_info: Optional header detector computed over the whole document
+            (see :func:`inspect_pdf`), so page subsets keep the same headings.
+    """
+
+    import pymupdf4llm
+
+    doc = _open_pdf(pdf_source, source_name)
     try:
-        markdown_text = pymupdf4llm.to_markdown(doc, show_progress=True)
+        markdown_text = pymupdf4llm.to_markdown(
+            doc,
+            pages=list(pages) if pages is not None else None,
+            show_progress=show_progress,
+            hdr_info=hdr_info,
+        )
         return markdown_text
     finally:
         doc.close()
+
+
+def inspect_pdf(pdf_source: PdfSource) -> tuple[int, Any]:
+    """Return the page count and document-wide header info for a PDF.
+
+    The header info is ``None`` when the installed pymupdf4llm no longer
+    exposes ``IdentifyHeaders`` (layout mode detects headings per page).
+    """
+
+    import pymupdf4llm
+
+    doc = _open_pdf(pdf_source)
+    try:
+        identify_headers = getattr(pymupdf4llm, "IdentifyHeaders", None)
+        hdr_info = identify_headers(doc) if identify_headers else None
+        return doc.page_count, hdr_info
+    finally:
+        doc.close()
+
+
+def iter_pdf_pages(
+    pdf_source: PdfSource,
+    source_name: str | None = None,
+    hdr_info: Any = None,
+) -> Iterator[str]:
+    """Yield the markdown of a PDF one page at a time.
+
+    Only the current page's text is held in memory, so large manuals can be
+    chunked while they are being extracted. Opening from a path lets PyMuPDF
+    read the file on demand instead of loading it whole. Concatenating the
+    pages gives the same text as :func:`extract_text_from_pdf`.
+
+    Args:
+        pdf_source: Path to the PDF or its raw bytes.
+        source_name: Label used in log messages.
+        hdr_info: Optional header detector; computed over the whole document
+            when omitted so headings match the single-call extraction.
+    """
+
+    import pymupdf4llm
+
+    doc = _open_pdf(pdf_source, source_name)
+    try:
+        if hdr_info is None:
+            identify_headers = getattr(pymupdf4llm, "IdentifyHeaders", None)
+            hdr_info = identify_headers(doc) if identify_headers else None
+        for page_number in range(doc.page_count):
+            yield pymupdf4llm.to_markdown(
+                doc,
+                pages=[page_number],
+                show_progress=False,
+                hdr_info=hdr_info,
+            )
+    finally:
+        doc.close()
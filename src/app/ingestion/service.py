@@ -1,13 +1,28 @@
 import logging
-from dataclasses import dataclass
-from typing import Iterable, Tuple
+from dataclasses import dataclass, field
+from typing import Iterable, Optional, Sequence, Tuple
 
 from app.core.config import settings
+from app.db.fetch_state_db import FetchStateDB
 from app.ingestion.ingest import (
-    generate_embeddings,
+    EmbeddingFailure,
+    embed_chunks,
+    select_new_chunks,
     split_documents,
-    store_documents,
+    sync_documents,
 )
+from app.ingestion.parallel import iter_pdf_text
+from app.ingestion.pdf_loader.pdf_to_text import PdfSource
+from app.ingestion.web_loader.bs_loader import (
+    FetchReport,
+    FetchResult,
+    iter_fetch_results,
+)
+from app.ingestion.web_loader.crawler import crawl_site
+from app.models.models import Document
+from app.utils.chunker import resolve_length_function
+from app.utils.progress import report_advance, report_stage
+from app.utils.utils import split_document_stream
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +36,25 @@ class IngestionResult:
     document_count: int
     chunk_count: int
     warnings: list[str]
+    inserted_count: int = 0
+    deleted_count: int = 0
+    # near-duplicate chunks newly collapsed into existing rows, i.e. embedding
+    # calls and rows saved, and the approximate vector and text bytes saved
+    duplicate_count: int = 0
+    duplicate_bytes_saved: int = 0
+    fetch_report: Optional[FetchReport] = None
+    embedding_failures: list[EmbeddingFailure] = field(default_factory=list)
+
+    def merge(self, other: "IngestionResult") -> None:
+        """Accumulate the counts and warnings of another run into this one."""
+        self.document_count += other.document_count
+        self.chunk_count += other.chunk_count
+        self.inserted_count += other.inserted_count
+        self.deleted_count += other.deleted_count
+        self.duplicate_count += other.duplicate_count
+        self.duplicate_bytes_saved += other.duplicate_bytes_saved
+        self.warnings.extend(other.warnings)
+        self.embedding_failures.extend(other.embedding_failures)
 
 
 def _normalize_documents(
@@ -48,6 +82,10 @@ def ingest_text_documents(
     """
     Ingest a collection of text documents into the vector store.
 
+    Each document replaces everything previously stored for its source: only
+    chunks that are not stored yet are embedded and inserted, and chunks the
+    new version no longer produces are deleted.
+
     Args:
         docs: Iterable of ``(text, source_identifier)`` tuples.
         chunk_size: Chunk size for document splitting.
@@ -83,36 +121,251 @@ def ingest_text_documents(
         logger.exception("Failed to split documents: %s", exc)
         raise RuntimeError(f"Failed to split documents: {exc}") from exc
 
+    return _store_chunks(chunks, len(normalized_docs), warnings)
+
+
+def _store_chunks(
+    chunks: list[Document], document_count: int, warnings: list[str]
+) -> IngestionResult:
+    """Embed the chunks that are not stored yet and sync every source."""
+
     if not chunks:
         warnings.append(
             "Document splitting produced zero chunks; nothing was stored in the index."
         )
         return IngestionResult(
-            document_count=len(normalized_docs),
+            document_count=document_count,
             chunk_count=0,
             warnings=warnings,
         )
 
     try:
-        dense_embeddings, sparse_embeddings = generate_embeddings(chunks)
+        selection = select_new_chunks(chunks)
+        embedded, dense_embeddings, failures = embed_chunks(selection.new)
     except Exception as exc:
         logger.exception("Failed to generate embeddings: %s", exc)
         raise RuntimeError(f"Failed to generate embeddings: {exc}") from exc
+    # Near-duplicates of a failed chunk are retried together with it.
+    failures.extend(selection.failed_duplicates(failures))
 
     try:
-        store_documents(chunks, dense_embeddings, sparse_embeddings)
+        stats, missing = sync_documents(
+            chunks, embedded, dense_embeddings, failures, selection.duplicates
+        )
     except Exception as exc:
         logger.exception("Failed to store documents: %s", exc)
         raise RuntimeError(f"Failed to store documents: {exc}") from exc
+    failures.extend(missing)
+
+    if failures:
+        warnings.append(
+            f"{len(failures)} chunks could not be embedded and were not stored "
+            f"(first error: {failures[0].error})."
+        )
+
+    bytes_saved = 0
+    if stats.collapsed:
+        text_bytes = sum(
+            len(duplicate.chunk.text.encode()) for duplicate in selection.duplicates
+        ) / max(1, len(selection.duplicates))
+        bytes_saved = int(stats.collapsed * (settings.embeddings_dim * 4 + text_bytes))
+        logger.info(
+            "Collapsed %d near-duplicate chunks into existing rows: %d embedding "
+            "calls and about %.1f KB of vectors and text saved.",
+            stats.collapsed,
+            stats.collapsed,
+            bytes_saved / 1024,
+        )
 
     logger.info(
-        "Completed ingestion: %d documents -> %d chunks.",
-        len(normalized_docs),
+        "Completed ingestion: %d documents -> %d chunks "
+        "(%d inserted, %d deleted, %d unchanged).",
+        document_count,
         len(chunks),
+        stats.inserted,
+        stats.deleted,
+        stats.unchanged + stats.updated,
     )
 
     return IngestionResult(
-        document_count=len(normalized_docs),
+        document_count=document_count,
         chunk_count=len(chunks),
         warnings=warnings,
+        inserted_count=stats.inserted,
+        deleted_count=stats.deleted,
+        duplicate_count=stats.collapsed,
+        duplicate_bytes_saved=bytes_saved,
+        embedding_failures=failures,
     )
+
+
+def ingest_pdf_files(
+    pdfs: Sequence[Tuple[PdfSource, str]],
+    chunk_size: int = settings.chunk_size,
+    overlap: int = settings.chunk_overlap,
+) -> IngestionResult:
+    """
+    Ingest PDFs by chunking their pages as they are extracted.
+
+    The full markdown of a document is never assembled: pages stream from
+    the extractor straight into the chunker, so memory grows with the
+    chunks kept for storage rather than with the extracted text.
+
+    Args:
+        pdfs: ``(path_or_bytes, source_identifier)`` pairs. Prefer paths so
+            PyMuPDF reads the file on demand.
+        chunk_size: Chunk size for document splitting.
+        overlap: Overlap between chunks.
+
+    Returns:
+        IngestionResult containing counts and per-file warnings.
+    """
+
+    length_function = resolve_length_function(
+        settings.chunk_size_unit, settings.chunk_tokenizer
+    )
+    chunks: list[Document] = []
+    warnings: list[str] = []
+    document_count = 0
+
+    def tracked_pages(pdf_source: PdfSource, source: str) -> Iterable[str]:
+        for page in iter_pdf_text(pdf_source, source):
+            report_advance("Extracting PDF pages")
+            yield page
+
+    report_stage("Extracting PDF pages")
+    for pdf_source, source in pdfs:
+        try:
+            doc_chunks = list(
+                split_document_stream(
+                    tracked_pages(pdf_source, source),
+                    source,
+                    chunk_size,
+                    overlap,
+                    length_function,
+                )
+            )
+        except Exception as exc:
+            logger.warning("Failed to parse PDF %s: %s", source, exc, exc_info=exc)
+            warnings.append(f"{source}: failed to extract text ({exc}).")
+            continue
+
+        if not doc_chunks:
+            warnings.append(f"{source}: produced empty text after extraction.")
+            continue
+        chunks.extend(doc_chunks)
+        document_count += 1
+
+    if not document_count:
+        return IngestionResult(document_count=0, chunk_count=0, warnings=warnings)
+
+    logger.info(
+        "Split %d PDFs into %d chunks while extracting.", document_count, len(chunks)
+    )
+    return _store_chunks(chunks, document_count, warnings)
+
+
+def ingest_fetch_results(
+    results: Iterable[FetchResult],
+    fetch_state_db: Optional[FetchStateDB] = None,
+    batch_size: int = settings.ingest_stream_batch,
+    chunk_size: int = settings.chunk_size,
+    overlap: int = settings.chunk_overlap,
+    expected: int | None = None,
+) -> IngestionResult:
+    """
+    Ingest web pages in batches while they are still being fetched.
+
+    Changed pages are ingested every ``batch_size`` pages; unchanged,
+    duplicate and failed pages are only reported. With
+    ``WEB_EXTRACTION_MODE=main``, pages only arrive once all were fetched,
+    because site-wide boilerplate is removed first. Fetch state for a page is
+    persisted once its batch has been stored.
+
+    Args:
+        results: FetchResults, e.g. from ``crawl_site`` or ``iter_fetch_results``.
+        fetch_state_db: Optional store for per-URL validators and hashes.
+        batch_size: Number of changed pages per ingestion batch.
+        chunk_size: Chunk size for document splitting.
+        overlap: Overlap between chunks.
+        expected: Number of pages expected, if known, for progress reporting.
+
+    Returns:
+        IngestionResult with summed counts and a ``fetch_report``.
+    """
+
+    total = IngestionResult(
+        document_count=0, chunk_count=0, warnings=[], fetch_report=FetchReport()
+    )
+    batch: list[FetchResult] = []
+    report_stage("Fetching pages", total=expected)
+
+    def flush() -> None:
+        if not batch:
+            return
+        docs = [(result.content, result.url) for result in batch]
+        total.merge(ingest_text_documents(docs, chunk_size, overlap))
+        if fetch_state_db is not None:
+            fetch_state_db.save_records(result.to_record() for result in batch)
+        batch.clear()
+
+    for result in results:
+        if result.status == "fetched" and not result.content.strip():
+            result.status = "failed"
+            total.warnings.append(f"{result.url}: no content extracted.")
+        elif result.status == "failed":
+            total.warnings.append(f"{result.url}: {result.error or result.content}")
+        total.fetch_report.add(result)
+        report_advance("Fetching pages")
+
+        if result.status == "unchanged" and fetch_state_db is not None:
+            fetch_state_db.save_records([result.to_record()])
+        elif result.status == "fetched":
+            batch.append(result)
+            if len(batch) >= max(1, batch_size):
+                flush()
+
+    flush()
+    return total
+
+
+def ingest_web_urls(
+    urls: Sequence[str],
+    fetch_state_db: Optional[FetchStateDB] = None,
+    force: bool = False,
+    crawl: bool = False,
+    max_depth: int | None = None,
+    max_pages: int | None = None,
+) -> IngestionResult:
+    """
+    Fetch (or crawl from) URLs and ingest changed pages in streaming batches.
+
+    Args:
+        urls: URLs to refresh, or crawl seeds when ``crawl`` is set.
+        fetch_state_db: Store of per-URL validators and hashes; pages that
+            are unchanged since the last ingest are skipped.
+        force: Ignore stored fetch state and re-ingest every page.
+        crawl: Follow same-domain links breadth-first from ``urls``.
+        max_depth: Crawl depth limit; defaults to ``CRAWL_MAX_DEPTH``.
+        max_pages: Crawl page limit; defaults to ``CRAWL_MAX_PAGES``.
+
+    Returns:
+        IngestionResult with summed counts and a ``fetch_report``.
+    """
+
+    use_state = fetch_state_db is not None and not force
+    distinct = list(dict.fromkeys(urls))
+    # Every stored page of these hosts counts towards site-wide boilerplate.
+    previous = fetch_state_db.get_host_records(distinct) if use_state else {}
+    if crawl:
+        pages = crawl_site(
+            distinct,
+            max_depth=max_depth,
+            max_pages=max_pages,
+            previous=previous.get,
+            stored=previous.values(),
+        )
+        return ingest_fetch_results(pages, fetch_state_db)
+
+    pages = iter_fetch_results(distinct, previous)
+    return ingest_fetch_results(pages, fetch_state_db, expected=len(distinct))
@@ -1,58 +1,425 @@
+import hashlib
 import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, Literal, Mapping, Optional
+from urllib.parse import urljoin, urlsplit
 
 import requests
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+from app.core.config import settings
+from app.db.fetch_state_db import FetchRecord
+from app.ingestion.web_loader.extract import (
+    BoilerplateFilter,
+    ParsedPage,
+    parse_main_content,
+)
 from app.utils.progress import progress_bar
 
 logger = logging.getLogger(__name__)
 
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
 
-def load_web_docs(urls: list[str]) -> list[tuple[str, str]]:
-    """Load content from a list of URLs."""
+
+def get_session() -> requests.Session:
+    """Return the shared keep-alive HTTP session used by the web loader."""
+
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=settings.web_fetch_retries,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=("GET", "HEAD"),
+                respect_retry_after_header=True,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=settings.web_max_concurrency,
+                pool_maxsize=settings.web_per_host_concurrency,
+                max_retries=retry,
+            )
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+FetchStatus = Literal["fetched", "unchanged", "duplicate", "failed"]
+
+
+@dataclass(slots=True)
+class FetchResult:
+    """Outcome of fetching a single URL."""
+
+    url: str
+    status: FetchStatus
+    content: str = ""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+    error: Optional[str] = None
+    links: list[str] = field(default_factory=list)
+    canonical_url: Optional[str] = None
+    # Extracted blocks awaiting boilerplate removal, and their keys.
+    blocks: list[str] = field(default_factory=list)
+    block_keys: Optional[str] = None
+
+    def to_record(self) -> FetchRecord:
+        """Build the fetch state to persist once this result has been ingested."""
+        return FetchRecord(
+            url=self.url,
+            etag=self.etag,
+            last_modified=self.last_modified,
+            content_hash=self.content_hash,
+            block_keys=self.block_keys,
+            fetched_at=datetime.now(),
+        )
+
+
+@dataclass(slots=True)
+class FetchReport:
+    """URLs grouped by fetch outcome."""
+
+    fetched: list[str] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+    duplicate: list[str] = field(default_factory=list)
+    failed: list[str] = field(default_factory=list)
+
+    def add(self, result: FetchResult) -> None:
+        getattr(self, result.status).append(result.url)
+
+
+def content_hash(text: str) -> str:
+    """Return the hash used to detect unchanged extracted text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class HostLimiter:
+    """Per-host semaphores bounding concurrent requests to the same server."""
+
+    def __init__(self, limit: int):
+        self._lock = threading.Lock()
+        self._semaphores: dict[str, threading.BoundedSemaphore] = defaultdict(
+            lambda: threading.BoundedSemaphore(max(1, limit))
+        )
+
+    def __call__(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            return self._semaphores[host]
+
+
+def remove_boilerplate(
+    results: list[FetchResult],
+    previous: Callable[[str], Optional[FetchRecord]],
+    stored: Iterable[FetchRecord] = (),
+) -> None:
+    """
+    Strip blocks repeated across a site from the pages of one run, in place.
+
+    Every page is counted before any is cleaned, so the output does not
+    depend on the order fetches completed. Stored pages of the same hosts
+    that were not extracted in this run, such as 304 answers, count through
+    the block keys saved with their fetch state. The content hash is taken
+    after cleaning: a page is ``unchanged`` only when its cleaned text is,
+    so stored pages are cleaned again once one of their blocks turns out to
+    be boilerplate.
+    """
+
+    boilerplate = BoilerplateFilter(min_pages=settings.web_boilerplate_min_pages)
+    for record in stored:
+        if record.block_keys:
+            boilerplate.add(record.url, record.block_keys.split())
+    for result in results:
+        if result.block_keys:
+            boilerplate.add(result.url, result.block_keys.split())
+
+    for result in results:
+        if not result.blocks:
+            continue
+        content = "\n\n".join(boilerplate.clean(result.url, result.blocks))
+        result.blocks = []
+        result.content = content
+        result.content_hash = content_hash(content)
+        if result.status in ("fetched", "unchanged"):
+            record = previous(result.url)
+            unchanged = record is not None and record.content_hash == result.content_hash
+            result.status = "unchanged" if unchanged else "fetched"
+
+
+def iter_fetch_results(
+    urls: list[str],
+    previous: Optional[Mapping[str, FetchRecord]] = None,
+    max_concurrency: int | None = None,
+    per_host_limit: int | None = None,
+) -> Iterator[FetchResult]:
+    """
+    Fetch URLs concurrently and yield a :class:`FetchResult` as each completes.
+
+    With ``WEB_EXTRACTION_MODE=main``, site-wide boilerplate is removed by
+    :func:`remove_boilerplate` once every URL was fetched, and the results
+    are then yielded in input order.
+
+    Args:
+        urls: URLs to scrape.
+        previous: Stored fetch state by URL. When present, requests are sent
+            with ``If-None-Match``/``If-Modified-Since`` and pages whose
+            extracted text hash is unchanged are reported as ``unchanged``.
+            Records of other URLs on the same hosts only add to the
+            boilerplate counts.
+        max_concurrency: Global limit on in-flight requests.
+        per_host_limit: Limit on in-flight requests per host.
+    """
+
+    if not urls:
+        return
+
+    previous = previous or {}
+    workers = max(1, min(max_concurrency or settings.web_max_concurrency, len(urls)))
+    host_slot = HostLimiter(per_host_limit or settings.web_per_host_concurrency)
+
+    def fetch(url: str) -> FetchResult:
+        with host_slot(url):
+            logger.info(f"Scraping URL: {url}")
+            return fetch_page(url, previous.get(url))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="web") as pool:
+        futures = [pool.submit(fetch, url) for url in urls]
+        try:
+            if settings.web_extraction_mode != "main":
+                for future in as_completed(futures):
+                    yield future.result()
+                return
+            results = [future.result() for future in futures]
+        finally:
+            for future in futures:
+                future.cancel()
+    remove_boilerplate(results, previous.get, previous.values())
+    yield from results
+
+
+def iter_web_docs(
+    urls: list[str],
+    max_concurrency: int | None = None,
+    per_host_limit: int | None = None,
+) -> Iterator[tuple[str, str]]:
+    """
+    Fetch URLs concurrently and yield ``(content, url)`` as each one completes.
+
+    Failed fetches yield the same error strings as :func:`scrape_url`.
+    """
+
+    for result in iter_fetch_results(
+        urls, max_concurrency=max_concurrency, per_host_limit=per_host_limit
+    ):
+        yield result.content, result.url
+
+
+def load_web_docs(
+    urls: list[str],
+    crawl: bool = False,
+    max_depth: int | None = None,
+    max_pages: int | None = None,
+) -> list[tuple[str, str]]:
+    """Load content from a list of URLs, returned in input order.
+
+    With ``crawl=True`` the URLs are used as seeds for a breadth-first,
+    same-domain crawl and every distinct page found is returned in the order
+    it was fetched.
+    """
 
     if not urls:
         logger.warning("No URLs provided for scraping.")
         return []
 
-    docs = []
+    if crawl:
+        from app.ingestion.web_loader.crawler import crawl_site
+
+        return [
+            (result.content, result.url)
+            for result in crawl_site(urls, max_depth=max_depth, max_pages=max_pages)
+            if result.status != "duplicate"
+        ]
+
+    fetched: dict[str, str] = {}
 
     with progress_bar("Scraping URLs...") as progress:
         task = progress.add_task("Scraping URLs...", total=len(urls))
 
-        for url in urls:
-            logger.info(f"Scraping URL: {url}")
-            content = scrape_url(url)
-            docs.append((content, url))
+        for content, url in iter_web_docs(urls):
+            fetched[url] = content
             progress.update(task, advance=1)
 
-    return docs
+    return [(fetched[url], url) for url in urls]
 
 
-def scrape_url(url: str) -> str:
-    """Scrape content from a single URL."""
+def refresh_web_docs(
+    urls: list[str], previous: Mapping[str, FetchRecord]
+) -> tuple[list[FetchResult], FetchReport]:
+    """
+    Conditionally re-fetch URLs against their stored fetch state.
+
+    Returns:
+        One result per distinct URL, in input order, and a report listing each
+        URL as fetched, unchanged or failed. Only ``fetched`` results need to
+        be chunked and embedded; persist their ``to_record()`` state once they
+        are stored so a failed ingest is retried on the next refresh.
+    """
+
+    results: dict[str, FetchResult] = {}
+
+    with progress_bar("Refreshing URLs...") as progress:
+        task = progress.add_task("Refreshing URLs...", total=len(urls))
+
+        for result in iter_fetch_results(urls, previous):
+            results[result.url] = result
+            progress.update(task, advance=1)
+
+    ordered = [results[url] for url in dict.fromkeys(urls)]
+    report = FetchReport()
+    for result in ordered:
+        report.add(result)
+
+    logger.info(
+        "Refreshed %d URLs: %d fetched, %d unchanged, %d failed",
+        len(results),
+        len(report.fetched),
+        len(report.unchanged),
+        len(report.failed),
+    )
+    return ordered, report
+
+
+def fetch_page(
+    url: str,
+    previous: Optional[FetchRecord] = None,
+    conditional: bool = True,
+    extract_links: bool = False,
+) -> FetchResult:
+    """
+    Fetch and extract a single URL.
+
+    Args:
+        url: URL to fetch.
+        previous: Stored fetch state; its content hash marks unchanged pages.
+        conditional: Send the stored validators so the server can answer 304.
+            Crawlers disable this because a 304 carries no links to follow.
+        extract_links: Collect absolute ``<a href>`` targets and the
+            ``rel="canonical"`` URL into the result.
+
+    With ``WEB_EXTRACTION_MODE=main``, the result keeps the extracted blocks
+    and their keys for :func:`remove_boilerplate`, which sets the final
+    content, hash and status.
+    """
+
+    headers = {}
+    if previous is not None and conditional:
+        if previous.etag:
+            headers["If-None-Match"] = previous.etag
+        if previous.last_modified:
+            headers["If-Modified-Since"] = previous.last_modified
 
     try:
-        response = requests.get(url, timeout=30)
+        response = get_session().get(
+            url,
+            headers=headers,
+            timeout=(settings.web_connect_timeout, settings.web_read_timeout),
+        )
+        if response.status_code == 304 and previous is not None:
+            return FetchResult(
+                url=url,
+                status="unchanged",
+                etag=response.headers.get("ETag", previous.etag),
+                last_modified=response.headers.get(
+                    "Last-Modified", previous.last_modified
+                ),
+                content_hash=previous.content_hash,
+                block_keys=previous.block_keys,
+            )
         response.raise_for_status()
 
-        soup = BeautifulSoup(response.text, "html.parser")
+        content_type = response.headers.get("Content-Type", "").lower()
+        if content_type and not any(
+            kind in content_type for kind in ("html", "xml", "text/")
+        ):
+            return FetchResult(
+                url=url,
+                status="failed",
+                content=f"Error fetching the webpage: unsupported content type {content_type}",
+                error=f"unsupported content type {content_type}",
+            )
 
-        # content = soup.find("font")
-        content = soup
-
-        if content:
-            text = content.get_text()
-            text = " ".join(text.split())
-            return text
+        base_url = response.url or url
+        if settings.web_extraction_mode == "main":
+            page = parse_main_content(response.text, base_url, extract_links)
         else:
-            return "Could not find the main content."
+            page = _parse_full_page(response.text, base_url, extract_links)
+
+        if not page.blocks:
+            return FetchResult(
+                url=url, status="failed", content="Could not find the main content."
+            )
+
+        digest = content_hash(page.text)
+        unchanged = previous is not None and previous.content_hash == digest
+        main = settings.web_extraction_mode == "main"
+        return FetchResult(
+            url=url,
+            status="unchanged" if unchanged else "fetched",
+            content=page.text,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            content_hash=digest,
+            links=page.links,
+            canonical_url=page.canonical_url,
+            blocks=page.blocks if main else [],
+            block_keys=(
+                " ".join(BoilerplateFilter.block_keys(page.blocks)) if main else None
+            ),
+        )
 
     except requests.RequestException as e:
         error_msg = f"Error fetching the webpage: {e}"
         logger.error(error_msg)
-        return error_msg
+        return FetchResult(url=url, status="failed", content=error_msg, error=str(e))
     except Exception as e:
         error_msg = f"Unexpected error while scraping {url}: {e}"
         logger.error(error_msg)
-        return error_msg
+        return FetchResult(url=url, status="failed", content=error_msg, error=str(e))
+
+
+def _parse_full_page(html: str, base_url: str, extract_links: bool) -> ParsedPage:
+    """Legacy extraction: the text of the whole page as a single block."""
+
+    soup = BeautifulSoup(html, "html.parser")
+
+    # content = soup.find("font")
+    content = soup
+
+    links: list[str] = []
+    canonical_url = None
+    if extract_links:
+        links = [urljoin(base_url, a["href"]) for a in soup.find_all("a", href=True)]
+        canonical = soup.find("link", rel="canonical", href=True)
+        if canonical is not None:
+            canonical_url = urljoin(base_url, canonical["href"])
+
+    text = " ".join(content.get_text().split()) if content else ""
+    return ParsedPage(
+        blocks=[text] if text else [], links=links, canonical_url=canonical_url
+    )
+
+
+def scrape_url(url: str) -> str:
+    """Scrape content from a single URL."""
+
+    return fetch_page(url).content
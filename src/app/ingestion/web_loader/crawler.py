@@ -0,0 +1,282 @@
+"""Breadth-first, same-domain site crawler feeding the ingestion pipeline."""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, Optional
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+
+from app.core.config import settings
+from app.db.fetch_state_db import FetchRecord
+from app.ingestion.web_loader.bs_loader import (
+    FetchResult,
+    HostLimiter,
+    fetch_page,
+    get_session,
+    remove_boilerplate,
+)
+
+logger = logging.getLogger(__name__)
+
+SKIPPED_EXTENSIONS = (
+    ".pdf", ".zip", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".ico",
+    ".mp3", ".mp4", ".mov", ".avi", ".css", ".js", ".xml", ".doc", ".docx",
+    ".xls", ".xlsx", ".ppt", ".pptx",
+)
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+
+
+def normalize_url(url: str, base: Optional[str] = None) -> Optional[str]:
+    """
+    Return a canonical form of ``url`` for frontier deduplication.
+
+    Resolves it against ``base``, lowercases the scheme and host, drops
+    fragments, default ports, tracking parameters and trailing slashes, and
+    sorts the query string. Returns ``None`` for non-HTTP(S) URLs.
+    """
+
+    absolute = urljoin(base, url.strip()) if base else url.strip()
+    parts = urlsplit(absolute)
+    scheme = parts.scheme.lower()
+    if scheme not in {"http", "https"} or not parts.hostname:
+        return None
+
+    host = parts.hostname.lower()
+    if parts.port and not (
+        (scheme == "http" and parts.port == 80)
+        or (scheme == "https" and parts.port == 443)
+    ):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path or "/"
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/")
+
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not key.lower().startswith(TRACKING_PARAMS)
+        )
+    )
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+class URLFrontier:
+    """FIFO queue of ``(url, depth)`` pairs that never admits a URL twice."""
+
+    def __init__(self):
+        self._queue: deque[tuple[str, int]] = deque()
+        self._seen: set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def add(self, url: str, depth: int) -> bool:
+        """Enqueue a normalized URL unless it was already seen."""
+        if url in self._seen:
+            return False
+        self._seen.add(url)
+        self._queue.append((url, depth))
+        return True
+
+    def mark_seen(self, url: str) -> bool:
+        """Record a URL (e.g. a canonical alias); returns False if already seen."""
+        if url in self._seen:
+            return False
+        self._seen.add(url)
+        return True
+
+    def pop(self) -> tuple[str, int]:
+        return self._queue.popleft()
+
+
+class _PolitenessGate:
+    """Spaces out requests to the same host by at least ``delay`` seconds."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._next_slot: dict[str, float] = {}
+
+    def wait(self, url: str) -> None:
+        if self.delay <= 0:
+            return
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + self.delay
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class _RobotsCache:
+    """Per-host robots.txt rules; hosts whose robots.txt cannot be read are allowed."""
+
+    def __init__(self, user_agent: str = "*"):
+        self.user_agent = user_agent
+        self._lock = threading.Lock()
+        self._parsers: dict[str, Optional[RobotFileParser]] = {}
+
+    def allowed(self, url: str) -> bool:
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            if origin not in self._parsers:
+                self._parsers[origin] = self._load(origin)
+            parser = self._parsers[origin]
+        return parser is None or parser.can_fetch(self.user_agent, url)
+
+    def _load(self, origin: str) -> Optional[RobotFileParser]:
+        try:
+            response = get_session().get(
+                f"{origin}/robots.txt",
+                timeout=(settings.web_connect_timeout, settings.web_read_timeout),
+            )
+        except Exception as exc:
+            logger.info("Could not read robots.txt for %s: %s", origin, exc)
+            return None
+        if response.status_code >= 400:
+            return None
+        parser = RobotFileParser()
+        parser.parse(response.text.splitlines())
+        return parser
+
+
+def _is_crawlable(url: str, allowed_hosts: set[str]) -> bool:
+    parts = urlsplit(url)
+    return parts.netloc in allowed_hosts and not parts.path.lower().endswith(
+        SKIPPED_EXTENSIONS
+    )
+
+
+def crawl_site(
+    seeds: list[str],
+    max_depth: int | None = None,
+    max_pages: int | None = None,
+    max_concurrency: int | None = None,
+    delay: float | None = None,
+    previous: Optional[Callable[[str], Optional[FetchRecord]]] = None,
+    respect_robots: bool = True,
+    stored: Iterable[FetchRecord] = (),
+) -> Iterator[FetchResult]:
+    """
+    Crawl same-domain links breadth-first from ``seeds``, yielding pages as they arrive.
+
+    Args:
+        seeds: Start URLs; their hosts bound the crawl.
+        max_depth: Maximum link distance from a seed (seeds are depth 0).
+        max_pages: Maximum number of pages fetched.
+        max_concurrency: Maximum in-flight requests.
+        delay: Minimum seconds between requests to the same host.
+        previous: Optional lookup of stored fetch state by URL; pages whose
+            extracted text hash is unchanged are yielded as ``unchanged``.
+        respect_robots: Skip URLs disallowed by the host's robots.txt.
+        stored: Fetch state of the crawled hosts' pages, counted towards
+            site-wide boilerplate.
+
+    Yields:
+        One FetchResult per fetched URL, in completion order. Pages whose
+        canonical URL or extracted text was already seen during this crawl are
+        yielded with status ``duplicate`` and no content. With
+        ``WEB_EXTRACTION_MODE=main``, pages are yielded once the crawl is
+        done, after :func:`remove_boilerplate` has cleaned them.
+    """
+
+    max_depth = settings.crawl_max_depth if max_depth is None else max_depth
+    max_pages = max_pages or settings.crawl_max_pages
+    workers = max(1, max_concurrency or settings.web_max_concurrency)
+    gate = _PolitenessGate(settings.crawl_delay if delay is None else delay)
+    host_slot = HostLimiter(settings.web_per_host_concurrency)
+    robots = _RobotsCache() if respect_robots else None
+    lookup = previous or (lambda url: None)
+    # Boilerplate can only be told apart once every page was seen.
+    held: Optional[list[FetchResult]] = (
+        [] if settings.web_extraction_mode == "main" else None
+    )
+
+    frontier = URLFrontier()
+    allowed_hosts: set[str] = set()
+    for seed in seeds:
+        normalized = normalize_url(seed)
+        if normalized:
+            frontier.add(normalized, 0)
+            allowed_hosts.add(urlsplit(normalized).netloc)
+    seen_hashes: set[str] = set()
+
+    def fetch(url: str) -> FetchResult:
+        with host_slot(url):
+            gate.wait(url)
+            logger.info(f"Crawling URL: {url}")
+            return fetch_page(
+                url,
+                lookup(url),
+                conditional=False,
+                extract_links=True,
+            )
+
+    scheduled = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="crawl") as pool:
+        in_flight: dict[Future, tuple[str, int]] = {}
+        try:
+            while frontier or in_flight:
+                while frontier and len(in_flight) < workers and scheduled < max_pages:
+                    url, depth = frontier.pop()
+                    if robots is not None and not robots.allowed(url):
+                        logger.info("Skipping %s (disallowed by robots.txt)", url)
+                        continue
+                    in_flight[pool.submit(fetch, url)] = (url, depth)
+                    scheduled += 1
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, depth = in_flight.pop(future)
+                    result = future.result()
+
+                    if result.status != "failed":
+                        canonical = (
+                            normalize_url(result.canonical_url)
+                            if result.canonical_url
+                            else None
+                        )
+                        if canonical and canonical != url and not frontier.mark_seen(
+                            canonical
+                        ):
+                            result.status, result.content = "duplicate", ""
+                            result.blocks, result.block_keys = [], None
+                        elif result.content_hash in seen_hashes:
+                            result.status, result.content = "duplicate", ""
+                            result.blocks, result.block_keys = [], None
+                        elif result.content_hash:
+                            seen_hashes.add(result.content_hash)
+
+                    if depth < max_depth:
+                        for link in result.links:
+                            normalized = normalize_url(link)
+                            if normalized and _is_crawlable(normalized, allowed_hosts):
+                                frontier.add(normalized, depth + 1)
+                    result.links = []
+
+                    if held is None:
+                        yield result
+                    else:
+                        held.append(result)
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+    if held is not None:
+        remove_boilerplate(held, lookup, stored)
+        yield from held
+
+    logger.info(
+        "Crawl finished: %d pages fetched, %d URLs left in frontier",
+        scheduled,
+        len(frontier),
+    )
@@ -0,0 +1,258 @@
+"""Fast main-content HTML extraction with cross-page boilerplate removal.
+
+Pages are parsed with lxml (a C parser, already installed with ``unstructured``)
+instead of BeautifulSoup's pure-Python ``html.parser``. Navigation, headers,
+footers, forms, cookie banners and similar chrome are dropped, the densest
+content container is kept, and text blocks that repeat across many pages of
+the same site are removed by :class:`BoilerplateFilter`.
+"""
+
+import hashlib
+import logging
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+from urllib.parse import urljoin, urlsplit
+
+logger = logging.getLogger(__name__)
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # pragma: no cover - lxml ships with unstructured
+    lxml = None
+
+DROPPED_TAGS = (
+    "script", "style", "noscript", "template", "iframe", "svg", "canvas",
+    "nav", "footer", "aside", "form", "button", "select",
+)
+DROPPED_ROLES = {"navigation", "banner", "contentinfo", "search", "dialog", "alert"}
+BOILERPLATE_HINT = re.compile(
+    r"(^|[\s_-])(nav|navbar|menu|breadcrumbs?|footer|header|sidebar|cookies?|"
+    r"consent|gdpr|banner|social|share|sharing|popup|modal|newsletter|skip)"
+    r"($|[\s_-])",
+    re.IGNORECASE,
+)
+MAIN_XPATH = "//main | //article | //*[@role='main']"
+# Share of its text that must be link text before a hinted element is dropped.
+HINT_MIN_LINK_DENSITY = 0.5
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "li", "ul", "ol", "table", "tr",
+    "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "dd", "dt", "br",
+}
+WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass(slots=True)
+class ParsedPage:
+    """Text blocks, outgoing links and canonical URL extracted from a page."""
+
+    blocks: list[str]
+    links: list[str] = field(default_factory=list)
+    canonical_url: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        return "\n\n".join(self.blocks)
+
+
+def _is_boilerplate(element, text_len: dict, link_len: dict) -> bool:
+    if element.get("role", "").lower() in DROPPED_ROLES:
+        return True
+    if element.get("aria-hidden") == "true" or element.get("hidden") is not None:
+        return True
+    hint = f"{element.get('id', '')} {element.get('class', '')}"
+    if not hint.strip() or BOILERPLATE_HINT.search(hint) is None:
+        return False
+    # Class names alone are weak evidence ("article-header", "has-sidebar"):
+    # only drop hinted elements that are empty or mostly links.
+    text = text_len.get(element, 0)
+    return link_len.get(element, 0) >= HINT_MIN_LINK_DENSITY * text
+
+
+def _protected(root) -> set:
+    """The body, the main content candidates and all their ancestors."""
+
+    protected = set()
+    for element in [root.find("body"), *root.xpath(MAIN_XPATH)]:
+        if element is not None:
+            protected.add(element)
+            protected.update(element.iterancestors())
+    return protected
+
+
+def _text_blocks(root) -> list[str]:
+    """Collect whitespace-normalized text, one entry per block-level element."""
+
+    blocks: list[str] = []
+    current: list[str] = []
+
+    def flush() -> None:
+        text = WHITESPACE.sub(" ", "".join(current)).strip()
+        if text:
+            blocks.append(text)
+        current.clear()
+
+    for event, element in etree.iterwalk(root, events=("start", "end")):
+        tag = element.tag if isinstance(element.tag, str) else ""
+        if event == "start":
+            if tag in BLOCK_TAGS:
+                flush()
+            if element.text:
+                current.append(element.text)
+        else:
+            if tag in BLOCK_TAGS:
+                flush()
+            if element.tail and element is not root:
+                current.append(element.tail)
+    flush()
+    return blocks
+
+
+def _text_lengths(root) -> tuple[dict, dict]:
+    """Text length and link text length of every element.
+
+    Walks the tree once in reverse document order, so children are measured
+    before their parents and the whole pass stays linear in the page size.
+    """
+
+    text_len: dict = {}
+    link_len: dict = {}
+    for element in reversed(list(root.iter())):
+        if not isinstance(element.tag, str):
+            continue
+        total = len(element.text or "")
+        links = 0
+        for child in element:
+            if isinstance(child.tag, str):
+                total += text_len[child]
+                links += link_len[child]
+            total += len(child.tail or "")
+        text_len[element] = total
+        link_len[element] = total if element.tag == "a" else links
+    return text_len, link_len
+
+
+def _content_scores(root) -> dict:
+    """Score every element by its text length minus twice its link text length."""
+
+    text_len, link_len = _text_lengths(root)
+    return {element: text_len[element] - 2 * link_len[element] for element in text_len}
+
+
+def parse_main_content(
+    html: str, base_url: Optional[str] = None, extract_links: bool = False
+) -> ParsedPage:
+    """
+    Extract the main content of an HTML page as text blocks.
+
+    Args:
+        html: Raw HTML.
+        base_url: URL the page was fetched from, used to resolve links.
+        extract_links: Also collect ``<a href>`` targets and the canonical URL.
+    """
+
+    if lxml is None:
+        raise RuntimeError("Fast HTML extraction requires the 'lxml' package.")
+    if not html.strip():
+        return ParsedPage(blocks=[])
+
+    try:
+        root = lxml.html.document_fromstring(html)
+    except (etree.ParserError, ValueError):
+        # lxml rejects str input carrying an XML encoding declaration.
+        root = lxml.html.document_fromstring(html.encode("utf-8", "replace"))
+
+    links: list[str] = []
+    canonical_url = None
+    if extract_links:
+        base = base_url or ""
+        links = [urljoin(base, href) for href in root.xpath("//a/@href")]
+        canonical = root.xpath("//link[@rel='canonical']/@href")
+        if canonical:
+            canonical_url = urljoin(base, canonical[0])
+
+    etree.strip_elements(
+        root, etree.Comment, etree.ProcessingInstruction, with_tail=False
+    )
+    for element in list(root.iter(*DROPPED_TAGS)):
+        element.drop_tree()
+    for element in list(root.iter("header")):
+        # Site headers go; article headers (titles, bylines) stay.
+        if not any(a.tag in ("article", "main") for a in element.iterancestors()):
+            element.drop_tree()
+    protected = _protected(root)
+    text_len, link_len = _text_lengths(root)
+    for element in [e for e in root.iter() if isinstance(e.tag, str)]:
+        if element in protected or element.getparent() is None:
+            continue
+        if _is_boilerplate(element, text_len, link_len):
+            element.drop_tree()
+
+    scores = _content_scores(root)
+    candidates = root.xpath(MAIN_XPATH)
+    if candidates:
+        main = max(candidates, key=scores.__getitem__)
+    else:
+        body = root.find("body")
+        body = body if body is not None else root
+        best = max(
+            [body, *body.iter("div", "section", "td")], key=scores.__getitem__
+        )
+        # Prefer the densest container unless it only holds a fraction of the page.
+        main = best if scores[best] >= 0.5 * scores[body] else body
+
+    return ParsedPage(
+        blocks=_text_blocks(main), links=links, canonical_url=canonical_url
+    )
+
+
+class BoilerplateFilter:
+    """
+    Drops text blocks that repeat across pages of the same site.
+
+    Pages are first registered with :meth:`add`, by URL and the keys of their
+    blocks. Once a block appears on ``min_pages`` pages of a host it is
+    treated as boilerplate (menus, footers, cookie notices, "related links").
+    :meth:`clean` then removes it. Register every page of a run before
+    cleaning any, so the result does not depend on the order pages arrive.
+    """
+
+    def __init__(self, min_pages: int = 3):
+        self.min_pages = max(2, min_pages)
+        self._pages: dict[str, dict[str, frozenset[str]]] = defaultdict(dict)
+        self._counts: dict[str, Counter[str]] = {}
+
+    @staticmethod
+    def _key(block: str) -> str:
+        return hashlib.blake2b(block.lower().encode("utf-8"), digest_size=8).hexdigest()
+
+    @classmethod
+    def block_keys(cls, blocks: Iterable[str]) -> list[str]:
+        """Stable keys of the distinct blocks, in first-seen order."""
+        return list(dict.fromkeys(cls._key(block) for block in blocks))
+
+    def add(self, url: str, keys: Iterable[str]) -> None:
+        """Register the block keys of a page, replacing its earlier ones."""
+        host = urlsplit(url).netloc.lower()
+        self._pages[host][url] = frozenset(keys)
+        self._counts.pop(host, None)
+
+    def clean(self, url: str, blocks: list[str]) -> list[str]:
+        host = urlsplit(url).netloc.lower()
+        counts = self._counts.get(host)
+        if counts is None:
+            counts = Counter()
+            for keys in self._pages[host].values():
+                counts.update(keys)
+            self._counts[host] = counts
+        kept = [
+            block
+            for block in blocks
+            if counts[self._key(block)] < self.min_pages
+        ]
+        removed = len(blocks) - len(kept)
+        if removed:
+            logger.debug("Removed %d boilerplate blocks from %s", removed, url)
+        return kept
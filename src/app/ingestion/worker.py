@@ -0,0 +1,250 @@
+"""Distributed ingestion workers fed by a Postgres work queue.
+
+Usage:
+    uv run python -m app.ingestion.worker enqueue docs/ --urls urls.txt
+    uv run python -m app.ingestion.worker run --exit-when-empty   # on each node
+    uv run python -m app.ingestion.worker status
+
+``enqueue`` adds one task per document (same inputs as ``app.ingestion.bulk``)
+to the queue table in ``POSTGRES_URL``. Any number of ``run`` processes, on
+one machine or many, claim ``INGEST_QUEUE_CLAIM_BATCH`` tasks at a time and
+ingest them; file paths must be readable at the same location on every
+node. A claimed task is heartbeated while it runs and put back in the queue
+when its worker stops heartbeating for ``INGEST_QUEUE_STALE_AFTER`` seconds.
+Failed tasks, including documents with chunks that could not be embedded,
+are retried up to ``INGEST_QUEUE_MAX_ATTEMPTS`` times; a retry only embeds
+the chunks that are still missing.
+"""
+
+import argparse
+import logging
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import settings
+from app.db.work_queue import IngestionQueue, QueueProgress, QueueTask
+from app.ingestion.bulk import BulkSource, collect_sources, load_batch
+from app.ingestion.service import IngestionResult, ingest_text_documents
+from app.utils.id import create_id
+
+logger = logging.getLogger(__name__)
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{create_id()[:8]}"
+
+
+def new_queue() -> IngestionQueue:
+    return IngestionQueue(settings, max_attempts=settings.ingest_queue_max_attempts)
+
+
+class _Heartbeat(threading.Thread):
+    """Refreshes the heartbeat of the tasks a worker currently holds."""
+
+    def __init__(self, worker_id: str, interval: float):
+        super().__init__(name="ingest-heartbeat", daemon=True)
+        self.worker_id = worker_id
+        self.interval = max(0.1, interval)
+        self.task_ids: list[int] = []
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        # The worker's own connection is busy during ingestion.
+        queue = new_queue()
+        try:
+            while not self._stopped.wait(self.interval):
+                try:
+                    queue.heartbeat(self.worker_id, list(self.task_ids))
+                except Exception as exc:
+                    logger.warning("Heartbeat failed: %s", exc)
+        finally:
+            queue.close()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+def process_task(task: QueueTask) -> IngestionResult:
+    """Load and ingest the document of one task.
+
+    Raises:
+        RuntimeError: When the document cannot be loaded or stored, or some
+            of its chunks could not be embedded.
+    """
+
+    source = BulkSource(task.source, task.kind, task.location)
+    docs, errors = load_batch([source])
+    if errors:
+        raise RuntimeError(next(iter(errors.values())))
+    result = ingest_text_documents(docs)
+    if result.embedding_failures:
+        raise RuntimeError(
+            f"{len(result.embedding_failures)} chunks could not be embedded "
+            f"(first error: {result.embedding_failures[0].error})"
+        )
+    return result
+
+
+def run_worker(
+    queue: IngestionQueue,
+    worker_id: Optional[str] = None,
+    claim_batch: int = settings.ingest_queue_claim_batch,
+    heartbeat_interval: float = settings.ingest_queue_heartbeat,
+    stale_after: float = settings.ingest_queue_stale_after,
+    poll_interval: float = 2.0,
+    exit_when_empty: bool = False,
+) -> IngestionResult:
+    """
+    Claim and ingest queued tasks until stopped.
+
+    Args:
+        queue: The shared work queue.
+        worker_id: Name recorded on claimed tasks; defaults to host and PID.
+        claim_batch: Tasks claimed per round trip.
+        heartbeat_interval: Seconds between heartbeats of held tasks.
+        stale_after: Heartbeat age after which other workers' tasks are
+            re-queued.
+        poll_interval: Seconds to wait when the queue is empty.
+        exit_when_empty: Return once no task is queued or running.
+
+    Returns:
+        IngestionResult summed over the tasks this worker completed.
+    """
+
+    worker_id = worker_id or default_worker_id()
+    total = IngestionResult(document_count=0, chunk_count=0, warnings=[])
+    heartbeat = _Heartbeat(worker_id, heartbeat_interval)
+    heartbeat.start()
+    logger.info("Ingestion worker %s started", worker_id)
+    try:
+        while True:
+            queue.requeue_stale(stale_after)
+            tasks = queue.claim(worker_id, claim_batch)
+            if not tasks:
+                if exit_when_empty and not queue.progress().remaining:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            heartbeat.task_ids = [task.id for task in tasks]
+            for task in tasks:
+                try:
+                    result = process_task(task)
+                except Exception as exc:
+                    logger.error("Task %s (%s) failed: %s", task.id, task.source, exc)
+                    queue.fail(task, worker_id, str(exc))
+                else:
+                    if queue.complete(
+                        task, worker_id, result.chunk_count, result.inserted_count
+                    ):
+                        total.merge(result)
+                    else:
+                        logger.warning(
+                            "Task %s was re-queued while running; its stored "
+                            "chunks are kept and the retry skips them",
+                            task.id,
+                        )
+                heartbeat.task_ids = [
+                    held for held in heartbeat.task_ids if held != task.id
+                ]
+    except KeyboardInterrupt:
+        try:
+            queue.release(worker_id, heartbeat.task_ids)
+        except Exception as exc:
+            logger.warning("Could not release held tasks: %s", exc)
+        raise
+    finally:
+        heartbeat.stop()
+    return total
+
+
+def format_progress(progress: QueueProgress) -> str:
+    counts = ", ".join(f"{count} {status}" for status, count in progress.counts.items())
+    eta = progress.eta_seconds
+    return (
+        f"{counts} | {progress.chunk_count} chunks ({progress.inserted_count} new) | "
+        f"{progress.active_workers} active workers | "
+        f"{progress.throughput * 60:.1f} docs/min recently | "
+        f"ETA {f'{eta:.0f}s' if eta is not None else 'unknown'}"
+    )
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Distributed ingestion through a Postgres work queue."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="Queue files and URLs.")
+    enqueue.add_argument(
+        "paths", nargs="*", help="PDF/Markdown/text files or directories."
+    )
+    enqueue.add_argument("--urls", help="File with one URL per line.")
+
+    run = commands.add_parser("run", help="Claim and ingest queued tasks.")
+    run.add_argument("--worker-id", help="Defaults to host name and PID.")
+    run.add_argument(
+        "--claim-batch", type=int, default=settings.ingest_queue_claim_batch
+    )
+    run.add_argument(
+        "--exit-when-empty",
+        action="store_true",
+        help="Stop once no task is queued or running.",
+    )
+
+    commands.add_parser("status", help="Show aggregate progress.")
+    commands.add_parser("retry", help="Re-queue tasks that failed every attempt.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    queue = new_queue()
+    try:
+        if args.command == "enqueue":
+            sources = collect_sources(args.paths, args.urls)
+            if not sources:
+                parser.error("No PDF, Markdown, text files or URLs to enqueue.")
+            added = queue.enqueue(
+                QueueTask(
+                    source.id,
+                    source.kind,
+                    source.location
+                    if source.kind == "url"
+                    else str(Path(source.location).resolve()),
+                )
+                for source in sources
+            )
+            print(f"Queued {added} of {len(sources)} documents.")
+        elif args.command == "run":
+            started = time.monotonic()
+            try:
+                result = run_worker(
+                    queue,
+                    worker_id=args.worker_id,
+                    claim_batch=args.claim_batch,
+                    exit_when_empty=args.exit_when_empty,
+                )
+            except KeyboardInterrupt:
+                print("Interrupted; unfinished tasks were returned to the queue.")
+                raise SystemExit(130)
+            elapsed = time.monotonic() - started
+            print(
+                f"Ingested {result.document_count} documents into "
+                f"{result.chunk_count} chunks ({result.inserted_count} new) "
+                f"in {elapsed:.1f}s."
+            )
+            print(format_progress(queue.progress()))
+        elif args.command == "status":
+            print(format_progress(queue.progress()))
+        elif args.command == "retry":
+            print(f"Re-queued {queue.retry_failed()} failed tasks.")
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
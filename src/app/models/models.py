@@ -23,6 +23,10 @@ class State(TypedDict):
     answer: str
     context: list[Document]
     model: NotRequired[str]
+    # "knowledge" or "conversational" (see app.workflow.query_classifier)
+    route: NotRequired[str]
+    # how the answer's chat completion was served (see LLMCallInfo)
+    llm: NotRequired[dict[str, Any]]
     # history: list[dict]
 
 
@@ -35,12 +39,66 @@ class QueryRequest(BaseModel):
 
 class IngestWebRequest(BaseModel):
     urls: list[str] = Field(..., min_length=1, description="List of URLs to ingest.")
+    force: bool = Field(
+        False, description="Re-ingest every URL even if it is unchanged."
+    )
+    crawl: bool = Field(
+        False, description="Follow same-domain links breadth-first from the URLs."
+    )
+    max_depth: int | None = Field(
+        None, ge=0, description="Maximum link depth when crawling."
+    )
+    max_pages: int | None = Field(
+        None, ge=1, description="Maximum pages fetched when crawling."
+    )
+
+
+class WebFetchReport(BaseModel):
+    """URLs grouped by the outcome of a (conditional) fetch."""
+
+    fetched: list[str] = Field(default_factory=list)
+    unchanged: list[str] = Field(default_factory=list)
+    duplicate: list[str] = Field(default_factory=list)
+    failed: list[str] = Field(default_factory=list)
 
 
 class IngestionResponse(BaseModel):
     chunk_count: int
     document_count: int
+    inserted_count: int = 0
+    deleted_count: int = 0
+    duplicate_count: int = 0
+    duplicate_bytes_saved: int = 0
     warnings: list[str] = Field(default_factory=list)
+    fetch_report: WebFetchReport | None = None
+
+
+class IngestionStageResponse(BaseModel):
+    """Progress of one pipeline stage of a background ingestion job."""
+
+    name: str
+    processed: float
+    total: float | None = None
+    throughput: float | None = Field(
+        default=None, description="Items processed per second."
+    )
+    eta_seconds: float | None = None
+
+
+class IngestionJobResponse(BaseModel):
+    """Status of a background ingestion job."""
+
+    id: str
+    kind: str
+    status: str
+    cancel_requested: bool = False
+    stage: str | None = None
+    stages: list[IngestionStageResponse] = Field(default_factory=list)
+    created_at: str
+    started_at: str | None = None
+    finished_at: str | None = None
+    error: str | None = None
+    result: IngestionResponse | None = None
 
 
 class UpdateModelRequest(BaseModel):
@@ -54,11 +112,51 @@ class TextSegment(BaseModel):
     source: str | None = None
 
 
+class LLMCallMetadata(BaseModel):
+    """How the answer's chat completion was served."""
+
+    requested_model: str
+    model: str | None = Field(None, description="Model whose answer was used.")
+    outcome: str = Field(
+        ..., description="primary, hedge_won, fallback or failed."
+    )
+    hedged: bool = False
+    short_circuited: bool = False
+    latency_seconds: float
+
+
 class QueryResponse(BaseModel):
     """Structured response with text segments and sources for hover citations."""
 
     chat_id: str
     segments: list[TextSegment]
+    llm: LLMCallMetadata | None = None
+
+
+class BatchQueryRequest(BaseModel):
+    questions: list[str] = Field(..., min_length=1, description="Questions to answer.")
+    model: str | None = None
+    concurrency: int | None = Field(
+        None, ge=1, description="Questions processed at once; defaults to config."
+    )
+    persist: bool = Field(
+        False, description="Save each question and answer as a new chat session."
+    )
+    include_context: bool = Field(
+        False, description="Return the retrieved context of each answer."
+    )
+
+
+class BatchQueryResult(BaseModel):
+    """One line of the streamed /query/batch response."""
+
+    index: int
+    question: str
+    segments: list[TextSegment] = Field(default_factory=list)
+    context: list[str] | None = None
+    chat_id: str | None = None
+    llm: LLMCallMetadata | None = None
+    error: str | None = None
 
 
 class CreateChatRequest(BaseModel):
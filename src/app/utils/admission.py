@@ -0,0 +1,195 @@
+"""Admission control for calls to upstream APIs (LLM, reranker).
+
+Each upstream has a controller with a concurrency limit and a bounded FIFO
+wait queue. Request handlers set a deadline with :func:`admission_deadline`;
+calls made under a deadline are rejected right away when the queue is full
+and give up when the deadline passes while waiting, so a burst degrades into
+fast 503s instead of piling up on the provider. Calls without a deadline
+(ingestion, CLIs) wait for their turn and are never rejected.
+
+Embedding calls have an adaptive scheduler of their own with the same
+deadline semantics (:mod:`app.utils.rate_limit`).
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional
+
+from app.core.config import settings
+
+_deadline: ContextVar[Optional[float]] = ContextVar("admission_deadline", default=None)
+
+
+class AdmissionRejected(Exception):
+    """Raised when an upstream call is not admitted in time."""
+
+    def __init__(self, upstream: str, reason: str, retry_after: float = 1.0):
+        super().__init__(f"{upstream} is overloaded ({reason}); try again shortly.")
+        self.upstream = upstream
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@contextmanager
+def admission_deadline(seconds: float) -> Iterator[None]:
+    """Bound the total time upstream calls in this context may wait for a slot."""
+
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def current_deadline() -> Optional[float]:
+    """Monotonic deadline set by the enclosing :func:`admission_deadline`, if any."""
+    return _deadline.get()
+
+
+@dataclass(slots=True)
+class AdmissionStats:
+    """Counters and recent queue waits of one upstream."""
+
+    admitted: int = 0
+    rejected_queue_full: int = 0
+    rejected_timeout: int = 0
+    waits: deque[float] = field(default_factory=lambda: deque(maxlen=1000))
+
+    def wait_percentile(self, percentile: float) -> Optional[float]:
+        if not self.waits:
+            return None
+        ordered = sorted(self.waits)
+        return ordered[min(len(ordered) - 1, int(percentile * len(ordered)))]
+
+
+class AdmissionController:
+    """Concurrency limit plus bounded FIFO wait queue for one upstream."""
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.stats = AdmissionStats()
+        self._active = 0
+        self._queue: deque[object] = deque()
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def admit(self) -> Iterator[None]:
+        """
+        Hold one of the upstream's slots for the duration of the block.
+
+        Raises:
+            AdmissionRejected: When the call runs under a deadline and the
+                queue is full or the deadline passes while waiting.
+        """
+
+        deadline = current_deadline()
+        started = time.monotonic()
+        ticket = object()
+        with self._cond:
+            if self._active >= self.max_concurrency or self._queue:
+                if deadline is not None and len(self._queue) >= self.max_queue:
+                    self.stats.rejected_queue_full += 1
+                    raise AdmissionRejected(
+                        self.name, "queue full", self._retry_after()
+                    )
+                self._queue.append(ticket)
+                try:
+                    while self._queue[0] is not ticket or (
+                        self._active >= self.max_concurrency
+                    ):
+                        remaining = (
+                            None if deadline is None else deadline - time.monotonic()
+                        )
+                        if remaining is not None and remaining <= 0:
+                            self.stats.rejected_timeout += 1
+                            raise AdmissionRejected(
+                                self.name, "queue wait timed out", self._retry_after()
+                            )
+                        self._cond.wait(remaining)
+                finally:
+                    self._queue.remove(ticket)
+                    # The next waiter may be able to go now.
+                    self._cond.notify_all()
+            self._active += 1
+            self.stats.admitted += 1
+            self.stats.waits.append(time.monotonic() - started)
+
+        try:
+            yield
+        finally:
+            self.release()
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free and nobody is waiting; never queues.
+
+        A successful call must be paired with :meth:`release`.
+        """
+
+        with self._cond:
+            if self._active >= self.max_concurrency or self._queue:
+                return False
+            self._active += 1
+            self.stats.admitted += 1
+            self.stats.waits.append(0.0)
+            return True
+
+    def release(self) -> None:
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def _retry_after(self) -> float:
+        return max(1.0, self.stats.wait_percentile(0.95) or 0.0)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._cond:
+            waits = self.stats.waits
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "active": self._active,
+                "waiting": len(self._queue),
+                "admitted": self.stats.admitted,
+                "rejected_queue_full": self.stats.rejected_queue_full,
+                "rejected_timeout": self.stats.rejected_timeout,
+                "queue_wait_avg": sum(waits) / len(waits) if waits else None,
+                "queue_wait_p95": self.stats.wait_percentile(0.95),
+                "queue_wait_max": max(waits) if waits else None,
+            }
+
+
+_controllers: dict[str, AdmissionController] = {}
+_controllers_lock = threading.Lock()
+
+
+def admission_controller(upstream: str) -> AdmissionController:
+    """Return the process-wide controller of an upstream.
+
+    ``upstream`` is ``llm`` or ``reranker``.
+    """
+
+    with _controllers_lock:
+        controller = _controllers.get(upstream)
+        if controller is None:
+            limits = {
+                "llm": (settings.llm_max_concurrency, settings.llm_max_queue),
+                "reranker": (
+                    settings.reranker_max_concurrency,
+                    settings.reranker_max_queue,
+                ),
+            }
+            controller = AdmissionController(upstream, *limits[upstream])
+            _controllers[upstream] = controller
+        return controller
+
+
+def admission_metrics() -> dict[str, dict[str, Any]]:
+    with _controllers_lock:
+        controllers = list(_controllers.values())
+    return {controller.name: controller.snapshot() for controller in controllers}
@@ -0,0 +1,337 @@
+"""Offset-based recursive text chunker.
+
+The chunker walks the text once per separator level using ``str.find`` and only
+tracks ``(start, end)`` character offsets. Substrings are materialized by the
+caller when the chunks are emitted, so large documents are never copied piece
+by piece while the chunk boundaries are being decided.
+"""
+
+import logging
+from collections import deque
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEPARATORS = ["\n\n", "\n", ".", " ", ""]
+
+LengthFunction = Callable[[str], int]
+Span = tuple[int, int]
+
+
+@lru_cache(maxsize=4)
+def token_length_function(encoding_name: str = "cl100k_base") -> LengthFunction:
+    """Return a function counting tokens with the given ``tiktoken`` encoding."""
+
+    try:
+        import tiktoken
+    except ImportError as exc:
+        raise RuntimeError(
+            "Token-based chunk sizing requires the 'tiktoken' package."
+        ) from exc
+
+    encoding = tiktoken.get_encoding(encoding_name)
+
+    def count_tokens(text: str) -> int:
+        return len(encoding.encode_ordinary(text))
+
+    return count_tokens
+
+
+def resolve_length_function(
+    unit: str, encoding_name: str = "cl100k_base"
+) -> Optional[LengthFunction]:
+    """Map a chunk size unit (``characters`` or ``tokens``) to a length function."""
+
+    normalized = unit.strip().lower()
+    if normalized in {"", "char", "chars", "characters"}:
+        return None
+    if normalized in {"token", "tokens"}:
+        return token_length_function(encoding_name)
+    raise ValueError(f"Unsupported chunk size unit: {unit!r}")
+
+
+class _SpanSplitter:
+    """Stateful helper that collects chunk spans for a single text."""
+
+    def __init__(
+        self,
+        text: str,
+        chunk_size: int,
+        overlap: int,
+        length_function: Optional[LengthFunction],
+    ):
+        self.text = text
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.length_function = length_function
+        self.spans: list[Span] = []
+
+    def measure(self, start: int, end: int) -> int:
+        if self.length_function is None:
+            return end - start
+        return self.length_function(self.text[start:end])
+
+    def trim(self, start: int, end: int) -> Span:
+        text = self.text
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        return start, end
+
+    def emit(self, start: int, end: int) -> None:
+        start, end = self.trim(start, end)
+        if start < end:
+            self.spans.append((start, end))
+
+    def split(self, start: int, end: int, separators: list[str]) -> None:
+        start, end = self.trim(start, end)
+        if start >= end:
+            return
+        if self.measure(start, end) <= self.chunk_size:
+            self.spans.append((start, end))
+            return
+
+        for level, sep in enumerate(separators):
+            if not sep:
+                break
+            if self.text.find(sep, start, end) != -1:
+                self.merge(start, end, sep, separators[level + 1 :])
+                return
+
+        self.hard_split(start, end)
+
+    def merge(self, start: int, end: int, sep: str, remaining: list[str]) -> None:
+        """Greedily pack separator-delimited pieces into overlapping windows."""
+
+        text = self.text
+        sep_width = len(sep)
+        merger = _PieceMerger(self, sep, remaining)
+        add = merger.add
+        pos = start
+
+        while pos <= end:
+            idx = text.find(sep, pos, end)
+            if idx == -1:
+                idx = end
+            add(pos, idx)
+            pos = idx + sep_width
+
+        merger.finish()
+
+    def hard_split(self, start: int, end: int) -> None:
+        """Split a range without separators into fixed windows with overlap."""
+
+        chunk_size = self.chunk_size
+        width = chunk_size
+        if self.length_function is not None:
+            # Tokens usually span several characters; shrink until the window fits.
+            while width > 1 and self.measure(start, min(start + width, end)) > chunk_size:
+                width //= 2
+
+        step = max(1, width * (chunk_size - self.overlap) // chunk_size)
+        for i in range(start, end, step):
+            self.emit(i, min(i + width, end))
+            if i + width >= end:
+                break
+
+
+class _PieceMerger:
+    """Packs separator-delimited pieces, added left to right, into windows.
+
+    The window only depends on the pieces added so far, so a text arriving
+    in parts can be merged piece by piece with the same result.
+    """
+
+    def __init__(self, splitter: _SpanSplitter, sep: str, remaining: list[str]):
+        self.splitter = splitter
+        self.remaining = remaining
+        self.sep_len = (
+            len(sep)
+            if splitter.length_function is None
+            else splitter.length_function(sep)
+        )
+        self.window: deque[tuple[int, int, int]] = deque()  # (start, end, length)
+        self.total = 0
+
+    def add(self, piece_start: int, piece_end: int) -> None:
+        splitter = self.splitter
+        chunk_size = splitter.chunk_size
+        sep_len = self.sep_len
+        window = self.window
+        piece_len = (
+            piece_end - piece_start
+            if splitter.length_function is None
+            else splitter.length_function(splitter.text[piece_start:piece_end])
+        )
+
+        if piece_len > chunk_size:
+            if window:
+                splitter.emit(window[0][0], window[-1][1])
+                window.clear()
+                self.total = 0
+            splitter.split(piece_start, piece_end, self.remaining)
+            return
+
+        total = self.total
+        if window and total + sep_len + piece_len > chunk_size:
+            splitter.emit(window[0][0], window[-1][1])
+            # Keep trailing pieces as overlap while they still leave room.
+            while window and (
+                total > splitter.overlap or total + sep_len + piece_len > chunk_size
+            ):
+                dropped = window.popleft()[2]
+                total -= (dropped + sep_len) if window else dropped
+
+        self.total = total + (sep_len if window else 0) + piece_len
+        window.append((piece_start, piece_end, piece_len))
+
+    def finish(self) -> None:
+        if self.window:
+            self.splitter.emit(self.window[0][0], self.window[-1][1])
+            self.window.clear()
+            self.total = 0
+
+    def shift(self, offset: int) -> None:
+        """Move window offsets after ``offset`` characters were cut from the text."""
+
+        self.window = deque(
+            (start - offset, end - offset, length)
+            for start, end, length in self.window
+        )
+
+
+def split_text_spans(
+    text: str,
+    chunk_size: int = 512,
+    overlap: int = 96,
+    separators: Optional[list[str]] = None,
+    length_function: Optional[LengthFunction] = None,
+) -> list[Span]:
+    """
+    Split text into overlapping chunks and return their character offsets.
+
+    Args:
+        text: Text to split.
+        chunk_size: Maximum chunk size, measured by ``length_function``.
+        overlap: Amount of trailing context repeated at the start of the next
+            chunk, measured in the same unit as ``chunk_size``.
+        separators: Separators tried in order, from coarsest to finest.
+        length_function: Optional function measuring text length (for example
+            a token counter). Defaults to the number of characters.
+
+    Returns:
+        List of ``(start, end)`` offsets into ``text``, in document order.
+    """
+
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive.")
+    if not 0 <= overlap < chunk_size:
+        raise ValueError("overlap must be non-negative and smaller than chunk_size.")
+
+    splitter = _SpanSplitter(text, chunk_size, overlap, length_function)
+    splitter.split(0, len(text), separators or DEFAULT_SEPARATORS)
+    return splitter.spans
+
+
+def split_text(
+    text: str,
+    chunk_size: int = 512,
+    overlap: int = 96,
+    separators: Optional[list[str]] = None,
+    length_function: Optional[LengthFunction] = None,
+) -> list[str]:
+    """Split text into overlapping chunks using :func:`split_text_spans`."""
+
+    return [
+        text[start:end]
+        for start, end in split_text_spans(
+            text, chunk_size, overlap, separators, length_function
+        )
+    ]
+
+
+def split_text_stream(
+    pieces: Iterable[str],
+    chunk_size: int = 512,
+    overlap: int = 96,
+    separators: Optional[list[str]] = None,
+    length_function: Optional[LengthFunction] = None,
+) -> Iterator[tuple[str, int, int]]:
+    """
+    Split text arriving in pieces (e.g. PDF pages) without joining it first.
+
+    Yields the same chunks as :func:`split_text_spans` on the joined text,
+    however it was cut. Once the buffer holds more than ``chunk_size`` and the
+    coarsest separator, the joined text is known to be split at that
+    separator, and the pieces it delimits are merged as they complete. Only
+    text from the start of the current window on is kept, so memory stays
+    bounded by the largest piece rather than by the whole text. Text that
+    never reaches that point is split once it has all arrived.
+
+    Yields:
+        ``(chunk_text, start, end)`` with offsets into the concatenated text.
+    """
+
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive.")
+    if not 0 <= overlap < chunk_size:
+        raise ValueError("overlap must be non-negative and smaller than chunk_size.")
+
+    separators = separators or DEFAULT_SEPARATORS
+    sep = separators[0]
+    splitter = _SpanSplitter("", chunk_size, overlap, length_function)
+    merger: Optional[_PieceMerger] = None
+    base = 0  # offset of the buffer in the concatenated text
+    pos = 0  # start of the next unmerged piece in the buffer
+
+    for piece in pieces:
+        if not piece:
+            continue
+        splitter.text += piece
+        text = splitter.text
+        # Separators found before the last non-space character cannot move
+        # however the text goes on.
+        end = len(text.rstrip())
+        if merger is None:
+            start = end - len(text[:end].lstrip())
+            if (
+                not sep
+                or text.find(sep, start, end) == -1
+                or splitter.measure(start, end) <= chunk_size
+            ):
+                continue
+            merger = _PieceMerger(splitter, sep, separators[1:])
+            pos = start
+
+        while (idx := text.find(sep, pos, end)) != -1:
+            merger.add(pos, idx)
+            pos = idx + len(sep)
+
+        for start, stop in splitter.spans:
+            yield text[start:stop], base + start, base + stop
+        splitter.spans.clear()
+
+        keep = merger.window[0][0] if merger.window else pos
+        splitter.text = text[keep:]
+        merger.shift(keep)
+        base += keep
+        pos -= keep
+
+    text = splitter.text
+    if merger is None:
+        spans = split_text_spans(text, chunk_size, overlap, separators, length_function)
+    else:
+        end = len(text.rstrip())
+        while pos <= end:
+            idx = text.find(sep, pos, end)
+            if idx == -1:
+                idx = end
+            merger.add(pos, idx)
+            pos = idx + len(sep)
+        merger.finish()
+        spans = splitter.spans
+
+    for start, stop in spans:
+        yield text[start:stop], base + start, base + stop
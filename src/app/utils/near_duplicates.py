@@ -0,0 +1,104 @@
+"""MinHash signatures and LSH bands for finding near-duplicate chunks.
+
+A chunk's signature holds, for each of ``NUM_PERM`` hash functions, the
+minimum hash over its word 3-shingles; the share of equal positions in two
+signatures estimates the Jaccard similarity of their shingle sets. Signatures
+are cut into ``LSH_BANDS`` bands of ``LSH_ROWS`` values, and chunks sharing
+any band are candidates. With 16 bands of 8 rows, pairs at similarity 0.8 are
+found 95% of the time and pairs at 0.9 almost always; the estimated
+similarity of each candidate is then checked against the threshold.
+"""
+
+import hashlib
+import re
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+
+SHINGLE_WORDS = 3
+NUM_PERM = 128
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS
+
+_WORD = re.compile(r"\w+")
+
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+# Multiply-shift hash functions (a * x + b mod 2**64) >> 32, one per
+# permutation. The constants come from blake2b rather than a random
+# generator so stored signatures stay comparable across versions.
+_A = np.array([_hash64(b"a%d" % i) | 1 for i in range(NUM_PERM)], dtype=np.uint64)
+_B = np.array([_hash64(b"b%d" % i) for i in range(NUM_PERM)], dtype=np.uint64)
+
+
+def minhash(text: str) -> list[int]:
+    """MinHash signature of ``text`` as signed 32-bit values (INTEGER[])."""
+    words = _WORD.findall(text.casefold()) or [text]
+    shingles = {
+        " ".join(words[i : i + SHINGLE_WORDS])
+        for i in range(max(1, len(words) - SHINGLE_WORDS + 1))
+    }
+    hashes = np.array(
+        [_hash64(shingle.encode()) for shingle in shingles], dtype=np.uint64
+    )
+    # uint64 arithmetic wraps around, which is the intended mod 2**64.
+    permuted = (hashes[:, None] * _A + _B) >> np.uint64(32)
+    signature = permuted.min(axis=0).astype(np.int64) - (1 << 31)
+    return signature.tolist()
+
+
+def lsh_bands(signature: list[int]) -> list[int]:
+    """Keys of the signature's LSH bands as signed 64-bit values (BIGINT[])."""
+    keys = []
+    for band in range(LSH_BANDS):
+        values = signature[band * LSH_ROWS : (band + 1) * LSH_ROWS]
+        data = band.to_bytes(2, "little") + b"".join(
+            value.to_bytes(4, "little", signed=True) for value in values
+        )
+        key = _hash64(data)
+        keys.append(key - (1 << 64) if key >= 1 << 63 else key)
+    return keys
+
+
+def similarity(a: list[int], b: list[int]) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    if len(a) != len(b) or not a:
+        return 0.0
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+class NearDuplicateIndex:
+    """In-memory LSH index of signatures."""
+
+    def __init__(self, items: Iterable[tuple[str, list[int]]] = ()):
+        self._bands: dict[int, list[tuple[str, list[int]]]] = {}
+        for key, signature in items:
+            self.add(key, signature)
+
+    def add(self, key: str, signature: list[int]) -> None:
+        for band in lsh_bands(signature):
+            self._bands.setdefault(band, []).append((key, signature))
+
+    def find(
+        self,
+        signature: list[int],
+        threshold: float,
+        accept: Optional[Callable[[str], bool]] = None,
+    ) -> Optional[tuple[str, float]]:
+        """The most similar accepted key at or above ``threshold`` and its score."""
+        best: Optional[tuple[str, float]] = None
+        seen: set[str] = set()
+        for band in lsh_bands(signature):
+            for key, other in self._bands.get(band, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                score = similarity(signature, other)
+                if score < threshold or (best and score <= best[1]):
+                    continue
+                if accept is None or accept(key):
+                    best = (key, score)
+        return best
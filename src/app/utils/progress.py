@@ -1,22 +1,89 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional, Protocol
+
 from rich.progress import (
     BarColumn,
     MofNCompleteColumn,
     Progress,
     SpinnerColumn,
+    TaskID,
     TaskProgressColumn,
     TextColumn,
     TimeRemainingColumn,
 )
 
 
+class ProgressListener(Protocol):
+    """Receives stage progress, e.g. a background ingestion job."""
+
+    def set_stage(self, description: str, total: Optional[float]) -> None: ...
+
+    def advance(self, description: str, count: float = 1) -> None: ...
+
+
+_listener: ContextVar[Optional[ProgressListener]] = ContextVar(
+    "progress_listener", default=None
+)
+
+
+@contextmanager
+def report_progress_to(listener: ProgressListener) -> Iterator[None]:
+    """Forward progress bars in the current context to ``listener``.
+
+    While active, bars are not rendered on the console.
+    """
+
+    token = _listener.set(listener)
+    try:
+        yield
+    finally:
+        _listener.reset(token)
+
+
+def report_stage(description: str, total: Optional[float] = None) -> None:
+    """Announce a stage to the current listener without drawing a bar."""
+
+    listener = _listener.get()
+    if listener is not None:
+        listener.set_stage(description, total)
+
+
+def report_advance(description: str, count: float = 1) -> None:
+    """Advance a stage of the current listener without drawing a bar."""
+
+    listener = _listener.get()
+    if listener is not None:
+        listener.advance(description, count)
+
+
+class _ReportingProgress(Progress):
+    """Rich progress bar that also forwards task updates to a listener."""
+
+    def __init__(self, *columns: Any, listener: Optional[ProgressListener] = None):
+        super().__init__(*columns, disable=listener is not None)
+        self.listener = listener
+
+    def add_task(self, description: str, *args: Any, **kwargs: Any) -> TaskID:
+        if self.listener is not None:
+            self.listener.set_stage(description, kwargs.get("total", 100.0))
+        return super().add_task(description, *args, **kwargs)
+
+    def update(self, task_id: TaskID, *args: Any, **kwargs: Any) -> None:
+        if self.listener is not None and kwargs.get("advance"):
+            self.listener.advance(self._tasks[task_id].description, kwargs["advance"])
+        super().update(task_id, *args, **kwargs)
+
+
 def progress_bar(description: str, color: str = "cyan") -> Progress:
     """Create a Rich progress bar."""
 
-    return Progress(
+    return _ReportingProgress(
         SpinnerColumn(),
         TextColumn("[progress.description]{task.description}"),
         BarColumn(),
         TaskProgressColumn(),
         MofNCompleteColumn(),
         TimeRemainingColumn(),
+        listener=_listener.get(),
     )
@@ -0,0 +1,496 @@
+"""Rate-limit-aware scheduling of embedding API calls.
+
+Every embedding request in the process (query-time embedding, ingestion jobs,
+bulk loads) goes through one :class:`EmbeddingScheduler`, which owns a single
+budget for the provider:
+
+* concurrency adapts with AIMD: one more slot per window of successful calls,
+  halved when the provider pushes back (429, 5xx, timeouts);
+* ``Retry-After`` and ``x-ratelimit-*`` response headers pause dispatching
+  until the provider's window resets, instead of every request backing off
+  on its own;
+* optional configured request and token rates (``EMBEDDINGS_RPM``,
+  ``EMBEDDINGS_TPM``) pace calls before the provider has to refuse them;
+* queries are dispatched before queued ingestion calls, and ingestion never
+  takes the last slot, so a large ingest does not delay interactive searches.
+
+Calls made under :func:`app.utils.admission.admission_deadline` are rejected
+like other upstreams when the query queue is full or the deadline passes.
+"""
+
+import heapq
+import itertools
+import logging
+import math
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Iterator, Literal, Mapping, Optional
+
+import openai
+
+from app.core.config import settings
+from app.utils.admission import AdmissionRejected, current_deadline
+
+logger = logging.getLogger(__name__)
+
+Priority = Literal["query", "ingest"]
+_PRIORITY_RANK: dict[str, int] = {"query": 0, "ingest": 1}
+
+# First pause after a 429 or server error that carries no usable reset
+# header; it doubles while the provider keeps pushing back.
+DEFAULT_BACKOFF = 1.0
+MAX_PAUSE = 60.0
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a text (about four characters per token)."""
+    return max(1, len(text) // 4)
+
+
+def _parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds from ``"20"``, ``"1.5s"``, ``"250ms"`` or ``"6m0s"`` style values."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def _parse_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Seconds the provider asks us to wait, from ``Retry-After(-Ms)``."""
+    millis = _parse_duration(headers.get("retry-after-ms"))
+    if millis is not None:
+        return millis / 1000
+    value = headers.get("retry-after")
+    seconds = _parse_duration(value)
+    if seconds is not None or not value:
+        return seconds
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(slots=True)
+class RateLimitInfo:
+    """What a response's headers say about the provider's current window."""
+
+    remaining_requests: Optional[int] = None
+    remaining_tokens: Optional[int] = None
+    reset_requests: Optional[float] = None
+    reset_tokens: Optional[float] = None
+
+    @classmethod
+    def from_headers(cls, headers: Mapping[str, str]) -> "RateLimitInfo":
+        # OpenAI style (x-ratelimit-*-requests/-tokens) or Together style
+        # (x-ratelimit-* for requests, x-tokenlimit-* for tokens).
+        def first(*names: str) -> Optional[str]:
+            for name in names:
+                if headers.get(name) is not None:
+                    return headers.get(name)
+            return None
+
+        return cls(
+            remaining_requests=_parse_int(
+                first("x-ratelimit-remaining-requests", "x-ratelimit-remaining")
+            ),
+            remaining_tokens=_parse_int(
+                first("x-ratelimit-remaining-tokens", "x-tokenlimit-remaining")
+            ),
+            reset_requests=_parse_duration(
+                first("x-ratelimit-reset-requests", "x-ratelimit-reset")
+            ),
+            reset_tokens=_parse_duration(first("x-ratelimit-reset-tokens")),
+        )
+
+
+class _Bucket:
+    """Token bucket refilled at a per-minute rate; holds ten seconds' worth."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60
+        self.capacity = max(1.0, self.rate * 10)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float) -> None:
+        self.level -= amount
+
+    def give_back(self, amount: float) -> None:
+        self.level = min(self.capacity, self.level + amount)
+
+
+@dataclass(slots=True)
+class _Window:
+    """Provider budget left until a header-announced reset."""
+
+    remaining: int
+    resets_at: float
+
+
+@dataclass(slots=True)
+class SchedulerStats:
+    """Counters and recent queue waits of the embedding scheduler."""
+
+    admitted: dict[str, int] = field(default_factory=lambda: {"query": 0, "ingest": 0})
+    rejected_queue_full: int = 0
+    rejected_timeout: int = 0
+    rate_limited: int = 0
+    server_errors: int = 0
+    retries: int = 0
+    tokens: int = 0
+    waits: dict[str, deque[float]] = field(
+        default_factory=lambda: {
+            "query": deque(maxlen=1000),
+            "ingest": deque(maxlen=1000),
+        }
+    )
+
+    def wait_percentile(self, priority: str, percentile: float) -> Optional[float]:
+        waits = self.waits[priority]
+        if not waits:
+            return None
+        ordered = sorted(waits)
+        return ordered[min(len(ordered) - 1, int(percentile * len(ordered)))]
+
+
+@dataclass(slots=True)
+class _Permit:
+    priority: str
+    tokens: int
+    started: float
+
+
+class EmbeddingScheduler:
+    """Shared, adaptive budget for embedding API calls."""
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue: int,
+        initial_concurrency: int,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        max_retries: int = 5,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.max_retries = max(0, max_retries)
+        self.limit = float(min(self.max_concurrency, max(1, initial_concurrency)))
+        self.stats = SchedulerStats()
+        self._requests = _Bucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = _Bucket(tokens_per_minute) if tokens_per_minute else None
+        self._request_window: Optional[_Window] = None
+        self._token_window: Optional[_Window] = None
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._pushbacks = 0
+        self._active = 0
+        self._waiting: list[tuple[int, int, object]] = []
+        self._waiting_with_deadline = 0
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+
+    def call(
+        self,
+        request: Callable[[], Any],
+        priority: Priority = "query",
+        tokens: int = 1,
+    ) -> Any:
+        """
+        Run an embeddings request under the shared budget.
+
+        Args:
+            request: Performs the request with ``with_raw_response`` and
+                returns the raw response, so its rate-limit headers are seen.
+            priority: ``query`` for search-time embedding, ``ingest`` for
+                ingestion; queries go first.
+            tokens: Estimated input tokens, charged against the token budget.
+
+        Returns:
+            The parsed response.
+
+        Raises:
+            AdmissionRejected: When called under an admission deadline that
+                passes, or with the query queue full.
+            openai.APIError: When the request fails for good, or still hits
+                rate limits or server errors after ``max_retries`` retries.
+        """
+
+        attempt = 0
+        while True:
+            with self._slot(priority, tokens) as permit:
+                try:
+                    raw = request()
+                except (openai.RateLimitError, openai.InternalServerError) as exc:
+                    self._on_pushback(permit, exc)
+                    error: Exception = exc
+                except (openai.APIConnectionError, openai.APITimeoutError) as exc:
+                    self._on_pushback(permit, exc)
+                    error = exc
+                else:
+                    response = raw.parse()
+                    self._on_success(permit, raw.headers, response)
+                    return response
+            attempt += 1
+            if attempt > self.max_retries:
+                raise error
+            with self._cond:
+                self.stats.retries += 1
+            logger.debug("Retrying embeddings request (%d): %s", attempt, error)
+
+    @contextmanager
+    def _slot(self, priority: Priority, tokens: int) -> Iterator[_Permit]:
+        deadline = current_deadline()
+        started = time.monotonic()
+        ticket = object()
+        entry = (_PRIORITY_RANK[priority], next(self._sequence), ticket)
+        with self._cond:
+            if deadline is not None:
+                if self._waiting_with_deadline >= self.max_queue and (
+                    self._waiting or not self._can_dispatch(priority, tokens, started)
+                ):
+                    self.stats.rejected_queue_full += 1
+                    raise AdmissionRejected(
+                        "embeddings", "queue full", self._retry_after_hint()
+                    )
+                self._waiting_with_deadline += 1
+            heapq.heappush(self._waiting, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if self._waiting[0][2] is ticket:
+                        delay = self._dispatch_delay(priority, tokens, now)
+                        if delay == 0.0:
+                            break
+                    else:
+                        delay = None
+                    if deadline is not None:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            self.stats.rejected_timeout += 1
+                            raise AdmissionRejected(
+                                "embeddings",
+                                "queue wait timed out",
+                                self._retry_after_hint(),
+                            )
+                        delay = remaining if delay is None else min(delay, remaining)
+                    self._cond.wait(delay)
+            finally:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                if deadline is not None:
+                    self._waiting_with_deadline -= 1
+                self._cond.notify_all()
+
+            self._charge(tokens)
+            self._active += 1
+            self.stats.admitted[priority] += 1
+            self.stats.waits[priority].append(time.monotonic() - started)
+            permit = _Permit(priority, tokens, time.monotonic())
+
+        try:
+            yield permit
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    def _slots(self, priority: str) -> int:
+        slots = max(1, math.floor(self.limit))
+        # Ingestion leaves the last slot to queries.
+        return slots - 1 if priority == "ingest" and slots > 1 else slots
+
+    def _can_dispatch(self, priority: str, tokens: int, now: float) -> bool:
+        return self._dispatch_delay(priority, tokens, now) == 0.0
+
+    def _dispatch_delay(
+        self, priority: str, tokens: int, now: float
+    ) -> Optional[float]:
+        """0 when a call may start now, else seconds to wait (None: until notified)."""
+        if self._active >= self._slots(priority):
+            return None
+        delay = max(0.0, self._paused_until - now)
+        for window, amount in (
+            (self._request_window, 1),
+            (self._token_window, tokens),
+        ):
+            if window is None:
+                continue
+            if now >= window.resets_at:
+                if window is self._request_window:
+                    self._request_window = None
+                else:
+                    self._token_window = None
+            elif window.remaining < amount:
+                delay = max(delay, window.resets_at - now)
+        if self._requests is not None:
+            delay = max(delay, self._requests.wait_time(1, now))
+        if self._tokens is not None:
+            delay = max(delay, self._tokens.wait_time(tokens, now))
+        return delay
+
+    def _charge(self, tokens: int) -> None:
+        if self._requests is not None:
+            self._requests.take(1)
+        if self._tokens is not None:
+            self._tokens.take(tokens)
+        if self._request_window is not None:
+            self._request_window.remaining -= 1
+        if self._token_window is not None:
+            self._token_window.remaining -= tokens
+
+    def _on_success(
+        self, permit: _Permit, headers: Mapping[str, str], response: Any
+    ) -> None:
+        usage = getattr(response, "usage", None)
+        used = getattr(usage, "prompt_tokens", None) or permit.tokens
+        with self._cond:
+            self.stats.tokens += used
+            if self._tokens is not None:
+                # Settle the estimate against what the provider counted.
+                self._tokens.give_back(permit.tokens - used)
+            self._observe(RateLimitInfo.from_headers(headers))
+            self._pushbacks = 0
+            # Additive increase, about one slot per window of successful calls,
+            # only while the limit is in use; idle headroom proves nothing.
+            if self._active >= math.floor(self.limit) - 1:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def _on_pushback(self, permit: _Permit, exc: Exception) -> None:
+        response = getattr(exc, "response", None)
+        headers: Mapping[str, str] = response.headers if response is not None else {}
+        pause = _retry_after(headers)
+        info = RateLimitInfo.from_headers(headers)
+        with self._cond:
+            # Requests already in flight when we last backed off report the
+            # same congestion again; they neither shrink the limit further
+            # nor lengthen the backoff.
+            fresh = permit.started > self._last_decrease
+            backoff = DEFAULT_BACKOFF * 2 ** max(0, self._pushbacks - (not fresh))
+            if isinstance(exc, openai.RateLimitError):
+                self.stats.rate_limited += 1
+                if pause is None:
+                    resets = [r for r in (info.reset_requests, info.reset_tokens) if r]
+                    pause = max(resets) if resets else backoff
+            else:
+                self.stats.server_errors += 1
+                pause = backoff if pause is None else pause
+            pause = min(pause, MAX_PAUSE)
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + pause)
+            if fresh:
+                # Multiplicative decrease.
+                self.limit = max(1.0, self.limit / 2)
+                self._last_decrease = now
+                self._pushbacks += 1
+                logger.warning(
+                    "Embeddings provider pushed back (%s); concurrency now %d, "
+                    "pausing %.1fs",
+                    type(exc).__name__,
+                    math.floor(self.limit),
+                    pause,
+                )
+            self._cond.notify_all()
+
+    def _observe(self, info: RateLimitInfo) -> None:
+        now = time.monotonic()
+        # The provider counted this request, but not necessarily the others
+        # still in flight.
+        in_flight = self._active - 1
+        if info.remaining_requests is not None and info.reset_requests is not None:
+            self._request_window = _Window(
+                info.remaining_requests - in_flight, now + info.reset_requests
+            )
+        if info.remaining_tokens is not None and info.reset_tokens is not None:
+            self._token_window = _Window(
+                info.remaining_tokens - in_flight, now + info.reset_tokens
+            )
+
+    def _retry_after_hint(self) -> float:
+        paused = self._paused_until - time.monotonic()
+        return max(1.0, paused, self.stats.wait_percentile("query", 0.95) or 0.0)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._cond:
+            now = time.monotonic()
+            waiting = {"query": 0, "ingest": 0}
+            for rank, _, _ in self._waiting:
+                waiting["query" if rank == 0 else "ingest"] += 1
+            return {
+                "concurrency_limit": math.floor(self.limit),
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "active": self._active,
+                "waiting": waiting,
+                "admitted": dict(self.stats.admitted),
+                "rejected_queue_full": self.stats.rejected_queue_full,
+                "rejected_timeout": self.stats.rejected_timeout,
+                "rate_limited": self.stats.rate_limited,
+                "server_errors": self.stats.server_errors,
+                "retries": self.stats.retries,
+                "tokens": self.stats.tokens,
+                "paused_for": max(0.0, self._paused_until - now),
+                "remaining_requests": (
+                    self._request_window.remaining if self._request_window else None
+                ),
+                "remaining_tokens": (
+                    self._token_window.remaining if self._token_window else None
+                ),
+                "queue_wait_p95": {
+                    priority: self.stats.wait_percentile(priority, 0.95)
+                    for priority in ("query", "ingest")
+                },
+            }
+
+
+_scheduler: Optional[EmbeddingScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def embedding_scheduler() -> EmbeddingScheduler:
+    """Return the process-wide embedding scheduler."""
+
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = EmbeddingScheduler(
+                max_concurrency=settings.embeddings_max_concurrency,
+                max_queue=settings.embeddings_max_queue,
+                initial_concurrency=settings.embeddings_initial_concurrency,
+                requests_per_minute=settings.embeddings_rpm,
+                tokens_per_minute=settings.embeddings_tpm,
+                max_retries=settings.embeddings_max_retries,
+            )
+        return _scheduler
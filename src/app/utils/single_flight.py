@@ -0,0 +1,77 @@
+"""Single-flight coalescing of identical concurrent requests."""
+
+import asyncio
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Generic, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+def normalize_question(question: str) -> str:
+    """Case- and whitespace-insensitive form of a question for request keys."""
+    return " ".join(unicodedata.normalize("NFKC", question).casefold().split())
+
+
+@dataclass(slots=True)
+class SingleFlightStats:
+    """Counts of executed and coalesced calls."""
+
+    executions: int = 0
+    coalesced: int = 0
+    in_flight: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        calls = self.executions + self.coalesced
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": self.in_flight,
+            "coalesced_ratio": self.coalesced / calls if calls else 0.0,
+        }
+
+
+class SingleFlight(Generic[T]):
+    """
+    Share one in-flight execution between concurrent callers with the same key.
+
+    The first caller for a key starts the call as its own task; callers that
+    arrive before it finishes await the same task instead of starting
+    another. The task is shielded, so a caller that disconnects does not
+    cancel the work the others are waiting on. Results are not cached:
+    once the call finishes, the next caller starts a new one.
+    """
+
+    def __init__(self) -> None:
+        self._in_flight: dict[Hashable, asyncio.Task[T]] = {}
+        self.stats = SingleFlightStats()
+
+    async def do(
+        self, key: Hashable, call: Callable[[], Awaitable[T]]
+    ) -> tuple[T, bool]:
+        """
+        Run ``call`` for ``key`` or join the execution already running.
+
+        Returns:
+            The call's result and whether it was shared with an earlier caller.
+        """
+
+        task = self._in_flight.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._in_flight[key] = task
+            self.stats.executions += 1
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.stats.coalesced += 1
+        self.stats.in_flight = len(self._in_flight)
+        return await asyncio.shield(task), shared
+
+    def _finish(self, key: Hashable, task: asyncio.Task[T]) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        self.stats.in_flight = len(self._in_flight)
+        if not task.cancelled():
+            # Mark the error as retrieved when every caller went away.
+            task.exception()
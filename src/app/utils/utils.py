@@ -1,7 +1,8 @@
 import logging
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 
 from app.models.models import Document
+from app.utils.chunker import LengthFunction, split_text_spans, split_text_stream
 from app.utils.progress import progress_bar
 
 logger = logging.getLogger(__name__)
@@ -13,7 +14,11 @@ def recursive_split(
     overlap: int = 96,
     separators: Optional[list[str]] = None,
 ) -> list[str]:
-    """Recursively split text into chunks of specified size with overlap."""
+    """Recursively split text into chunks of specified size with overlap.
+
+    Legacy string-concatenating splitter, kept as the baseline for
+    ``benchmarks/chunking.py``. Ingestion uses :func:`split_text_spans`.
+    """
 
     if separators is None:
         separators = ["\n\n", "\n", ".", " ", ""]
@@ -47,10 +52,59 @@ def recursive_split(
     return [text[i : i + chunk_size] for i in range(0, len(text), chunk_size - overlap)]
 
 
+def split_document(
+    text: str,
+    source: str,
+    chunk_size: int = 500,
+    overlap: int = 100,
+    length_function: Optional[LengthFunction] = None,
+) -> list[Document]:
+    """Split a single document into chunks carrying their source offsets."""
+
+    text = str(text)
+    return [
+        Document(
+            text=text[start:end],
+            metadata={"source": source, "start_index": start, "end_index": end},
+        )
+        for start, end in split_text_spans(
+            text, chunk_size, overlap, length_function=length_function
+        )
+    ]
+
+
+def split_document_stream(
+    pieces: Iterable[str],
+    source: str,
+    chunk_size: int = 500,
+    overlap: int = 100,
+    length_function: Optional[LengthFunction] = None,
+) -> Iterator[Document]:
+    """Split a document arriving in pieces (e.g. PDF pages) into chunks lazily.
+
+    Offsets refer to the concatenation of all pieces, as in :func:`split_document`.
+    """
+
+    for text, start, end in split_text_stream(
+        pieces, chunk_size, overlap, length_function=length_function
+    ):
+        yield Document(
+            text=text,
+            metadata={"source": source, "start_index": start, "end_index": end},
+        )
+
+
 def split_docs(
-    docs: list[tuple[str, str]], chunk_size: int = 500, overlap: int = 100
+    docs: list[tuple[str, str]],
+    chunk_size: int = 500,
+    overlap: int = 100,
+    length_function: Optional[LengthFunction] = None,
 ) -> list[Document]:
-    """Split a list of documents into smaller chunks."""
+    """Split a list of documents into smaller chunks.
+
+    Each chunk records its ``start_index``/``end_index`` character offsets in
+    the source text alongside the ``source`` metadata.
+    """
 
     all_chunks = []
 
@@ -58,9 +112,9 @@ def split_docs(
         task = progress.add_task("Splitting documents...", total=len(docs))
 
         for text, url in docs:
-            metadata = {"source": url}
-            for chunk in recursive_split(str(text), chunk_size, overlap):
-                all_chunks.append(Document(text=chunk, metadata=metadata))
+            all_chunks.extend(
+                split_document(text, url, chunk_size, overlap, length_function)
+            )
             progress.update(task, advance=1)
 
     logging.info(f"Split documents into {len(all_chunks)} chunks.")
@@ -1 +1 @@
-from app.workflow.rag_workflow import build_rag_workflow
+from app.workflow.rag_workflow import RAGWorkflow, build_rag_workflow
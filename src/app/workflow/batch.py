@@ -0,0 +1,135 @@
+"""Answer many questions at once, e.g. for evaluation or offline QA.
+
+Compared with invoking the graph once per question, a batch embeds every
+uncached question in one request, runs the hybrid searches over a small pool of
+connections, and reranks and generates with bounded concurrency. Answers are
+yielded as soon as each one is ready, in completion order.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional, Sequence
+
+from app.core.config import settings
+from app.models.models import Document, SearchResult, State
+from app.workflow.rag_workflow import RAGWorkflow
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class BatchAnswer:
+    """The answer to one question of a batch."""
+
+    index: int
+    question: str
+    answer: str = ""
+    context: list[Document] = field(default_factory=list)
+    llm: Optional[dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+def iter_batch_answers(
+    workflow: RAGWorkflow,
+    questions: Sequence[str],
+    model: Optional[str] = None,
+    concurrency: int = settings.batch_query_concurrency,
+) -> Iterator[BatchAnswer]:
+    """
+    Run the RAG pipeline for many questions and yield answers as they finish.
+
+    Args:
+        workflow: The workflow whose vector store, reranker and LLM are used.
+        questions: Questions to answer; ``BatchAnswer.index`` refers to them.
+        model: LLM model for every question; defaults to the active model.
+        concurrency: Questions searched, reranked and generated at once.
+
+    Returns:
+        Iterator of BatchAnswer in completion order. Questions whose rerank
+        or generation fails carry an ``error`` instead of an answer.
+
+    Raises:
+        Exception: When embedding or searching the batch fails.
+    """
+
+    if not questions:
+        return
+    concurrency = max(1, concurrency)
+    states: list[State] = [
+        workflow.analyze_query(
+            {"question": question, "model": model or workflow.config.llm_model}
+        )
+        for question in questions
+    ]
+    # Conversational questions skip retrieval, as in the graph.
+    searched = [
+        index
+        for index, state in enumerate(states)
+        if workflow.route_query(state) == "knowledge"
+    ]
+    query_texts = [states[index]["query"].text for index in searched]
+
+    results: dict[int, list[SearchResult]] = {}
+    if searched:
+        # Questions missing from the result cache are embedded in one request.
+        searches = workflow.vector_db.hybrid_search_batch(
+            query_texts,
+            top_k=workflow.config.postgres_search_top_k,
+            max_connections=concurrency,
+        )
+        results = dict(zip(searched, searches))
+    logger.info("Retrieved context for %d batch questions", len(searched))
+
+    def answer(index: int) -> BatchAnswer:
+        state: State = {
+            **states[index],
+            "context": [
+                Document(text=doc.text, metadata=doc.metadata or {})
+                for doc in results.get(index, [])
+            ],
+        }
+        try:
+            if index in results:
+                state = workflow.generate(workflow.rerank(state))
+            else:
+                state = workflow.respond(state)
+        except Exception as exc:
+            logger.error("Batch question %d failed: %s", index, exc, exc_info=True)
+            return BatchAnswer(
+                index=index,
+                question=questions[index],
+                context=state["context"],
+                error=str(exc),
+            )
+        return BatchAnswer(
+            index=index,
+            question=questions[index],
+            answer=state["answer"],
+            context=state["context"],
+            llm=state.get("llm"),
+        )
+
+    with ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="batch-query"
+    ) as executor:
+        futures = [executor.submit(answer, index) for index in range(len(questions))]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # Stop queued questions when the consumer goes away early.
+            for future in futures:
+                future.cancel()
+
+
+def run_batch(
+    workflow: RAGWorkflow,
+    questions: Sequence[str],
+    model: Optional[str] = None,
+    concurrency: int = settings.batch_query_concurrency,
+) -> list[BatchAnswer]:
+    """Answer every question and return the answers in question order."""
+
+    answers = list(iter_batch_answers(workflow, questions, model, concurrency))
+    return sorted(answers, key=lambda answer: answer.index)
@@ -0,0 +1,206 @@
+"""Per-model latency statistics and circuit breakers for LLM calls.
+
+State is process-wide and keyed by model name, so every ``LLMClient`` shares
+what it has learned about a model: its recent latency (used to decide when
+to hedge) and whether it is currently failing (used to skip it).
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Literal, Optional
+
+from app.core.config import settings
+
+BreakerState = Literal["closed", "open", "half_open"]
+
+
+@dataclass(slots=True)
+class _Outcome:
+    at: float
+    ok: bool
+    latency: float
+
+
+@dataclass(slots=True)
+class ModelHealth:
+    """Recent calls of one model and the state of its circuit breaker."""
+
+    model: str
+    calls: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    cancelled: int = 0
+    state: BreakerState = "closed"
+    opened_at: float = 0.0
+    trial_in_flight: bool = False
+    recent: deque[_Outcome] = field(default_factory=lambda: deque(maxlen=500))
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def _prune(self, now: float) -> None:
+        while self.recent and now - self.recent[0].at > settings.llm_breaker_window:
+            self.recent.popleft()
+
+    def allow(self) -> bool:
+        """Whether a call may be sent to the model now."""
+        with self.lock:
+            now = time.monotonic()
+            if self.state == "open":
+                if now - self.opened_at < settings.llm_breaker_cooldown:
+                    return False
+                self.state = "half_open"
+                self.trial_in_flight = False
+            if self.state == "half_open":
+                # Let one trial call through to probe the model.
+                if self.trial_in_flight:
+                    return False
+                self.trial_in_flight = True
+            return True
+
+    def record(self, ok: bool, latency: float, timed_out: bool = False) -> None:
+        """Record a finished call; slow calls count as failures."""
+        with self.lock:
+            now = time.monotonic()
+            ok = ok and latency <= settings.llm_breaker_slow_call
+            self.calls += 1
+            self.errors += not ok
+            self.timeouts += timed_out
+            self.recent.append(_Outcome(now, ok, latency))
+            self._prune(now)
+
+            if self.state == "half_open":
+                self.trial_in_flight = False
+                if ok:
+                    self.state = "closed"
+                    self.recent.clear()
+                else:
+                    self.state, self.opened_at = "open", now
+                return
+            failures = sum(not outcome.ok for outcome in self.recent)
+            if (
+                len(self.recent) >= settings.llm_breaker_min_calls
+                and failures / len(self.recent) >= settings.llm_breaker_error_rate
+            ):
+                self.state, self.opened_at = "open", now
+
+    def record_cancelled(self, latency: float, slow_after: float) -> None:
+        """A call lost the race to another model and was cancelled.
+
+        Its latency is at least ``latency``. Once that is past ``slow_after``
+        (the hedge delay) or the slow-call threshold it is recorded as a
+        sample, so a model that keeps losing still trips its breaker and
+        raises its hedge percentile. A call cut short earlier tells nothing.
+        """
+        with self.lock:
+            self.cancelled += 1
+            if latency < min(slow_after, settings.llm_breaker_slow_call):
+                if self.state == "half_open":
+                    self.trial_in_flight = False
+                return
+        self.record(True, latency)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Latency percentile of recent successful calls, if there are enough."""
+        with self.lock:
+            self._prune(time.monotonic())
+            latencies = sorted(o.latency for o in self.recent if o.ok)
+        if len(latencies) < settings.llm_hedge_min_samples:
+            return None
+        return latencies[min(len(latencies) - 1, int(percentile * len(latencies)))]
+
+    def snapshot(self) -> dict[str, Any]:
+        with self.lock:
+            self._prune(time.monotonic())
+            recent = list(self.recent)
+            state = self.state
+        latencies = sorted(o.latency for o in recent if o.ok)
+
+        def percentile(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+        return {
+            "breaker": state,
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "recent_error_rate": (
+                sum(not o.ok for o in recent) / len(recent) if recent else 0.0
+            ),
+            "latency_p50": percentile(0.5),
+            "latency_p95": percentile(0.95),
+        }
+
+
+@dataclass(slots=True)
+class HedgeStats:
+    """How LLM requests were resolved across all models."""
+
+    requests: int = 0
+    primary: int = 0
+    hedged: int = 0
+    hedges_skipped: int = 0
+    hedge_won: int = 0
+    fallback: int = 0
+    short_circuited: int = 0
+    failed: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def count(
+        self,
+        outcome: str,
+        hedged: bool,
+        short_circuited: bool,
+        hedge_skipped: bool = False,
+    ) -> None:
+        with self.lock:
+            self.requests += 1
+            self.hedged += hedged
+            self.hedges_skipped += hedge_skipped
+            self.short_circuited += short_circuited
+            if outcome == "primary":
+                self.primary += 1
+            elif outcome == "hedge_won":
+                self.hedge_won += 1
+            elif outcome == "fallback":
+                self.fallback += 1
+            else:
+                self.failed += 1
+
+    def snapshot(self) -> dict[str, int]:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "primary": self.primary,
+                "hedged": self.hedged,
+                "hedges_skipped": self.hedges_skipped,
+                "hedge_won": self.hedge_won,
+                "fallback": self.fallback,
+                "short_circuited": self.short_circuited,
+                "failed": self.failed,
+            }
+
+
+_models: dict[str, ModelHealth] = {}
+_models_lock = threading.Lock()
+hedge_stats = HedgeStats()
+
+
+def model_health(model: str) -> ModelHealth:
+    with _models_lock:
+        health = _models.get(model)
+        if health is None:
+            health = _models[model] = ModelHealth(model=model)
+        return health
+
+
+def llm_metrics() -> dict[str, Any]:
+    with _models_lock:
+        models = list(_models.values())
+    return {
+        "requests": hedge_stats.snapshot(),
+        "models": {health.model: health.snapshot() for health in models},
+    }
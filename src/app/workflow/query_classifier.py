@@ -0,0 +1,182 @@
+"""Cheap local classification of queries into conversational turns and questions.
+
+Conversational turns (greetings, thanks, acknowledgements, farewells, "who are
+you") skip embedding, search and reranking and are answered with a short,
+context-free prompt. The classifier is deliberately conservative: a message is
+conversational only when every word of it is a known conversational phrase, so
+"hi, what is Freshmore?" still goes through retrieval.
+"""
+
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any, Literal
+
+QueryRoute = Literal["knowledge", "conversational"]
+
+MAX_CONVERSATIONAL_WORDS = 12
+
+_LATIN_PHRASES = [
+    # greetings
+    r"hi+",
+    r"hello+",
+    r"hey+",
+    r"hiya",
+    r"howdy",
+    r"yo",
+    r"greetings",
+    r"good (?:morning|afternoon|evening|day)",
+    r"hola",
+    r"bonjour",
+    r"salut",
+    r"hallo",
+    r"guten (?:morgen|tag|abend)",
+    r"ciao",
+    r"namaste",
+    r"selamat (?:pagi|siang|sore|malam)",
+    # small talk and questions about the assistant itself
+    r"how are (?:you|u)(?: doing)?(?: today)?",
+    r"how's it going",
+    r"how is it going",
+    r"what's up",
+    r"whats up",
+    r"sup",
+    r"who are you",
+    r"what are you",
+    r"what can you do",
+    r"what do you do",
+    r"help",
+    r"nice to meet you",
+    # thanks
+    r"thanks?(?: you)?(?: (?:so|very) much| a lot)?",
+    r"thx",
+    r"ty",
+    r"cheers",
+    r"much appreciated",
+    r"appreciate it",
+    r"merci(?: beaucoup)?",
+    r"gracias",
+    r"danke(?: schön| schon)?",
+    r"terima kasih",
+    # acknowledgements
+    r"ok(?:ay)?",
+    r"k",
+    r"cool",
+    r"great",
+    r"nice",
+    r"awesome",
+    r"perfect",
+    r"alright",
+    r"got it",
+    r"i see",
+    r"sounds good",
+    r"sure",
+    r"yes",
+    r"yep",
+    r"no",
+    r"nope",
+    # farewells
+    r"bye",
+    r"goodbye",
+    r"good night",
+    r"see (?:you|ya)(?: later| soon)?",
+    r"take care",
+    # words that only address the assistant
+    r"there",
+    r"again",
+    r"bot",
+    r"assistant",
+    r"everyone",
+    r"all",
+]
+
+_CJK_PHRASES = [
+    "你好",
+    "您好",
+    "谢谢",
+    "多谢",
+    "再见",
+    "こんにちは",
+    "こんばんは",
+    "おはよう",
+    "ありがとう",
+    "안녕하세요",
+    "감사합니다",
+]
+
+_CONVERSATIONAL = re.compile(
+    r"(?:(?:{latin})\b\s*|(?:{cjk})\s*)+".format(
+        latin="|".join(_LATIN_PHRASES), cjk="|".join(_CJK_PHRASES)
+    )
+)
+
+
+def _normalize(question: str) -> str:
+    text = unicodedata.normalize("NFKC", question).casefold().replace("’", "'")
+    # Punctuation and emoji carry no retrieval signal.
+    text = "".join(
+        char if char.isalnum() or char in "' " else " " for char in text
+    )
+    return " ".join(text.split())
+
+
+def classify_query(question: str) -> QueryRoute:
+    """Route a question to retrieval (``knowledge``) or the conversational path."""
+
+    text = _normalize(question)
+    if len(text.split()) > MAX_CONVERSATIONAL_WORDS:
+        return "knowledge"
+    if not text or _CONVERSATIONAL.fullmatch(text):
+        return "conversational"
+    return "knowledge"
+
+
+@dataclass(slots=True)
+class RouteStats:
+    """Routing counts and stage latencies, to estimate what the fast path saves."""
+
+    counts: dict[str, int] = field(
+        default_factory=lambda: {"knowledge": 0, "conversational": 0}
+    )
+    stage_seconds: dict[str, float] = field(default_factory=dict)
+    stage_calls: dict[str, int] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def count(self, route: QueryRoute) -> None:
+        with self.lock:
+            self.counts[route] += 1
+
+    def record(self, stage: str, seconds: float) -> None:
+        """Record the duration of ``retrieve``, ``rerank``, or ``generate:<route>``."""
+        with self.lock:
+            self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+            self.stage_calls[stage] = self.stage_calls.get(stage, 0) + 1
+
+    def _average(self, stage: str) -> float:
+        calls = self.stage_calls.get(stage, 0)
+        return self.stage_seconds[stage] / calls if calls else 0.0
+
+    def snapshot(self) -> dict[str, Any]:
+        with self.lock:
+            retrieval = self._average("retrieve") + self._average("rerank")
+            knowledge_generation = self._average("generate:knowledge")
+            conversational_generation = self._average("generate:conversational")
+            counts = dict(self.counts)
+        # A conversational turn skips retrieval and sends a much shorter prompt.
+        saved_per_turn = retrieval + max(
+            0.0, knowledge_generation - conversational_generation
+        )
+        return {
+            "counts": counts,
+            "avg_retrieval_seconds": retrieval,
+            "avg_generation_seconds": {
+                "knowledge": knowledge_generation,
+                "conversational": conversational_generation,
+            },
+            "estimated_saved_seconds_per_turn": saved_per_turn,
+            "estimated_saved_seconds": saved_per_turn * counts["conversational"],
+        }
+
+
+route_stats = RouteStats()
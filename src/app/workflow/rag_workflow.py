@@ -1,4 +1,6 @@
 import logging
+import time
+from dataclasses import asdict
 
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, START, StateGraph
@@ -6,6 +8,7 @@ from langgraph.graph import END, START, StateGraph
 from app.core.config import settings
 from app.db.vector_db import VectorDB
 from app.models.models import Document, SearchResult, State
+from app.workflow.query_classifier import QueryRoute, classify_query, route_stats
 from app.workflow.reranker import Reranker
 from app.workflow.router import LLMClient
 
@@ -50,16 +53,40 @@ class RAGWorkflow:
         - Knowledge query: {{ "text": "The Freshmore curriculum is great.[https://www.sutd.edu.sg/education]" }}
         """
 
+    def format_conversational_prompt(self, question: str) -> str:
+        """Format the short, context-free prompt for conversational turns."""
+
+        return f"""
+        You are a helpful technical assistant that answers questions about a knowledge base.
+        The user sent a conversational message, not a question about the knowledge base.
+        Reply naturally in one or two sentences, in the user's language.
+        For greetings, briefly introduce yourself and offer to answer questions about the knowledge base.
+        Do not cite sources. Return ONLY JSON with a "text" field.
+
+        **Message**: {question}
+        """
+
     def analyze_query(self, state: State) -> State:
         """Analyze and prepare the query for retrieval."""
-        # Currently a pass-through step that could be extended for query analysis
+
         query_text = state["question"]
         query = SearchResult(text=query_text, metadata={}, score=0.0)
-        return {**state, "query": query}
+        route: QueryRoute = (
+            classify_query(query_text) if self.config.query_fast_path else "knowledge"
+        )
+        route_stats.count(route)
+        if route == "conversational":
+            logger.info("Conversational query; skipping retrieval")
+        return {**state, "query": query, "route": route}
+
+    def route_query(self, state: State) -> QueryRoute:
+        """Pick the branch after ``analyze_query``."""
+        return state.get("route", "knowledge")
 
     def retrieve(self, state: State) -> State:
         """Retrieve relevant documents from the vector database."""
 
+        started = time.monotonic()
         query = state["query"].text
         logger.info(f"Retrieving documents for query: {query}")
         retrieved_docs_from_db = self.vector_db.hybrid_search(
@@ -69,6 +96,7 @@ class RAGWorkflow:
             Document(text=doc.text, metadata=doc.metadata or {})
             for doc in retrieved_docs_from_db
         ]
+        route_stats.record("retrieve", time.monotonic() - started)
         return {**state, "context": retrieved_docs}
 
     def rerank(self, state: State) -> State:
@@ -76,6 +104,7 @@ class RAGWorkflow:
 
         if not self.config.enable_reranker:
             return state
+        started = time.monotonic()
         logger.info("Reranking documents")
         query = state["query"].text
         docs = state["context"]
@@ -91,6 +120,7 @@ class RAGWorkflow:
                         original_doc = docs[original_index]
                         reranked_docs_with_metadata.append(original_doc)
 
+        route_stats.record("rerank", time.monotonic() - started)
         return {**state, "context": reranked_docs_with_metadata}
 
     def generate(self, state: State) -> State:
@@ -111,24 +141,56 @@ class RAGWorkflow:
         )
 
         messages = self.format_prompt(question=state["question"], context=docs_content)
+        return self._complete(state, messages, "knowledge")
+
+    def respond(self, state: State) -> State:
+        """Answer a conversational turn without retrieval or context."""
+
+        logger.info("Generating conversational response")
+        messages = self.format_conversational_prompt(question=state["question"])
+        return self._complete({**state, "context": []}, messages, "conversational")
+
+    def _complete(self, state: State, messages: str, route: QueryRoute) -> State:
+        started = time.monotonic()
         model_override = state.get("model") or self.config.llm_model
-        response = self.llm.chat_completion(messages, model_override=model_override)
+        response, call_info = self.llm.chat_completion_with_info(
+            messages, model_override=model_override
+        )
+        route_stats.record(f"generate:{route}", time.monotonic() - started)
 
         logger.info(f"Generated response: {response}")
         return {
             **state,
             "answer": response["text"] if response else "No response generated",
+            "llm": asdict(call_info),
         }
 
-    def build(self):
-        """Build and compile the LangGraph workflow."""
+    @staticmethod
+    def final_node(state: State) -> str:
+        """The node a finished run ended in, for saving its state to a thread."""
+        return "respond" if state.get("route") == "conversational" else "generate"
+
+    def build(self, checkpointer: bool = True):
+        """Build and compile the LangGraph workflow.
+
+        Without ``checkpointer`` runs keep no per-thread state and need no
+        ``thread_id``.
+        """
 
         graph_builder = StateGraph(State).add_sequence(
-            [self.analyze_query, self.retrieve, self.rerank, self.generate]
+            [self.retrieve, self.rerank, self.generate]
         )
+        graph_builder.add_node(self.analyze_query)
+        graph_builder.add_node(self.respond)
         graph_builder.add_edge(START, "analyze_query")
+        graph_builder.add_conditional_edges(
+            "analyze_query",
+            self.route_query,
+            {"knowledge": "retrieve", "conversational": "respond"},
+        )
         graph_builder.add_edge("generate", END)
-        memory = MemorySaver()
+        graph_builder.add_edge("respond", END)
+        memory = MemorySaver() if checkpointer else None
         return graph_builder.compile(checkpointer=memory)
 
 
@@ -3,6 +3,8 @@ from typing import Any, Optional
 
 import requests
 
+from app.utils.admission import admission_controller
+
 
 class Reranker:
     """Client for interacting with reranking APIs."""
@@ -30,15 +32,16 @@ class Reranker:
             "documents": doc_texts,
             "return_documents": False,
         }
-        try:
-            response = requests.post(
-                self.base_url, headers=headers, json=data, timeout=30
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Network error during reranking API call: {e}")
-            return None
-        except Exception as e:
-            logging.error(f"Error during reranking API call: {e}")
-            return None
+        with admission_controller("reranker").admit():
+            try:
+                response = requests.post(
+                    self.base_url, headers=headers, json=data, timeout=30
+                )
+                response.raise_for_status()
+                return response.json()
+            except requests.exceptions.RequestException as e:
+                logging.error(f"Network error during reranking API call: {e}")
+                return None
+            except Exception as e:
+                logging.error(f"Error during reranking API call: {e}")
+                return None
@@ -1,28 +1,85 @@
+import asyncio
 import json
 import logging
+import threading
+import time
+from dataclasses import dataclass
 from typing import Any, Optional, Union
 
-from openai import OpenAI
+from openai import APIStatusError, AsyncOpenAI
 from pydantic import BaseModel, ValidationError
 
+from app.utils.admission import admission_controller
+from app.workflow.llm_health import hedge_stats, model_health
+
 logger = logging.getLogger(__name__)
 
+CompletionResult = Optional[Union[dict[str, Any], BaseModel]]
+
+
+@dataclass(slots=True)
+class LLMCallInfo:
+    """How a chat completion was served.
+
+    ``outcome`` is ``primary`` (the requested model answered), ``hedge_won``
+    (the hedged request to the fallback model answered first), ``fallback``
+    (the fallback answered after the requested model failed or its circuit
+    was open) or ``failed``. ``hedge_skipped`` is set when a hedge was due
+    but every LLM slot was taken.
+    """
+
+    requested_model: str
+    model: Optional[str] = None
+    outcome: str = "failed"
+    hedged: bool = False
+    hedge_skipped: bool = False
+    short_circuited: bool = False
+    latency_seconds: float = 0.0
+
 
 class LLMClient:
-    """Client for interacting with LLM APIs through OpenAI-compatible interface."""
+    """Client for interacting with LLM APIs through OpenAI-compatible interface.
+
+    Each request has a deadline (``LLM_TIMEOUT``). With ``LLM_FALLBACK_MODEL``
+    set, a request still running after the requested model's recent latency
+    percentile is hedged with a second request to the fallback model; the
+    first answer wins and the other request is cancelled. A hedge needs a
+    free ``llm`` admission slot of its own and is skipped when there is none.
+    Models whose recent calls mostly fail or are too slow are skipped by a
+    circuit breaker.
+    """
+
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _loop_lock = threading.Lock()
 
     def __init__(self, config: Any):
         self.config = config
         self.base_url = self.config.llm_base_url
         self.api_key = self.config.llm_api_key
-        self.client = OpenAI(base_url=self.base_url, api_key=self.api_key)
+        self.async_client = AsyncOpenAI(
+            base_url=self.base_url,
+            api_key=self.api_key,
+            timeout=self.config.llm_timeout,
+        )
+
+    @classmethod
+    def _event_loop(cls) -> asyncio.AbstractEventLoop:
+        """Background loop on which requests run, so losers can be cancelled."""
+        with cls._loop_lock:
+            if cls._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever, name="llm-client", daemon=True
+                ).start()
+                cls._loop = loop
+            return cls._loop
 
     def chat_completion(
         self,
         prompt: str,
         response_model: type[BaseModel] | None = None,
         model_override: str | None = None,
-    ) -> Optional[Union[dict[str, Any], BaseModel]]:
+    ) -> CompletionResult:
         """Generate a chat completion response from the LLM.
 
         Args:
@@ -35,6 +92,19 @@ class LLMClient:
             model_override: Optional model identifier to use for this request.
         """
 
+        result, _ = self.chat_completion_with_info(
+            prompt, response_model=response_model, model_override=model_override
+        )
+        return result
+
+    def chat_completion_with_info(
+        self,
+        prompt: str,
+        response_model: type[BaseModel] | None = None,
+        model_override: str | None = None,
+    ) -> tuple[CompletionResult, LLMCallInfo]:
+        """Like :meth:`chat_completion`, also returning how the call was served."""
+
         if response_model is not None:
             response_format = {
                 "type": "json_schema",
@@ -45,28 +115,204 @@ class LLMClient:
 
         model = model_override or self.config.llm_model
 
-        try:
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                response_format=response_format,
+        # Waiting for a slot happens outside the completion's error handling:
+        # a rejection must reach the caller instead of becoming an empty answer.
+        with admission_controller("llm").admit():
+            future = asyncio.run_coroutine_threadsafe(
+                self._resilient_completion(
+                    prompt, model, response_format, response_model
+                ),
+                self._event_loop(),
             )
-            response_text = response.choices[0].message.content
-            if response_text is None:
-                logger.warning("Received None response from LLM")
-                return None
+            result, info = future.result()
+
+        hedge_stats.count(
+            info.outcome, info.hedged, info.short_circuited, info.hedge_skipped
+        )
+        if info.outcome != "primary":
+            logger.info(
+                "LLM request for %s served by %s (%s) in %.2fs",
+                model,
+                info.model,
+                info.outcome,
+                info.latency_seconds,
+            )
+        return result, info
+
+    def warm_up(self) -> None:
+        """Open a pooled connection to the LLM host without a completion.
+
+        Lists the models on the loop completions run on, so the TLS session
+        lands in the connection pool they use. An error status still means
+        the connection was made; only connection failures are raised.
+        """
+
+        async def list_models() -> None:
+            try:
+                await self.async_client.models.list()
+            except APIStatusError as exc:
+                logger.debug("LLM warm-up got status %s", exc.status_code)
+
+        future = asyncio.run_coroutine_threadsafe(list_models(), self._event_loop())
+        future.result(timeout=self.config.llm_timeout)
 
-            if response_model is not None:
-                try:
-                    return response_model.model_validate_json(response_text)
-                except ValidationError as e:
-                    logger.error(f"Structured output validation failed: {e}")
-                    return None
+    def _hedge_delay(self, model: str) -> float:
+        observed = model_health(model).latency_percentile(
+            self.config.llm_hedge_percentile
+        )
+        if observed is None:
+            return self.config.llm_hedge_delay
+        return max(self.config.llm_hedge_min_delay, observed)
 
+    async def _resilient_completion(
+        self,
+        prompt: str,
+        model: str,
+        response_format: Any,
+        response_model: type[BaseModel] | None,
+    ) -> tuple[CompletionResult, LLMCallInfo]:
+        started = time.monotonic()
+        deadline = started + self.config.llm_timeout
+        info = LLMCallInfo(requested_model=model)
+        fallback = self.config.llm_fallback_model
+        fallback = fallback if fallback and fallback != model else None
+
+        slots = admission_controller("llm")
+        attempts: dict[asyncio.Task, tuple[str, float]] = {}
+
+        def launch(target: str, holds_slot: bool = False) -> None:
+            task = asyncio.ensure_future(
+                self._attempt(target, prompt, response_format, response_model)
+            )
+            if holds_slot:
+                task.add_done_callback(lambda _: slots.release())
+            attempts[task] = (target, time.monotonic())
+
+        def launch_fallback(holds_slot: bool = False) -> bool:
+            nonlocal fallback
+            if fallback is None or not model_health(fallback).allow():
+                fallback = None
+                if holds_slot:
+                    slots.release()
+                return False
+            launch(fallback, holds_slot)
+            fallback = None
+            return True
+
+        primary_failed = False
+        if model_health(model).allow():
+            launch(model)
+        else:
+            info.short_circuited = True
+            primary_failed = True
+            logger.warning("Circuit open for model %s", model)
+            launch_fallback()
+        hedge_at = (
+            started + self._hedge_delay(model)
+            if self.config.llm_hedge and not primary_failed
+            else None
+        )
+
+        result: CompletionResult = None
+        try:
+            while attempts and result is None:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                wake = deadline
+                if fallback is not None and hedge_at is not None:
+                    wake = min(wake, hedge_at)
+                done, _ = await asyncio.wait(
+                    attempts,
+                    timeout=max(0.0, wake - now),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    target, attempt_started = attempts.pop(task)
+                    latency = time.monotonic() - attempt_started
+                    try:
+                        answer = task.result()
+                    except Exception as e:
+                        logger.error(f"Error during LLM API call to {target}: {e}")
+                        answer = None
+                    model_health(target).record(answer is not None, latency)
+                    if answer is None:
+                        primary_failed = primary_failed or target == model
+                    elif result is None:
+                        result, info.model = answer, target
+                if result is not None:
+                    break
+
+                if fallback is not None and primary_failed:
+                    launch_fallback()
+                elif (
+                    fallback is not None
+                    and hedge_at is not None
+                    and time.monotonic() >= hedge_at
+                ):
+                    # The hedge is a second call in flight, so it takes a
+                    # second slot; at the limit the request keeps waiting on
+                    # the requested model alone.
+                    if slots.try_acquire():
+                        info.hedged = launch_fallback(holds_slot=True)
+                    else:
+                        info.hedge_skipped = True
+                        hedge_at = None
+        finally:
+            timed_out = result is None and time.monotonic() >= deadline
+            for task, (target, attempt_started) in attempts.items():
+                task.cancel()
+                elapsed = time.monotonic() - attempt_started
+                if timed_out:
+                    model_health(target).record(False, elapsed, timed_out=True)
+                else:
+                    model_health(target).record_cancelled(
+                        elapsed, self._hedge_delay(target)
+                    )
+            if attempts:
+                await asyncio.gather(*attempts, return_exceptions=True)
+
+        if result is None:
+            if timed_out:
+                logger.error(
+                    f"LLM request for {model} exceeded its "
+                    f"{self.config.llm_timeout:.0f}s deadline"
+                )
+        elif info.model == model:
+            info.outcome = "primary"
+        else:
+            info.outcome = "hedge_won" if info.hedged else "fallback"
+        info.latency_seconds = time.monotonic() - started
+        return result, info
+
+    async def _attempt(
+        self,
+        model: str,
+        prompt: str,
+        response_format: Any,
+        response_model: type[BaseModel] | None,
+    ) -> CompletionResult:
+        """One request to one model; returns None when the reply is unusable."""
+
+        response = await self.async_client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            response_format=response_format,
+        )
+        response_text = response.choices[0].message.content
+        if response_text is None:
+            logger.warning("Received None response from LLM")
+            return None
+
+        if response_model is not None:
+            try:
+                return response_model.model_validate_json(response_text)
+            except ValidationError as e:
+                logger.error(f"Structured output validation failed: {e}")
+                return None
+
+        try:
             return json.loads(response_text)
         except json.JSONDecodeError as e:
             logger.error(f"Error parsing JSON response: {e}")
             return None
-        except Exception as e:
-            logger.error(f"Error during LLM API call: {e}")
-            return None
@@ -0,0 +1,73 @@
+"""Warm indexes, connections and HTTP pools before an instance takes traffic.
+
+Right after a deploy the HNSW and full-text index pages are not in memory,
+and no TLS session to the embedding or LLM host exists yet, so the first
+queries pay for all of it. The warm-up pays instead, before ``/health``
+reports the instance ready. Every step is best effort: a failing step is
+logged and recorded, and the others still run.
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional, TypeVar
+
+from app.workflow.rag_workflow import RAGWorkflow
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Short, common words, so the full-text search reads index pages most
+# queries also read.
+WARMUP_QUERY = "what is the overview"
+
+
+@dataclass(slots=True)
+class WarmupReport:
+    """Duration and error of each warm-up step."""
+
+    seconds: dict[str, float] = field(default_factory=dict)
+    errors: dict[str, str] = field(default_factory=dict)
+    prewarmed_blocks: dict[str, int] = field(default_factory=dict)
+
+    def step(self, name: str, fn: Callable[[], T]) -> Optional[T]:
+        started = time.perf_counter()
+        try:
+            return fn()
+        except Exception as exc:
+            self.errors[name] = str(exc)
+            logger.warning("Warm-up step %s failed: %s", name, exc)
+            return None
+        finally:
+            self.seconds[name] = time.perf_counter() - started
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "seconds": dict(self.seconds),
+            "errors": dict(self.errors),
+            "prewarmed_blocks": dict(self.prewarmed_blocks),
+        }
+
+
+def warm_up(workflow: RAGWorkflow) -> WarmupReport:
+    """Run every warm-up step against the workflow's clients."""
+
+    report = WarmupReport()
+    vector_db = workflow.vector_db
+    # One small embedding warms the embeddings pool and gives the dense
+    # search below a real query vector.
+    embedding = report.step(
+        "embeddings", lambda: vector_db.get_embeddings(WARMUP_QUERY)
+    )
+    blocks = report.step(
+        "database", lambda: vector_db.prewarm(WARMUP_QUERY, embedding)
+    )
+    report.prewarmed_blocks = blocks or {}
+    report.step("llm", workflow.llm.warm_up)
+    logger.info(
+        "Warm-up finished: %s%s",
+        ", ".join(f"{name} {seconds:.2f}s" for name, seconds in report.seconds.items()),
+        f" ({len(report.errors)} failed)" if report.errors else "",
+    )
+    return report